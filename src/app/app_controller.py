@@ -1,7 +1,6 @@
 import flet as ft
 import app.core.mlog as mlog
 import traceback
-from concurrent.futures import ThreadPoolExecutor
 
 # 导入功能管理器
 from app.core.path_manager import PathManager
@@ -12,6 +11,9 @@ from app.core.audio_manager import AudioManager
 from app.core.model_manager import ModelManager
 from app.core.api_manager import ApiManager
 from app.core.db_manager import DBManager
+from app.core.batch_manager import BatchManager
+from app.core.synthesis_cache import SynthesisCache
+from app.core.upload_cache import UploadCache
 from app.core.utils import run_async
 
 # 导入自定义UI组件
@@ -22,6 +24,7 @@ from app.callbacks.clone_callbacks import CloneCallbacks
 from app.callbacks.history_callbacks import HistoryCallbacks
 from app.callbacks.role_callbacks import RoleCallbacks
 from app.callbacks.settings_callbacks import SettingsCallbacks
+from app.callbacks.batch_callbacks import BatchCallbacks
 
 class CosyVoiceApp:
     """主应用控制器类"""
@@ -37,8 +40,11 @@ class CosyVoiceApp:
         self.role_manager = RoleManager(self.path_manager,self.db_managet)
         self.history_manager = HistoryManager(self.path_manager,self.db_managet)
         self.audio_manager = AudioManager()
-        self.model_manager = ModelManager()
         self.api_manager = ApiManager(self.path_manager)
+        self.model_manager = ModelManager(self.api_manager)
+        self.batch_manager = BatchManager(self.api_manager)
+        self.upload_cache = UploadCache(self.db_managet)
+        self.synthesis_cache = SynthesisCache(self.db_managet, self.settings_manager, self.upload_cache)
 
         # 全局状态
         self.global_audio_state = self.audio_manager.state
@@ -60,12 +66,12 @@ class CosyVoiceApp:
         # 文件选择器
         self.clone_file_picker = None
         self.role_file_picker = None
+        self.batch_file_picker = None
         
         # 对话框
         self.select_role_dialog = None
         self.loading_dialog = None
         self.model_thread = None
-        self.thread_pool = ThreadPoolExecutor(max_workers=1)
         
         # 初始化回调处理器
         self._init_callbacks()
@@ -86,6 +92,11 @@ class CosyVoiceApp:
             self, self.page, self.role_manager
         )
         
+        self.batch_callbacks = BatchCallbacks(
+            self, self.page, self.settings_manager,
+            self.batch_manager, self.clone_callbacks
+        )
+        
         self.settings_callbacks = SettingsCallbacks(
             self, self.page, self.settings_manager, 
             self.api_manager, self.model_manager, 
@@ -149,6 +160,10 @@ class CosyVoiceApp:
         # 角色页面文件选择器
         self.role_file_picker = ft.FilePicker(on_result=self.role_callbacks.role_file_picked)
         self.page.overlay.append(self.role_file_picker)
+        
+        # 批量文本文件选择器
+        self.batch_file_picker = ft.FilePicker(on_result=self.batch_callbacks.on_file_picked)
+        self.page.overlay.append(self.batch_file_picker)
 
     def _create_dialogs(self):
         """创建对话框"""
@@ -193,7 +208,8 @@ class CosyVoiceApp:
                 "on_clear": self.clone_callbacks.on_clear,
                 "on_select_role": self.clone_callbacks.on_select_role,
                 "on_select_file": self.clone_callbacks.on_select_file,
-                "on_play_audio": self.clone_callbacks.on_play_audio  # 添加音频播放回调
+                "on_play_audio": self.clone_callbacks.on_play_audio,  # 添加音频播放回调
+                "on_batch_generate": self.batch_callbacks.on_batch_generate
             }
         )
         
@@ -208,6 +224,7 @@ class CosyVoiceApp:
                 "on_clear_filter": self.history_callbacks.history_on_clear_filter,
                 "on_page_change": self.history_callbacks.history_on_page_change,  # 确保注册页面变更回调
                 "on_page_size_change": self.history_callbacks.history_on_page_size_change,  # 确保注册页面大小变更回调
+                "on_load_more": self.history_callbacks.history_on_load_more,
                 "get_global_audio_state": self.history_callbacks.history_get_global_audio_state
             }
         )
@@ -221,6 +238,8 @@ class CosyVoiceApp:
                 "on_delete_role": self.role_callbacks.roles_on_delete_role,
                 "on_filter_roles": self.role_callbacks.roles_on_filter,
                 "on_clear_filter": self.role_callbacks.roles_on_clear_filter,
+                "on_page_change": self.role_callbacks.roles_on_page_change,
+                "on_page_size_change": self.role_callbacks.roles_on_page_size_change,
                 "on_pick_file": self.role_callbacks.roles_on_pick_file
             }
         )
@@ -241,6 +260,7 @@ class CosyVoiceApp:
                 "on_open_model_folder": self.settings_callbacks.settings_on_open_model_folder,
                 "on_save_paths": self.settings_callbacks.settings_on_save_paths,
                 "on_reset_paths": self.settings_callbacks.settings_on_reset_paths,  # 添加新的回调
+                "on_clear_synthesis_cache": self.settings_callbacks.settings_on_clear_synthesis_cache,
             }
         )
 
@@ -344,8 +364,12 @@ class CosyVoiceApp:
         """窗口关闭前清理资源"""
         # 停止可能运行的模型进程
         self.model_manager.stop_model()
+        # 关闭API长连接
+        self.api_manager.close()
         # 清理音频资源
         self.audio_manager.cleanup()
+        # 关闭数据库连接
+        self.db_managet.close_all()
         # 关闭窗口
         self.page.window.close()
 
@@ -424,6 +448,7 @@ class CosyVoiceApp:
             elif page_name == "roles":
                 self.content_container.content = self.roles_page
             elif page_name == "settings":
+                self.settings_page.set_synthesis_cache_stats(self.synthesis_cache.get_stats())
                 self.content_container.content = self.settings_page
             
             # 更新菜单选中状态
@@ -474,13 +499,7 @@ class CosyVoiceApp:
             self.show_page("clone")
             self.page.update()
 
-            # 同步加载初始数据
-            roles_data = self.role_manager.get_roles_paged(1, self.roles_page.page_size)
-            history_data = self.history_manager.get_history_paged(1, self.history_page.page_size)
-            
-            mlog.debug(f"初始化加载: 角色数据={len(roles_data)}条, 历史数据={len(history_data)}条")
-            
-            # 更新UI数据
+            # 加载初始数据
             self.role_callbacks.roles_on_page_change(1, self.roles_page.page_size, "")
             self.history_callbacks.history_on_page_change(1, self.history_page.page_size, "")
             
@@ -503,9 +522,12 @@ class CosyVoiceApp:
             self.page.update()
             
             # 检查API连接
-            run_async(self.settings_callbacks.settings_on_test_connection(
-                self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
-            ))
+            api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
+            self.api_manager.set_endpoints(api_url, self.settings_manager.get('api_endpoints', []))
+            run_async(self.settings_callbacks.settings_on_test_connection(api_url))
+            
+            # 启动API心跳，生成时直接使用缓存的健康状态
+            self.api_manager.start_heartbeat(api_url)
             
             # 自动加载模型
             if self.settings_manager.get('auto_load_model', False):
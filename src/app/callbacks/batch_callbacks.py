@@ -0,0 +1,224 @@
+import flet as ft
+from app.core.batch_manager import BatchJob
+from app.core.utils import run_async
+import app.core.mlog as mlog
+
+class BatchCallbacks:
+    def __init__(self, app, page, settings_manager, batch_manager, clone_callbacks):
+        self.app = app
+        self.page = page
+        self.settings_manager = settings_manager
+        self.batch_manager = batch_manager
+        self.clone_callbacks = clone_callbacks
+
+        # 当前执行中的批量任务
+        self.current_job = None
+        # 正在显示进度的任务项控件: index -> (行容器, 进度条)
+        self.item_rows = {}
+
+        # 批量输入对话框控件
+        self.texts_input = ft.TextField(
+            label="批量文本（每行一条）",
+            multiline=True,
+            min_lines=8,
+            max_lines=12,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8
+        )
+        self.concurrency_input = ft.TextField(
+            label="并发数",
+            value=str(self.settings_manager.get('batch_concurrency', 2)),
+            width=120,
+            keyboard_type=ft.KeyboardType.NUMBER,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8
+        )
+        self.input_dialog = ft.AlertDialog(
+            title=ft.Text("批量生成"),
+            content=ft.Container(
+                content=ft.Column(
+                    [
+                        self.texts_input,
+                        ft.Row(
+                            [
+                                self.concurrency_input,
+                                ft.ElevatedButton(
+                                    text="从文件导入",
+                                    on_click=self.on_select_file,
+                                    style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+                                ),
+                            ],
+                            spacing=10
+                        ),
+                        ft.Text("支持 .txt 或 .csv 文件，其余参数使用当前克隆页面的设置", size=12, color=ft.Colors.GREY_400),
+                    ],
+                    spacing=15,
+                    scroll=ft.ScrollMode.AUTO,
+                ),
+                width=450,
+            ),
+            actions=[
+                ft.TextButton("取消",
+                             on_click=lambda e: self.page.close(self.input_dialog),
+                             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
+                ft.TextButton("开始",
+                             on_click=self.on_start,
+                             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
+            ]
+        )
+
+        # 批量进度对话框控件
+        self.overall_progress = ft.ProgressBar(value=0)
+        self.overall_text = ft.Text("", size=14, weight=ft.FontWeight.W_500)
+        self.items_list = ft.ListView(spacing=8, height=220, controls=[])
+        self.stop_button = ft.TextButton(
+            "停止",
+            on_click=self.on_stop,
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        self.progress_dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("批量生成"),
+            content=ft.Container(
+                content=ft.Column(
+                    [self.overall_progress, self.overall_text, ft.Divider(), self.items_list],
+                    spacing=10,
+                ),
+                width=min(450, self.page.width * 0.9) if self.page.width else 450,
+            ),
+            actions=[self.stop_button],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+
+    def on_batch_generate(self, e):
+        """打开批量生成对话框"""
+        # 如果克隆页面的文本包含多行，预先填入
+        text = self.app.clone_page.text_input.value or ""
+        if not self.texts_input.value and "\n" in text:
+            self.texts_input.value = text
+        self.page.open(self.input_dialog)
+
+    def on_select_file(self, e):
+        """打开批量文本文件选择器"""
+        self.app.batch_file_picker.pick_files(
+            allow_multiple=False,
+            allowed_extensions=['txt', 'csv']
+        )
+
+    def on_file_picked(self, e: ft.FilePickerResultEvent):
+        """批量文本文件选择完成后的回调"""
+        if e.files and e.files[0].path:
+            texts = self.batch_manager.load_texts(e.files[0].path)
+            self.texts_input.value = "\n".join(texts)
+            self.page.update()
+
+    def on_start(self, e):
+        """开始批量生成"""
+        texts = self.batch_manager.parse_texts(self.texts_input.value)
+        if not texts:
+            self.texts_input.error_text = "请输入至少一条文本"
+            self.page.update()
+            return
+        self.texts_input.error_text = None
+
+        try:
+            concurrency = max(1, int(self.concurrency_input.value))
+        except (TypeError, ValueError):
+            concurrency = self.settings_manager.get('batch_concurrency', 2)
+        self.concurrency_input.value = str(concurrency)
+        self.settings_manager.set('batch_concurrency', concurrency)
+        self.settings_manager.save_settings()
+
+        params = self.app.clone_page.get_parameters()
+        self.current_job = BatchJob(texts, params, concurrency)
+
+        self.page.close(self.input_dialog)
+        run_async(self._run_batch(self.current_job))
+
+    def on_stop(self, e):
+        """停止批量任务或关闭已完成的进度对话框"""
+        if self.current_job and not self._is_job_finished(self.current_job):
+            self.current_job.cancel()
+            self.stop_button.disabled = True
+            self.overall_text.value = "正在停止，等待进行中的请求完成..."
+            self.page.update()
+        else:
+            self.page.close(self.progress_dialog)
+
+    def _is_job_finished(self, job):
+        """判断任务是否已全部结束"""
+        return all(item["status"] not in ("pending", "running") for item in job.items)
+
+    async def _run_batch(self, job):
+        """执行批量任务并展示进度"""
+        api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
+
+        # 重置进度对话框
+        self.item_rows = {}
+        self.items_list.controls = []
+        self.overall_progress.value = 0
+        self.stop_button.text = "停止"
+        self.stop_button.disabled = False
+        self._update_overall(job)
+        self.page.open(self.progress_dialog)
+
+        try:
+            await self.batch_manager.run(
+                job,
+                api_url,
+                self._save_result,
+                self._on_item_update,
+                self.clone_callbacks.reuse_cached_result
+            )
+        except Exception as ex:
+            mlog.error(f"批量生成失败: {str(ex)}")
+
+        done = job.finished - job.failed
+        summary = f"批量生成结束: 成功 {done} 条, 失败 {job.failed} 条"
+        if job.cancelled:
+            summary += f", 取消 {job.total - job.finished} 条"
+        self.overall_text.value = summary
+        self.stop_button.text = "关闭"
+        self.stop_button.disabled = False
+        self.app.clone_page.set_output_text(summary)
+        self.page.update()
+
+        # 刷新历史记录页面
+        self.app.history_callbacks.refresh_history()
+
+    async def _save_result(self, params, result):
+        """保存单条生成结果并写入合成缓存"""
+        success, target_file = await self.clone_callbacks.save_generation_result(params, result)
+        if success:
+            self.app.synthesis_cache.store(params, target_file)
+        return success, target_file
+
+    def _update_overall(self, job):
+        """更新整体进度"""
+        self.overall_progress.value = job.finished / job.total if job.total else 0
+        self.overall_text.value = f"已完成 {job.finished}/{job.total} 条，失败 {job.failed} 条"
+
+    def _on_item_update(self, job, item):
+        """任务项状态或进度变化时更新UI"""
+        index = item["index"]
+        label = f"#{index + 1} {item['text'][:30]}"
+
+        if item["status"] == "running":
+            if index not in self.item_rows:
+                progress_bar = ft.ProgressBar(value=0)
+                row = ft.Column([ft.Text(label, size=12), progress_bar], spacing=4)
+                self.item_rows[index] = (row, progress_bar)
+                self.items_list.controls.append(row)
+            self.item_rows[index][1].value = item["progress"] / 100
+        else:
+            # 完成的任务项移除进度行，失败的保留错误信息
+            row = self.item_rows.pop(index, (None, None))[0]
+            if row is not None:
+                self.items_list.controls.remove(row)
+            if item["status"] == "failed":
+                self.items_list.controls.append(
+                    ft.Text(f"{label} 失败: {item['error']}", size=12, color=ft.Colors.RED)
+                )
+
+        self._update_overall(job)
+        self.page.update()
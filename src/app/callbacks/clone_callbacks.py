@@ -1,13 +1,19 @@
 import flet as ft
 import os
 import datetime
-import aiohttp
-import json
 import shutil  # 添加shutil导入
-from app.core.utils import run_async
+import threading
+from app.core.utils import run_async, split_sentences, generate_unique_filename, file_sha256
+from app.core.wav_stream import WavStreamWriter
+from app.ui.components.role_picker import RolePicker
 import app.core.mlog as mlog
 
 class CloneCallbacks:
+    # 长文本分段时每段的最大字符数
+    LONG_TEXT_SEGMENT_LENGTH = 80
+    # 流式生成时每积累多少秒音频加入一次播放队列
+    STREAM_PIECE_SECONDS = 1.0
+
     def __init__(self, app, page, settings_manager, api_manager, history_manager):
         self.app = app
         self.page = page
@@ -17,6 +23,10 @@ class CloneCallbacks:
         
         # 存储当前生成的音频文件路径
         self.current_audio_path = None
+        
+        # 长文本分段播放队列
+        self._segment_queue = []
+        self._segment_playing = False
 
         # 添加移动端特定属性
         self.is_mobile = page.platform in [ft.PagePlatform.ANDROID, ft.PagePlatform.IOS]
@@ -24,39 +34,64 @@ class CloneCallbacks:
         # 使用path_manager中的历史目录
         self.mobile_audio_dir = self.app.path_manager.history_dir
         mlog.info(f"音频将保存到: {self.mobile_audio_dir}")
+        
+        # 角色选择列表在首次打开时创建，之后只在角色有变化时重新获取角色
+        self.role_picker = None
+        self._picker_roles_stale = True
+        self.app.role_manager.add_listener(self._on_roles_changed)
 
     def on_generate(self, e):
         """处理生成按钮点击事件"""
         run_async(self._check_and_generate())
 
     async def _check_and_generate(self):
-        """检查API连接并生成音频"""
+        """生成音频，仅在API状态未知为可用时才检查连接"""
         # 获取当前API地址
         api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
         
-        # 检查API连接
-        success, message = await self.api_manager.check_connection(api_url)
-        if not success:
-            self._show_error_dialog(f"API连接失败: {message}")
+        # 获取参数
+        params = self.app.clone_page.get_parameters()
+        
+        # 相同参数已生成过时直接复用历史音频
+        cached_file = await self.reuse_cached_result(params)
+        if cached_file:
+            self._update_ui_after_generation(cached_file)
+            self.app.clone_page.set_output_text(f"已复用缓存音频: {cached_file}")
             return
         
+        # 心跳缓存显示API不可用时才进行实时检查，否则直接生成；
+        # 本地模型因空闲停止时，生成请求会自动重新启动模型
+        health = self.api_manager.get_cached_health(api_url)
+        if health is not None and not health[0] and not self.app.model_manager.is_suspended():
+            success, message = await self.api_manager.check_connection(api_url)
+            if not success:
+                self._show_error_dialog(f"API连接失败: {message}")
+                return
+        
         # 显示进度对话框
         progress_dialog = self._create_progress_dialog()
         self.page.open(progress_dialog)
         
-        # 获取参数
-        params = self.app.clone_page.get_parameters()
+        # 长文本按句子分段，首段完成即可播放
+        segments = []
+        if params.get('long_text'):
+            segments = split_sentences(params['text'], self.LONG_TEXT_SEGMENT_LENGTH)
         
-        # 生成音频
-        success, result = await self.api_manager.generate_audio(
-            api_url, 
-            params, 
-            lambda progress_info: self._update_progress(progress_dialog, progress_info)
-        )
+        if len(segments) > 1:
+            success, result = await self._generate_long_text(api_url, params, segments, progress_dialog)
+        else:
+            success, result = await self._generate_streamed(api_url, params, progress_dialog)
         
         if success:
-            await self._handle_generation_success(params, result)
+            self.app.synthesis_cache.store(params, result)
+            self._update_ui_after_generation(result)
         else:
+            # 生成失败后再实时检查连接，区分连接问题和生成错误
+            connected, message = await self.api_manager.check_connection(api_url)
+            if not connected:
+                self.page.close(progress_dialog)
+                self._show_error_dialog(f"API连接失败: {message}")
+                return
             self.app.clone_page.set_output_text(f"生成失败: {result}")
         
         # 关闭进度对话框
@@ -75,11 +110,11 @@ class CloneCallbacks:
         )
         self.page.open(error_dialog)
 
-    def _create_progress_dialog(self):
+    def _create_progress_dialog(self, title="生成音频", actions=None):
         """创建进度对话框"""
         return ft.AlertDialog(
             modal=True,  # 添加模态窗口属性
-            title=ft.Text("生成音频"),
+            title=ft.Text(title),
             content=ft.Container(
                 content=ft.Column(
                     [
@@ -101,7 +136,7 @@ class CloneCallbacks:
                 width=min(200, self.page.width * 0.8),  # 自适应宽度，但不超过屏幕80%
                 height=150,  # 固定高度
             ),
-            actions=[],  # 移除所有操作按钮
+            actions=actions or [],  # 默认不显示操作按钮
             actions_alignment=ft.MainAxisAlignment.END,  # 操作按钮右对齐
         )
 
@@ -119,75 +154,62 @@ class CloneCallbacks:
             dialog.content.content.controls[1].value = f"生成进度: {progress:.1f}%"
         self.page.update()
 
-    async def _download_audio_file(self, api_url, file_path):
-        """在移动端下载并保存音频文件"""
-        try:
-            # 提取文件名，忽略路径中的分隔符
-            filename = os.path.basename(file_path.replace('\\', '/'))
-            download_url = f"{api_url}/download/{filename}"
-            
-            # 使用时间戳作为文件名前缀，避免重复
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            local_filename = os.path.join(
-                self.mobile_audio_dir, 
-                f"{timestamp}_{filename}"
-            )
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(download_url) as response:
-                    if response.status == 200:
-                        with open(local_filename, 'wb') as f:
-                            while True:
-                                chunk = await response.content.read(8192)
-                                if not chunk:
-                                    break
-                                f.write(chunk)
-                        return True, local_filename
-                    else:
-                        error_msg = f"下载失败，HTTP状态码: {response.status}"
-                        mlog.error(error_msg)
-                        return False, error_msg
-
-        except Exception as e:
-            error_msg = f"下载音频文件失败: {str(e)}"
-            mlog.error(error_msg)
-            return False, error_msg
+    async def reuse_cached_result(self, params):
+        """
+        查找相同参数的合成缓存，命中时直接写入历史记录
+        
+        Args:
+            params: 生成参数
+        
+        Returns:
+            str: 命中时返回缓存的音频文件路径，否则返回None
+        """
+        cached_file = self.app.synthesis_cache.lookup(params)
+        if cached_file:
+            await self._add_history_record(params, cached_file)
+        return cached_file
 
-    async def _handle_generation_success(self, params, result):
-        """处理生成成功的情况"""
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    async def save_generation_result(self, params, result):
+        """
+        将生成结果保存到历史目录并写入历史记录
+        
+        结果由负载均衡中实际生成的节点保存，通过 fetch_result 从该节点获取，
+        服务器在本机时直接移动文件
+        
+        Args:
+            params: 生成参数
+            result: 服务器返回的结果文件路径
         
-        # 处理路径分隔符
-        normalized_result = result.replace('\\', '/')
+        Returns:
+            tuple: (是否成功, 本地文件路径或错误消息)
+        """
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
+        # 提取文件名，忽略路径中的分隔符
+        filename = os.path.basename(result.replace('\\', '/'))
         if self.is_mobile:
-            # 移动端：下载音频文件
-            api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
-            success, local_file = await self._download_audio_file(api_url, normalized_result)
-            
-            if not success:
-                self.app.clone_page.set_output_text(f"下载音频失败: {local_file}")
-                return
-                
-            target_file = local_file
-        else:
-            # 桌面端处理逻辑
-            target_file = os.path.join(
-                self.app.path_manager.history_dir, 
-                os.path.basename(normalized_result)
-            )
-            os.makedirs(os.path.dirname(target_file), exist_ok=True)
-            
-            if os.path.exists(result):
-                try:
-                    # 使用shutil.move替代os.rename
-                    shutil.move(result, target_file)
-                except Exception as e:
-                    error_msg = f"移动音频文件失败: {str(e)}"
-                    mlog.error(error_msg)
-                    self.app.clone_page.set_output_text(error_msg)
-                    return
+            # 使用时间戳作为文件名前缀，避免重复
+            filename = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}"
+        target_file = os.path.join(self.app.path_manager.history_dir, filename)
+        
+        api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
+        success, local_file = await self.api_manager.fetch_result(api_url, result, target_file)
+        if not success:
+            mlog.error(f"获取生成结果失败: {local_file}")
+            return False, f"获取音频失败: {local_file}"
+        
+        await self._add_history_record(params, local_file, timestamp)
+        return True, local_file
 
+    async def _add_history_record(self, params, target_file, timestamp=None):
+        """
+        根据生成参数添加历史记录
+        
+        Args:
+            params: 生成参数
+            target_file: 本地音频文件路径
+            timestamp: 记录时间，默认当前时间
+        """
         # 创建并添加历史记录
         record = {
             'text': params['text'],
@@ -195,7 +217,7 @@ class CloneCallbacks:
             'speed': params['speed'],
             'reference': params['prompt'],
             'file_path': target_file,
-            'timestamp': timestamp,
+            'timestamp': timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'mode': params['mode']
         }
         
@@ -204,17 +226,177 @@ class CloneCallbacks:
         elif params['mode'] == "zero_shot":
             record['speaker_text'] = params['speaker_text']
         
-        # 更新历史记录和UI
-        self.history_manager.add_record(record)
-        self._update_ui_after_generation(target_file)
+        await self.history_manager.aadd_record(record)
+
+    async def _generate_long_text(self, api_url, params, segments, progress_dialog):
+        """
+        分段合成长文本并增量拼接为一个WAV文件，首段完成后即开始播放
+        
+        Args:
+            api_url: API地址
+            params: 生成参数
+            segments: 文本片段列表
+            progress_dialog: 进度对话框
+        
+        Returns:
+            tuple: (是否成功, 本地文件路径或错误消息)
+        """
+        total = len(segments)
+        target_file = os.path.join(self.app.path_manager.history_dir, generate_unique_filename("long"))
+        
+        # 每段的音频单独保存，用于边生成边播放
+        segment_dir = self._prepare_segment_dir()
+        writer = WavStreamWriter(target_file)
+        
+        async def on_segment(index, result):
+            segment_file = os.path.join(segment_dir, f"{index:04d}.wav")
+            success, local_file = await self.api_manager.fetch_result(api_url, result, segment_file)
+            if not success:
+                raise RuntimeError(local_file)
+            writer.append_file(local_file)
+            
+            if index == 0:
+                # 首段完成后关闭模态进度框，后续进度显示在输出文本中
+                self.page.close(progress_dialog)
+                self.app.clone_page.show_audio_player(target_file, os.path.basename(target_file))
+            self.app.clone_page.set_output_text(f"正在生成: 已完成 {index + 1}/{total} 段")
+            self._enqueue_segment(local_file)
+        
+        try:
+            success, error = await self.api_manager.generate_segments(
+                api_url,
+                params,
+                segments,
+                on_segment,
+                lambda progress_info: self._update_progress(progress_dialog, progress_info)
+            )
+        except Exception as e:
+            success, error = False, str(e)
+        finally:
+            writer.close()
+        
+        if not success:
+            mlog.error(f"长文本生成失败: {error}")
+            if os.path.exists(target_file):
+                os.remove(target_file)
+            return False, error
+        
+        await self._add_history_record(params, target_file)
+        return True, target_file
+
+    async def _generate_streamed(self, api_url, params, progress_dialog):
+        """
+        流式生成音频，收到的音频块直接写入历史文件，每积累一小段即加入播放队列
+        
+        服务器不支持流式返回时，按原方式保存服务器生成的文件。
+        
+        Args:
+            api_url: API地址
+            params: 生成参数
+            progress_dialog: 进度对话框
+        
+        Returns:
+            tuple: (是否成功, 本地文件路径或错误消息)
+        """
+        target_file = os.path.join(self.app.path_manager.history_dir, generate_unique_filename("stream"))
+        piece_dir = self._prepare_segment_dir()
+        writer = WavStreamWriter(target_file)
+        # 尚未加入播放队列的PCM数据
+        pending = bytearray()
+        piece_count = 0
+        
+        def flush_piece():
+            nonlocal piece_count
+            if not pending:
+                return
+            piece_file = os.path.join(piece_dir, f"{piece_count:04d}.wav")
+            piece = WavStreamWriter(piece_file)
+            piece.append_frames(bytes(pending), *writer.format)
+            piece.close()
+            pending.clear()
+            
+            if piece_count == 0:
+                # 收到首段音频后关闭模态进度框
+                self.page.close(progress_dialog)
+                self.app.clone_page.show_audio_player(target_file, os.path.basename(target_file))
+                self.app.clone_page.set_output_text("正在接收音频...")
+            piece_count += 1
+            self._enqueue_segment(piece_file)
+        
+        def on_chunk(frames, channels, sample_width, frame_rate):
+            writer.append_frames(frames, channels, sample_width, frame_rate)
+            pending.extend(frames)
+            if len(pending) >= self.STREAM_PIECE_SECONDS * frame_rate * channels * sample_width:
+                flush_piece()
+        
+        try:
+            success, result = await self.api_manager.generate_audio_stream(
+                api_url,
+                params,
+                on_chunk,
+                lambda progress_info: self._update_progress(progress_dialog, progress_info)
+            )
+        finally:
+            writer.close()
+        
+        if not writer.frames_written:
+            # 服务器未返回音频流，使用服务器生成的文件
+            if success:
+                return await self.save_generation_result(params, result)
+            return False, result
+        
+        if not success:
+            mlog.error(f"流式生成失败: {result}")
+            if os.path.exists(target_file):
+                os.remove(target_file)
+            return False, result
+        
+        flush_piece()
+        await self._add_history_record(params, target_file)
+        return True, target_file
+
+    def _prepare_segment_dir(self):
+        """
+        清理上一次的分段音频并停止分段播放
+        
+        Returns:
+            str: 分段音频目录
+        """
+        segment_dir = os.path.join(self.app.path_manager.temp_dir, "segments")
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        os.makedirs(segment_dir, exist_ok=True)
+        self._reset_segment_playback()
+        return segment_dir
+
+    def _reset_segment_playback(self):
+        """清空分段播放队列"""
+        self._segment_queue = []
+        self._segment_playing = False
+
+    def _enqueue_segment(self, segment_file):
+        """将完成的片段加入播放队列，空闲时立即播放"""
+        self._segment_queue.append(segment_file)
+        if not self._segment_playing:
+            self._play_next_segment()
+
+    def _play_next_segment(self):
+        """播放队列中的下一段"""
+        if not self._segment_queue:
+            self._segment_playing = False
+            return
+        self._segment_playing = True
+        segment_file = self._segment_queue.pop(0)
+        self.app.audio_manager.play_audio(
+            segment_file,
+            self.app.clone_page.play_button,
+            on_complete=self._play_next_segment,
+            page=self.page
+        )
 
     def _update_ui_after_generation(self, target_file):
         """更新生成后的UI元素"""
         if self.app.history_page:
-            self.app.history_page.update_history_list(
-                self.history_manager.get_history(), 
-                self.app.global_audio_state
-            )
+            self.app.history_callbacks.refresh_history()
         
         self.current_audio_path = target_file
         self.app.clone_page.show_audio_player(
@@ -230,70 +412,97 @@ class CloneCallbacks:
         self.page.update()
 
     async def _upload_file_to_api(self, file_path):
-        """将文件上传到API服务器"""
+        """将文件上传到API服务器，服务器已有相同内容的文件时跳过上传"""
+        api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
+        upload_cache = self.app.upload_cache
+        
         try:
-            # 获取API地址
-            api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
-            upload_url = f"{api_url}/upload_file"
-            
-            # 读取文件内容
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-                
-            # 准备表单数据
-            form_data = aiohttp.FormData()
-            form_data.add_field('file',
-                                file_content,
-                                filename=os.path.basename(file_path),
-                                content_type='audio/wav')
-            
-            # 发送请求
-            async with aiohttp.ClientSession() as session:
-                async with session.post(upload_url, data=form_data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get("success"):
-                            return True, result.get("relative_path")
-                        else:
-                            return False, result.get("error", "上传失败")
-                    else:
-                        return False, f"上传失败，HTTP状态码: {response.status}"
-                        
+            file_hash = file_sha256(file_path)
         except Exception as e:
-            error_msg = f"上传文件失败: {str(e)}"
-            mlog.error(error_msg)
-            return False, error_msg
+            return False, f"读取文件失败: {str(e)}"
+        
+        # 先向服务器确认是否已有该文件
+        exists, server_path = await self.api_manager.check_upload(api_url, file_hash, file_path)
+        if exists:
+            upload_cache.put(api_url, file_hash, server_path)
+            mlog.info(f"服务器已有相同文件，跳过上传: {server_path}")
+            return True, server_path
+        
+        # 服务器不支持查询时，使用本地记录的上传结果
+        cached_path = upload_cache.get(api_url, file_hash)
+        if exists is None and cached_path:
+            mlog.info(f"使用已上传的文件: {cached_path}")
+            self.api_manager.register_upload(api_url, cached_path, file_path, file_hash)
+            return True, cached_path
+        
+        # 显示上传进度，可随时取消
+        cancel_event = threading.Event()
+        upload_dialog = self._create_progress_dialog(
+            "上传参考音频",
+            actions=[
+                ft.TextButton("取消",
+                             on_click=lambda e: cancel_event.set(),
+                             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)))
+            ]
+        )
+        self.page.open(upload_dialog)
+        
+        last_percent = -1
+        
+        def on_progress(sent, total):
+            nonlocal last_percent
+            # 按整数百分比刷新，避免频繁更新界面
+            percent = int(sent * 100 / total) if total else 100
+            if percent == last_percent:
+                return
+            last_percent = percent
+            self._update_progress(upload_dialog, {
+                "progress": percent,
+                "text_progress": f"已上传 {sent / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB"
+            })
+        
+        try:
+            success, server_path = await self.api_manager.upload_file(
+                api_url, file_path, file_hash, on_progress, cancel_event
+            )
+        finally:
+            self.page.close(upload_dialog)
+        
+        if success:
+            upload_cache.put(api_url, file_hash, server_path)
+        return success, server_path
 
     def on_select_role(self, e):
         """打开角色选择对话框"""
-        # 构建角色列表按钮
-        roles = self.app.role_manager.get_roles()
-        role_buttons = [
-            ft.TextButton(
-                text=r["name"],
-                on_click=lambda e, r=r: (
-                    self.select_role(r),
-                    setattr(self.app.select_role_dialog, "open", False),
-                    self.page.update()
-                )
-            ) for r in roles
-        ]
-        
-        # 分块函数，每行3个按钮
-        def chunk_list(lst, n):
-            return [lst[i:i+n] for i in range(0, len(lst), n)]
-        
-        rows = [ft.Row(controls=chunk, spacing=10) for chunk in chunk_list(role_buttons, 3)]
-        
-        # 将所有行组合成一个 Column
-        self.app.select_role_dialog.content = ft.Column(
-            controls=rows, 
-            spacing=10, 
-            height=min(self.page.height * 0.6, len(rows) * 50)
-        )
+        self.page.run_task(self._open_role_picker)
+
+    async def _open_role_picker(self):
+        """显示角色选择列表，角色没有变化时直接复用上次的列表"""
+        if self.role_picker is None:
+            self.role_picker = RolePicker(
+                on_select=self._on_role_picked,
+                max_height=self.page.height * 0.6 if self.page.height else 400
+            )
+            self.app.select_role_dialog.content = self.role_picker
+        
+        if self._picker_roles_stale:
+            # 先清除标记，获取期间角色又有变化时下次打开会重新获取
+            self._picker_roles_stale = False
+            self.role_picker.set_roles(await self.app.role_manager.aget_roles())
+        
         self.app.select_role_dialog.open = True
         self.page.update()
 
+    def _on_role_picked(self, role):
+        """选择角色后关闭对话框"""
+        self.select_role(role)
+        self.app.select_role_dialog.open = False
+        self.page.update()
+
+    def _on_roles_changed(self):
+        """角色有增删改时，下次打开角色选择列表重新获取角色"""
+        self._picker_roles_stale = True
+
     async def select_role_with_upload(self, role):
         """选择角色并处理文件上传（如果在移动端）"""
         # 获取当前选择的模式
@@ -364,6 +573,9 @@ class CloneCallbacks:
             self._show_error_dialog("无法播放音频：文件不存在")
             return
         
+        # 手动播放时停止分段自动播放
+        self._reset_segment_playback()
+        
         # 使用音频管理器播放/停止音频
         self.app.audio_manager.play_audio(
             audio_file,
@@ -1,12 +1,40 @@
+import asyncio
+import threading
 import app.core.mlog as mlog
 
 class HistoryCallbacks:
+    # 输入搜索词后等待的秒数，期间继续输入则重新计时
+    SEARCH_DEBOUNCE = 0.3
+
     def __init__(self, app, page, history_manager, audio_manager, global_audio_state):
         self.app = app
         self.page = page
         self.history_manager = history_manager
         self.audio_manager = audio_manager
         self.global_audio_state = global_audio_state
+        
+        # 当前的列表加载任务，开始新的加载时取消旧任务并丢弃其结果
+        self._load_task = None
+        self._load_token = 0
+        self._load_lock = threading.Lock()
+
+    def _start_load(self, handler, *args):
+        """
+        在界面事件循环中启动列表加载任务，取代尚未完成的旧任务
+        
+        Args:
+            handler: 加载协程函数，第一个参数为本次加载的序号
+            *args: 其余参数
+        """
+        with self._load_lock:
+            if self._load_task is not None and not self._load_task.done():
+                self._load_task.cancel()
+            self._load_token += 1
+            self._load_task = self.page.run_task(handler, self._load_token, *args)
+
+    def _is_stale(self, token):
+        """加载结果是否已被之后的加载取代"""
+        return token != self._load_token
 
     def history_on_play(self, item, play_button):
         """播放历史记录音频"""
@@ -18,10 +46,23 @@ class HistoryCallbacks:
 
     def history_on_delete(self, item, container):
         """删除历史记录项"""
-        self.history_manager.delete_record(item)
+        self.page.run_task(self._delete_record, item, container)
+
+    async def _delete_record(self, item, container):
+        """删除记录后刷新列表"""
+        try:
+            await self.history_manager.adelete_record(item)
+        except Exception as e:
+            mlog.error(f"删除历史记录失败: {str(e)}")
+            return
+        
+        # 移动端为滚动加载的列表，直接移除该项以保持滚动位置
+        if self.app.history_page.is_mobile:
+            self.app.history_page.remove_history_item(item, container)
+            return
         
         # 重新计算总页数并加载当前页
-        total = self.history_manager.get_filtered_count(self.app.history_page.current_keyword)
+        total = await self.history_manager.aget_filtered_count(self.app.history_page.current_keyword)
         
         # 如果当前页已经没有数据，则回到上一页
         page = self.app.history_page.current_page
@@ -56,13 +97,10 @@ class HistoryCallbacks:
             self.app.clone_page.set_parameters({'speaker_text': item['speaker_text']})
 
     def history_on_filter(self, keyword, page=1, page_size=None):
-        """根据关键词过滤历史记录"""
-        # 确保使用提供的页面大小，或者默认使用当前页面设置
+        """根据关键词过滤历史记录，输入停顿后才查询"""
         page_size = page_size if page_size is not None else self.app.history_page.page_size
-        
-        filtered = self.history_manager.filter_history_paged(keyword, page, page_size)
-        total = self.history_manager.get_filtered_count(keyword)
-        self.app.history_page.update_history_list(filtered, self.global_audio_state, total)
+        self.app.history_page.page_size = page_size
+        self._start_load(self._load_page, page, page_size, keyword, None, None, self.SEARCH_DEBOUNCE)
 
     def history_on_clear_filter(self):
         """清除历史记录过滤器"""
@@ -73,7 +111,7 @@ class HistoryCallbacks:
         """获取全局音频状态"""
         return self.global_audio_state
 
-    def history_on_page_change(self, page, page_size=None, keyword=""):
+    def history_on_page_change(self, page, page_size=None, keyword="", after=None, before=None):
         """
         页面变化回调
         
@@ -81,6 +119,8 @@ class HistoryCallbacks:
             page: 页码
             page_size: 每页显示数量
             keyword: 搜索关键词
+            after: 上一页最后一条记录的游标(可选)
+            before: 下一页第一条记录的游标(可选)
         """
         # 确保使用提供的页面大小，或者默认使用当前页面设置
         page_size = page_size if page_size is not None else self.app.history_page.page_size
@@ -88,32 +128,76 @@ class HistoryCallbacks:
         # 强制记录参数
         mlog.debug(f"历史页面回调 - 加载页码: {page}, 每页显示: {page_size}, 关键词: '{keyword}'")
         
-        try:
+        self.app.history_page.page_size = page_size
+        self._start_load(self._load_page, page, page_size, keyword, after, before)
 
-            self.app.history_page.page_size = page_size
+    async def _load_page(self, token, page, page_size, keyword, after, before, delay=0):
+        """在数据库线程中查询一页记录和总数，完成后更新列表并预取下一页"""
+        try:
+            if delay:
+                # 搜索词仍在输入时本任务会被取消，只查询最终的关键词
+                await asyncio.sleep(delay)
             
-            # 获取筛选或全部数据
-            if keyword:
-                history = self.history_manager.filter_history_paged(keyword, page, page_size)
-                total = self.history_manager.get_filtered_count(keyword)
-            else:
-                history = self.history_manager.get_history_paged(page, page_size)
-                total = self.history_manager.get_total_history()
+            # 当前页和筛选后的总数在同一次数据库调用中获取
+            history, total = await self.history_manager.aget_history_page(keyword, page, page_size, after, before)
+            
+            # 期间已开始新的加载（如继续输入搜索词），丢弃本次结果
+            if self._is_stale(token):
+                return
             
             mlog.debug(f"历史页面回调 - 获取到 {len(history)} 条记录, 共 {total} 条")
             
-            def update_ui():
-                # 更新历史列表
-                self.app.history_page.update_history_list(history, self.global_audio_state, total)
-                # 触发页面整体更新
-                self.page.update()
-                
-            # 在主线程中安全更新UI
-            update_ui()
+            # 更新历史列表
+            self.app.history_page.update_history_list(history, self.global_audio_state, total)
+            # 触发页面整体更新
+            self.page.update()
+            
+            # 预取下一页，翻页时直接命中缓存；移动端滚动加载按游标查询，不预取
+            if history and page * page_size < total and not self.app.history_page.is_mobile:
+                last = history[-1]
+                self.page.run_task(self._prefetch, page + 1, page_size, keyword, (last['timestamp'], last['id']))
             
         except Exception as e:
             mlog.error(f"历史页面更新失败: {str(e)}")
     
+    async def _prefetch(self, page, page_size, keyword, after):
+        """后台查询下一页，结果保存在历史记录管理器的缓存中"""
+        try:
+            await self.history_manager.aget_history_page(keyword, page, page_size, after)
+        except Exception as e:
+            mlog.debug(f"预取历史记录失败: {str(e)}")
+    
+    def refresh_history(self):
+        """记录有变化时重新加载当前页"""
+        history_page = self.app.history_page
+        page = 1 if history_page.is_mobile else history_page.current_page
+        self.history_on_page_change(page, history_page.page_size, history_page.current_keyword)
+    
+    def history_on_load_more(self, page_size, keyword, after):
+        """
+        移动端滚动到底部时加载下一页
+        
+        Args:
+            page_size: 每页显示数量
+            keyword: 搜索关键词
+            after: 已加载的最后一条记录的游标
+        """
+        self._start_load(self._load_more, page_size, keyword, after)
+
+    async def _load_more(self, token, page_size, keyword, after):
+        """查询下一页并追加到列表"""
+        try:
+            if keyword:
+                history = await self.history_manager.afilter_history_paged(keyword, None, page_size, after)
+            else:
+                history = await self.history_manager.aget_history_paged(None, page_size, after)
+        except Exception as e:
+            mlog.error(f"加载更多历史记录失败: {str(e)}")
+            history = []
+        
+        if not self._is_stale(token):
+            self.app.history_page.update_history_list(history, self.global_audio_state, append=True)
+    
     def history_on_page_size_change(self, new_size, new_page, keyword=""):
         """
         页面大小变更回调
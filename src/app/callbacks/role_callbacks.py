@@ -1,37 +1,72 @@
+import asyncio
+import threading
 import flet as ft
 import app.core.mlog as mlog
 
 class RoleCallbacks:
+    # 输入搜索词后等待的秒数，期间继续输入则重新计时
+    SEARCH_DEBOUNCE = 0.3
+
     def __init__(self, app, page, role_manager):
         self.app = app
         self.page = page
         self.role_manager = role_manager
+        
+        # 当前的列表加载任务，开始新的加载时取消旧任务并丢弃其结果
+        self._load_task = None
+        self._load_token = 0
+        self._load_lock = threading.Lock()
 
-    def roles_on_add_role(self, role):
-        """添加新角色"""
-        self.role_manager.add_role(role)
-        # 重新加载当前页数据
+    def _start_load(self, handler, *args):
+        """
+        在界面事件循环中启动列表加载任务，取代尚未完成的旧任务
+        
+        Args:
+            handler: 加载协程函数，第一个参数为本次加载的序号
+            *args: 其余参数
+        """
+        with self._load_lock:
+            if self._load_task is not None and not self._load_task.done():
+                self._load_task.cancel()
+            self._load_token += 1
+            self._load_task = self.page.run_task(handler, self._load_token, *args)
+
+    def _is_stale(self, token):
+        """加载结果是否已被之后的加载取代"""
+        return token != self._load_token
+
+    def _reload_current_page(self):
+        """重新加载当前页数据"""
         self.roles_on_page_change(
             self.app.roles_page.current_page, 
             self.app.roles_page.page_size,
             self.app.roles_page.current_keyword
         )
 
+    def roles_on_add_role(self, role):
+        """添加新角色"""
+        self.page.run_task(self._add_role, role)
+
+    async def _add_role(self, role):
+        await self.role_manager.aadd_role(role)
+        self._reload_current_page()
+
     def roles_on_edit_role(self, role):
         """编辑角色信息"""
-        self.role_manager.update_role(role)
-        # 重新加载当前页数据
-        self.roles_on_page_change(
-            self.app.roles_page.current_page, 
-            self.app.roles_page.page_size,
-            self.app.roles_page.current_keyword
-        )
+        self.page.run_task(self._edit_role, role)
+
+    async def _edit_role(self, role):
+        await self.role_manager.aupdate_role(role)
+        self._reload_current_page()
 
     def roles_on_delete_role(self, role):
         """删除角色"""
-        self.role_manager.delete_role(role)
+        self.page.run_task(self._delete_role, role)
+
+    async def _delete_role(self, role):
+        await self.role_manager.adelete_role(role)
         # 重新计算总页数并加载当前页
-        total = self.role_manager.get_filtered_count(self.app.roles_page.current_keyword)
+        total = await self.role_manager.aget_filtered_count(self.app.roles_page.current_keyword)
         
         # 如果当前页已经没有数据，则回到上一页
         page = self.app.roles_page.current_page
@@ -46,47 +81,73 @@ class RoleCallbacks:
         )
 
     def roles_on_filter(self, keyword, page=1, page_size=None):
-        """根据关键词过滤角色"""
-        # 如果没有提供page_size，则使用当前页面设置的大小
+        """根据关键词过滤角色，输入停顿后才查询"""
         page_size = page_size if page_size is not None else self.app.roles_page.page_size
-        
-        filtered = self.role_manager.filter_roles_paged(keyword, page, page_size)
-        total = self.role_manager.get_filtered_count(keyword)
-        self.app.roles_page.update_roles_list(filtered, total)
+        self.app.roles_page.current_page = page
+        self.app.roles_page.page_size = page_size
+        self._start_load(self._load_page, page, page_size, keyword, None, None, self.SEARCH_DEBOUNCE)
 
     def roles_on_clear_filter(self):
         """清除角色过滤器"""
         self.app.roles_page.current_keyword = ""
         self.roles_on_page_change(1, self.app.roles_page.page_size, "")
 
-    def roles_on_page_change(self, page, page_size=None, keyword=""):
-        """页面变化回调"""
+    def roles_on_page_change(self, page, page_size=None, keyword="", after=None, before=None):
+        """
+        页面变化回调
+        
+        Args:
+            page: 页码
+            page_size: 每页显示数量
+            keyword: 搜索关键词
+            after: 上一页最后一个角色的游标(可选)
+            before: 下一页第一个角色的游标(可选)
+        """
         # 确保使用提供的页面大小，或者默认使用当前页面设置
         page_size = page_size if page_size is not None else self.app.roles_page.page_size
         
         # 强制记录参数
         mlog.debug(f"角色页面回调 - 加载页码: {page}, 每页显示: {page_size}, 关键词: '{keyword}'")
         
+        # 强制更新当前页面的设置
+        self.app.roles_page.current_page = page
+        self.app.roles_page.page_size = page_size
+        self._start_load(self._load_page, page, page_size, keyword, after, before)
+
+    async def _load_page(self, token, page, page_size, keyword, after, before, delay=0):
+        """在数据库线程中查询一页角色和总数，完成后更新列表并预取下一页"""
         try:
-            # 强制更新当前页面的设置
-            self.app.roles_page.current_page = page
-            self.app.roles_page.page_size = page_size
+            if delay:
+                # 搜索词仍在输入时本任务会被取消，只查询最终的关键词
+                await asyncio.sleep(delay)
             
-            # 获取筛选或全部数据
-            if keyword:
-                roles = self.role_manager.filter_roles_paged(keyword, page, page_size)
-                total = self.role_manager.get_filtered_count(keyword)
-            else:
-                roles = self.role_manager.get_roles_paged(page, page_size)
-                total = self.role_manager.get_total_roles()
+            # 当前页和筛选后的总数在同一次数据库调用中获取
+            roles, total = await self.role_manager.aget_roles_page(keyword, page, page_size, after, before)
+            
+            # 期间已开始新的加载（如继续输入搜索词），丢弃本次结果
+            if self._is_stale(token):
+                return
             
             mlog.debug(f"角色页面回调 - 获取到 {len(roles)} 条记录, 共 {total} 条")
             self.app.roles_page.update_roles_list(roles, total)
             
+            # 预取下一页，翻页时直接命中缓存
+            if roles and page * page_size < total:
+                last = roles[-1]
+                self.page.run_task(self._prefetch, page + 1, page_size, keyword, (last['name'], last['id']))
+            
         except Exception as e:
             mlog.error(f"角色页面回调异常: {str(e)}")
             # 确保至少显示一个空列表，防止UI崩溃
-            self.app.roles_page.update_roles_list([], 0)
+            if not self._is_stale(token):
+                self.app.roles_page.update_roles_list([], 0)
+    
+    async def _prefetch(self, page, page_size, keyword, after):
+        """后台查询下一页，结果保存在角色管理器的缓存中"""
+        try:
+            await self.role_manager.aget_roles_page(keyword, page, page_size, after)
+        except Exception as e:
+            mlog.debug(f"预取角色失败: {str(e)}")
 
     def roles_on_page_size_change(self, new_size, new_page, keyword=""):
         """
@@ -31,10 +31,20 @@ class SettingsCallbacks:
 
     def settings_on_save_api_settings(self, api_settings):
         """保存API设置"""
+        # 输入框每次修改都会保存，只有地址或节点列表变化时才重新配置节点和心跳
+        previous = (self.settings_manager.get('api_url'), self.settings_manager.get('api_endpoints', []))
+        
         # 更新设置
         self.settings_manager.update(api_settings)
         self.settings_manager.save_settings()
         
+        current = (api_settings['api_url'], api_settings.get('api_endpoints', []))
+        if current != previous:
+            # 更新负载均衡节点，心跳切换到新的API地址
+            self.api_manager.set_endpoints(*current)
+            self.api_manager.stop_heartbeat()
+            self.api_manager.start_heartbeat(api_settings['api_url'])
+        
         # 重新测试连接
         run_async(self.settings_on_test_connection(api_settings['api_url']))
 
@@ -57,17 +67,24 @@ class SettingsCallbacks:
             # 获取模型设置
             host = self.settings_manager.get('model_host', '127.0.0.1')
             port = self.settings_manager.get('model_port', '8000')
+            workers = self.settings_manager.get('model_workers', 'auto')
+            start_timeout = self.settings_manager.get('model_start_timeout', 300)
+            idle_timeout = self.settings_manager.get('model_idle_timeout', 30)
+            fast_start = self.settings_manager.get('model_fast_start', True)
             
-            # 定义更新输出的回调
-            def update_output(output_text):
-                settings_page.update_model_output(output_text)
+            # 清空上次的输出，之后只追加新增的行
+            settings_page.update_model_output("")
             
             # 运行模型，传入 path_manager
             success, error = self.model_manager.run_model(
                 host, port, 
-                update_output, 
+                settings_page.append_model_output, 
                 settings_page.update_model_status,
-                path_manager=self.path_manager
+                path_manager=self.path_manager,
+                workers=workers,
+                start_timeout=start_timeout,
+                idle_timeout=idle_timeout,
+                fast_start=fast_start
             )
             
             # 处理模型缺失的情况
@@ -127,6 +144,11 @@ class SettingsCallbacks:
         """清除缓存目录"""
         return self.path_manager.clear_cache()
         
+    def settings_on_clear_synthesis_cache(self):
+        """清空合成结果缓存，返回清空后的统计信息"""
+        self.app.synthesis_cache.clear()
+        return self.app.synthesis_cache.get_stats()
+        
     def settings_on_logging_change(self, logging_enabled):
         """更改日志启用状态"""
         try:
@@ -1,138 +1,1160 @@
 import json
 import aiohttp
-import websockets
+import asyncio
+import threading
 import os
+import time
+import shutil
+import io
+import wave
+from collections import OrderedDict
+from urllib.parse import urlparse
+import app.core.mlog as mlog
+
+class _EndpointError(Exception):
+    """节点连接失败或中途断开，可以换到其他节点重试"""
 
 class ApiManager:
     """
     API管理类，负责与API服务器通信
+
+    所有网络请求都在ApiManager自己的事件循环线程中执行，每个API地址复用一个
+    长连接的ClientSession（keep-alive + 有界连接池）以及/ws/generate的WebSocket连接，
+    避免每次生成都重新建立TCP/TLS连接。
     """
+    # 每个API地址的最大连接数
+    POOL_LIMIT = 8
+    # 空闲keep-alive连接保留时间(秒)
+    KEEPALIVE_TIMEOUT = 60
+    # 每个API地址最多保留的空闲WebSocket数量
+    MAX_IDLE_WEBSOCKETS = 4
+    # 连接检查超时时间(秒)
+    CHECK_TIMEOUT = 10
+    # 后台心跳检查间隔(秒)
+    HEARTBEAT_INTERVAL = 15
+    # 缓存的健康状态有效期(秒)
+    HEALTH_TTL = 45
+    # 上传时每次从文件读取的字节数
+    UPLOAD_READ_SIZE = 64 * 1024
+    # 超过该大小的文件使用分块上传，支持断点续传
+    CHUNKED_UPLOAD_THRESHOLD = 4 * 1024 * 1024
+    # 分块上传时每个请求的大小，低于常见反向代理默认的1MB请求体限制
+    UPLOAD_CHUNK_SIZE = 512 * 1024
+    # 节点延迟的指数加权移动平均系数
+    LATENCY_ALPHA = 0.3
+    # 最多记录的生成结果所在节点数
+    MAX_RESULT_NODES = 256
+
     def __init__(self,pathmanager):
         """初始化API管理器"""
         self.path_manager = pathmanager
         self.temp_dir = self.path_manager.temp_dir
         self.history_dir = self.path_manager.history_dir
-        
+
         # 确保目录存在
         os.makedirs(self.temp_dir, exist_ok=True)
         os.makedirs(self.history_dir, exist_ok=True)
-    
+
+        # 按API地址缓存的会话和空闲WebSocket，仅在self._loop中访问
+        self._sessions = {}
+        self._idle_websockets = {}
+        self._heartbeat_tasks = {}
+
+        # 按API地址缓存的健康状态: {"ok": bool, "message": str, "checked_at": float}
+        self._health = {}
+
+        # 负载均衡状态，仅在self._loop中访问
+        # 本地多进程模型: API地址 -> 各工作进程地址
+        self._workers = {}
+        # 远程节点: API地址 -> [(节点地址, 权重)]
+        self._endpoints = {}
+        # 各节点在途的生成请求数和响应延迟
+        self._outstanding = {}
+        self._latency = {}
+        self._worker_cursor = 0
+        # 参考音频: 服务器路径 -> (本地路径, 哈希)，以及 (节点, 哈希) -> 节点上的路径
+        self._prompt_sources = {}
+        self._node_uploads = {}
+        # 生成结果文件名 -> 所在节点
+        self._result_nodes = OrderedDict()
+
+        # 生成请求前后的回调，见 set_generation_hooks
+        self._before_generation = None
+        self._after_generation = None
+
+        # 独立的事件循环线程，使会话可以跨不同调用方的事件循环复用
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._loop_thread.start()
+
+    def _run_loop(self):
+        """运行网络事件循环"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _submit(self, coroutine):
+        """
+        在ApiManager的事件循环中执行协程，并在调用方的事件循环中等待结果
+
+        Args:
+            coroutine: 要执行的协程
+
+        Returns:
+            协程的返回值
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        return await asyncio.wrap_future(future)
+
+    @staticmethod
+    def _in_caller_loop(callback):
+        """
+        包装回调函数，使其在调用方的事件循环中执行
+
+        网络请求在ApiManager的事件循环线程中进行，进度回调若直接在该线程中更新界面，
+        会与界面线程竞争，界面更新阻塞时也会拖慢其他网络请求。需在调用方的协程中调用。
+
+        Args:
+            callback: 回调函数，可以为None
+
+        Returns:
+            可在任意线程中调用的回调函数，callback为None时返回None
+        """
+        if callback is None:
+            return None
+        caller_loop = asyncio.get_running_loop()
+
+        def dispatch(*args):
+            caller_loop.call_soon_threadsafe(callback, *args)
+        return dispatch
+
+    @staticmethod
+    def _normalize_url(api_url):
+        """去掉API地址末尾的斜杠，作为会话缓存的键"""
+        return (api_url or "").rstrip('/')
+
+    @staticmethod
+    def _ws_url(api_url, path):
+        """
+        将HTTP地址转换为WebSocket地址
+
+        Args:
+            api_url: API地址
+            path: WebSocket路径
+
+        Returns:
+            str: WebSocket地址
+        """
+        parsed = urlparse(api_url)
+        if parsed.scheme in ("http", "https"):
+            scheme = "wss" if parsed.scheme == "https" else "ws"
+            return f"{scheme}://{parsed.netloc}{parsed.path.rstrip('/')}{path}"
+        # 未带协议的地址按ws处理
+        return f"ws://{api_url.rstrip('/')}{path}"
+
+    def _get_session(self, api_url):
+        """
+        获取指定API地址的长连接会话，不存在时创建
+
+        Args:
+            api_url: API地址
+
+        Returns:
+            aiohttp.ClientSession: 会话对象
+        """
+        key = self._normalize_url(api_url)
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.POOL_LIMIT,
+                keepalive_timeout=self.KEEPALIVE_TIMEOUT
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[key] = session
+            mlog.debug(f"创建API会话: {key}")
+        return session
+
+    async def _acquire_websocket(self, api_url):
+        """
+        获取一个可用的生成WebSocket，优先复用空闲连接
+
+        Args:
+            api_url: API地址
+
+        Returns:
+            tuple: (WebSocket连接, 是否为复用的连接)
+        """
+        idle = self._idle_websockets.setdefault(self._normalize_url(api_url), [])
+        while idle:
+            websocket = idle.pop()
+            if not websocket.closed:
+                return websocket, True
+        session = self._get_session(api_url)
+        websocket = await session.ws_connect(self._ws_url(api_url, "/ws/generate"), heartbeat=30)
+        return websocket, False
+
+    async def _release_websocket(self, api_url, websocket):
+        """
+        归还WebSocket连接，空闲连接过多时直接关闭
+
+        Args:
+            api_url: API地址
+            websocket: WebSocket连接
+        """
+        idle = self._idle_websockets.setdefault(self._normalize_url(api_url), [])
+        if not websocket.closed and len(idle) < self.MAX_IDLE_WEBSOCKETS:
+            idle.append(websocket)
+        else:
+            await websocket.close()
+
+    @staticmethod
+    def _build_generate_request(params):
+        """
+        构造生成请求参数
+
+        Args:
+            params: 音频生成参数
+
+        Returns:
+            dict: 请求数据
+        """
+        request = {
+            "text": params.get('text', ''),
+            "speed": params.get('speed', 1.0),
+        }
+        # 根据不同模式添加对应参数
+        if params.get('mode') == "zero_shot":
+            request["speaker"] = params.get('speaker_text', '')
+        elif params.get('mode') == "language_control":
+            request["instruction"] = params.get('instruction', '')
+
+        if params.get('prompt'):
+            request["prompt_speech_path"] = params.get('prompt')
+        return request
+
     async def check_connection(self, api_url):
         """
-        检查API连接
-        
+        检查API连接，配置了多个节点时任一节点可用即视为连接成功
+
+        Args:
+            api_url: API地址
+
+        Returns:
+            tuple: (是否连接成功, 消息)
+        """
+        return await self._submit(self._check_group(api_url))
+
+    async def check_endpoint(self, api_url):
+        """
+        只检查单个地址的连接，不包括其负载均衡节点
+
         Args:
             api_url: API地址
-        
+
         Returns:
             tuple: (是否连接成功, 消息)
         """
+        return await self._submit(self._check_connection(api_url))
+
+    async def _check_group(self, api_url):
+        """检查API地址及其所有远程节点（在网络事件循环中执行）"""
+        nodes = self._group_nodes(self._normalize_url(api_url))
+        results = await asyncio.gather(*(self._check_connection(node) for node in nodes))
+        if len(nodes) == 1:
+            return results[0]
+        available = sum(1 for ok, _ in results if ok)
+        if available:
+            return True, f"API连接成功（可用节点 {available}/{len(nodes)}）"
+        return False, results[0][1]
+
+    async def _check_connection(self, api_url):
+        """检查API连接并刷新健康状态缓存（在网络事件循环中执行）"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{api_url}/model_status") as response:
-                    if response.status == 200:
-                        return True, "API连接成功"
-                    return False, f"API连接失败: HTTP {response.status}"
+            session = self._get_session(api_url)
+            timeout = aiohttp.ClientTimeout(total=self.CHECK_TIMEOUT)
+            started = time.monotonic()
+            async with session.get(f"{self._normalize_url(api_url)}/model_status", timeout=timeout) as response:
+                if response.status == 200:
+                    self._record_latency(self._normalize_url(api_url), time.monotonic() - started)
+                    result = (True, "API连接成功")
+                else:
+                    result = (False, f"API连接失败: HTTP {response.status}")
         except Exception as e:
-            return False, f"API连接失败: {str(e)}"
-    
+            result = (False, f"API连接失败: {str(e)}")
+
+        self._health[self._normalize_url(api_url)] = {
+            "ok": result[0],
+            "message": result[1],
+            "checked_at": time.monotonic(),
+        }
+        return result
+
+    def get_cached_health(self, api_url):
+        """
+        获取缓存的健康状态
+
+        Args:
+            api_url: API地址
+
+        Returns:
+            tuple: (是否连接成功, 消息)，缓存不存在或已过期时返回None；
+                   配置了多个节点时任一节点可用即视为连接成功
+        """
+        fresh = []
+        for node in self._group_nodes(self._normalize_url(api_url)):
+            health = self._health.get(node)
+            if health is not None and time.monotonic() - health["checked_at"] <= self.HEALTH_TTL:
+                if health["ok"]:
+                    return True, health["message"]
+                fresh.append(health)
+        if not fresh:
+            return None
+        return False, fresh[0]["message"]
+
+    def invalidate_health(self, api_url):
+        """
+        使缓存的健康状态失效，下次使用前需要重新检查
+
+        Args:
+            api_url: API地址
+        """
+        self._health.pop(self._normalize_url(api_url), None)
+
+    async def _heartbeat(self, api_url):
+        """后台心跳，定期刷新API地址及其远程节点的健康状态缓存"""
+        while True:
+            await self._check_group(api_url)
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+
+    def start_heartbeat(self, api_url):
+        """
+        启动指定API地址的后台心跳检查
+
+        Args:
+            api_url: API地址
+        """
+        key = self._normalize_url(api_url)
+
+        def _start():
+            task = self._heartbeat_tasks.get(key)
+            if task is None or task.done():
+                self._heartbeat_tasks[key] = self._loop.create_task(self._heartbeat(key))
+
+        self._loop.call_soon_threadsafe(_start)
+
+    def stop_heartbeat(self, api_url=None):
+        """
+        停止后台心跳检查
+
+        Args:
+            api_url: API地址，为None时停止所有心跳
+        """
+        def _stop():
+            keys = list(self._heartbeat_tasks) if api_url is None else [self._normalize_url(api_url)]
+            for key in keys:
+                task = self._heartbeat_tasks.pop(key, None)
+                if task is not None:
+                    task.cancel()
+
+        self._loop.call_soon_threadsafe(_stop)
+
+    def set_workers(self, api_url, worker_urls):
+        """
+        登记API地址对应的多个本地模型工作进程，发往该地址的生成请求将分配到这些进程
+
+        Args:
+            api_url: API地址
+            worker_urls: 工作进程地址列表，为空时直接使用API地址
+        """
+        key = self._normalize_url(api_url)
+        urls = [self._normalize_url(url) for url in worker_urls]
+
+        def _set():
+            if urls:
+                self._workers[key] = urls
+            else:
+                self._workers.pop(key, None)
+
+        self._loop.call_soon_threadsafe(_set)
+
+    def set_endpoints(self, api_url, endpoints):
+        """
+        登记API地址对应的其他远程节点，生成请求在API地址和这些节点之间负载均衡
+
+        Args:
+            api_url: API地址
+            endpoints: 节点列表，每项为 {"url": 地址, "weight": 权重}；
+                       包含API地址本身时以其权重为准，为空时只使用API地址
+        """
+        key = self._normalize_url(api_url)
+        nodes = []
+        for endpoint in endpoints or []:
+            url = self._normalize_url(endpoint.get("url"))
+            if url and url not in [node[0] for node in nodes]:
+                nodes.append((url, max(float(endpoint.get("weight") or 1), 0.01)))
+
+        def _set():
+            if nodes:
+                self._endpoints[key] = nodes
+            else:
+                self._endpoints.pop(key, None)
+
+        self._loop.call_soon_threadsafe(_set)
+
+    def _group_nodes(self, key):
+        """API地址及其远程节点的地址列表"""
+        nodes = [key]
+        for url, _ in self._endpoints.get(key, []):
+            if url not in nodes:
+                nodes.append(url)
+        return nodes
+
+    def _candidates(self, key):
+        """
+        生成请求可用的节点及权重（在网络事件循环中执行）
+
+        Returns:
+            list: [(地址, 权重)]
+        """
+        weights = dict(self._endpoints.get(key, []))
+        candidates = [(url, 1.0) for url in self._workers.get(key, [])]
+        if not candidates:
+            candidates = [(key, weights.get(key, 1.0))]
+        for url, weight in self._endpoints.get(key, []):
+            if url not in [candidate[0] for candidate in candidates]:
+                candidates.append((url, weight))
+        return candidates
+
+    def _is_available(self, url):
+        """健康状态未知、已过期或正常的节点视为可用"""
+        health = self._health.get(url)
+        if health is None or time.monotonic() - health["checked_at"] > self.HEALTH_TTL:
+            return True
+        return health["ok"]
+
+    def _record_latency(self, url, seconds):
+        """以指数加权移动平均记录节点的响应延迟"""
+        previous = self._latency.get(url)
+        if previous is None:
+            self._latency[url] = seconds
+        else:
+            self._latency[url] = previous + self.LATENCY_ALPHA * (seconds - previous)
+
+    def _acquire_worker(self, api_url, exclude=()):
+        """
+        选择负载最低的节点（在网络事件循环中执行）
+
+        评分为 延迟 × (在途请求数 + 1) / 权重，优先选择健康的节点；
+        评分相同时轮流选择，使空闲时的请求也能分散到各节点。
+
+        Args:
+            api_url: API地址
+            exclude: 本次请求已失败的节点
+
+        Returns:
+            str: 实际发送请求的地址，没有可用节点时返回None
+        """
+        key = self._normalize_url(api_url)
+        candidates = [c for c in self._candidates(key) if c[0] not in exclude]
+        if not candidates:
+            return None
+        healthy = [c for c in candidates if self._is_available(c[0])]
+        candidates = healthy or candidates
+
+        # 尚未测得延迟的节点按已知的最低延迟估计，使其能被尝试
+        known = [self._latency[url] for url, _ in candidates if url in self._latency]
+        default_latency = min(known) if known else 1.0
+
+        self._worker_cursor = (self._worker_cursor + 1) % len(candidates)
+        ordered = candidates[self._worker_cursor:] + candidates[:self._worker_cursor]
+        target = min(
+            ordered,
+            key=lambda c: self._latency.get(c[0], default_latency) * (self._outstanding.get(c[0], 0) + 1) / c[1]
+        )[0]
+        self._outstanding[target] = self._outstanding.get(target, 0) + 1
+        return target
+
+    def _release_worker(self, target):
+        """请求完成后减少节点的在途请求数（在网络事件循环中执行）"""
+        remaining = self._outstanding.get(target, 0) - 1
+        if remaining > 0:
+            self._outstanding[target] = remaining
+        else:
+            self._outstanding.pop(target, None)
+
+    def _mark_failed(self, url, message):
+        """将出错的节点标记为不可用，直到下一次心跳检查"""
+        self._health[url] = {
+            "ok": False,
+            "message": message,
+            "checked_at": time.monotonic(),
+        }
+
+    def register_upload(self, api_url, server_path, file_path, file_hash):
+        """
+        记录上传到API地址的参考音频，请求被分配到其他节点时据此同步文件
+
+        Args:
+            api_url: 上传到的API地址
+            server_path: 服务器返回的相对路径
+            file_path: 本地文件路径
+            file_hash: 文件的SHA-256
+        """
+        key = self._normalize_url(api_url)
+
+        def _register():
+            self._prompt_sources[server_path] = (file_path, file_hash)
+            self._node_uploads[(key, file_hash)] = server_path
+
+        self._loop.call_soon_threadsafe(_register)
+
+    async def _prepare_prompt(self, target, params):
+        """
+        确保参考音频在目标节点上存在，并替换为该节点上的路径（在网络事件循环中执行）
+
+        Returns:
+            dict: 发送到目标节点的生成参数
+        """
+        source = self._prompt_sources.get(params.get('prompt'))
+        if source is None:
+            return params
+        file_path, file_hash = source
+
+        server_path = self._node_uploads.get((target, file_hash))
+        if server_path is None:
+            exists, server_path = await self._check_upload(target, file_hash)
+            if not exists:
+                success, server_path = await self._upload_file(target, file_path, file_hash)
+                if not success:
+                    raise _EndpointError(f"同步参考音频到 {target} 失败: {server_path}")
+            self._node_uploads[(target, file_hash)] = server_path
+
+        params = dict(params)
+        params['prompt'] = server_path
+        return params
+
+    async def _generate_routed(self, api_url, params, attempt, can_retry=None):
+        """
+        将生成请求分配到节点，节点出错时换到其他节点重试（在网络事件循环中执行）
+
+        Args:
+            api_url: API地址
+            params: 生成参数
+            attempt: 协程函数，参数为(节点地址, 生成参数)，节点不可用时抛出 _EndpointError
+            can_retry: 返回是否允许重试的函数，例如流式音频已开始输出时不能重试
+
+        Returns:
+            tuple: (是否成功, 结果文件路径或错误消息)
+        """
+        failed = set()
+        error = "没有可用的API节点"
+        while True:
+            target = self._acquire_worker(api_url, failed)
+            if target is None:
+                return False, error
+            try:
+                request_params = await self._prepare_prompt(target, params)
+                success, result = await attempt(target, request_params)
+                if success and result and target != self._normalize_url(api_url):
+                    # 记录结果所在的节点，下载时从该节点获取
+                    self._result_nodes[os.path.basename(result.replace('\\', '/'))] = target
+                    while len(self._result_nodes) > self.MAX_RESULT_NODES:
+                        self._result_nodes.popitem(last=False)
+                return success, result
+            except _EndpointError as e:
+                error = str(e)
+                failed.add(target)
+                self._mark_failed(target, error)
+                if can_retry is not None and not can_retry():
+                    return False, error
+                mlog.info(f"节点 {target} 出错，尝试其他节点: {error}")
+            finally:
+                self._release_worker(target)
+
+    def set_generation_hooks(self, before=None, after=None):
+        """
+        设置生成请求前后的回调，用于本地模型的空闲停止和按需启动
+
+        Args:
+            before: 协程函数，参数为(API地址, 进度回调)，在发送生成请求前等待其完成
+            after: 函数，参数为(API地址)，生成请求结束后调用
+        """
+        self._before_generation = before
+        self._after_generation = after
+
+    async def _run_generation(self, api_url, coroutine_factory, progress_callback=None):
+        """
+        执行生成请求，前后调用生成回调
+
+        Args:
+            api_url: API地址
+            coroutine_factory: 返回生成协程的函数
+            progress_callback: 进度回调函数
+
+        Returns:
+            tuple: (是否成功, 结果)
+        """
+        if self._before_generation is not None:
+            await self._before_generation(api_url, progress_callback)
+        try:
+            return await coroutine_factory()
+        finally:
+            if self._after_generation is not None:
+                self._after_generation(api_url)
+
     async def generate_audio(self, api_url, params, progress_callback=None):
         """
         生成音频
-        
+
         Args:
             api_url: API地址
             params: 音频生成参数
-            progress_callback: 进度回调函数
-        
+            progress_callback: 进度回调函数，在调用方线程中执行
+
         Returns:
             tuple: (是否成功, 结果文件路径或错误消息)
         """
+        success, result = await self._run_generation(
+            api_url,
+            lambda: self._submit(self._generate_audio(api_url, params, self._in_caller_loop(progress_callback))),
+            progress_callback
+        )
+        if not success:
+            self.invalidate_health(api_url)
+        return success, result
+
+    async def generate_audio_stream(self, api_url, params, on_chunk, progress_callback=None):
+        """
+        以流式方式生成音频，服务器通过WebSocket推送音频块
+
+        服务器先发送 stream_start 消息说明音频格式，随后发送二进制的PCM或WAV数据块，
+        最后发送 complete 消息。不支持流式的服务器会忽略 stream 参数并照常返回文件路径。
+
+        Args:
+            api_url: API地址
+            params: 生成参数
+            on_chunk: 收到音频块时的回调，参数为(PCM数据, 声道数, 采样宽度, 采样率)，在调用方线程中执行
+            progress_callback: 进度回调函数，在调用方线程中执行
+
+        Returns:
+            tuple: (是否成功, 结果)，流式返回时结果为空字符串，否则为服务器上的文件路径或错误消息
+        """
+        return await self._run_generation(
+            api_url,
+            lambda: self._generate_audio_stream(api_url, params, on_chunk, progress_callback),
+            progress_callback
+        )
+
+    async def _generate_audio_stream(self, api_url, params, on_chunk, progress_callback=None):
+        """流式生成音频，音频块在调用方的事件循环中处理"""
+        # 音频块在网络事件循环中接收，转交到调用方的事件循环中处理
+        caller_loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        on_progress = self._in_caller_loop(progress_callback)
+
+        def push(chunk):
+            caller_loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        async def run():
+            try:
+                return await self._generate_audio(api_url, params, on_progress, push)
+            finally:
+                push(None)
+
+        task = asyncio.ensure_future(self._submit(run()))
         try:
-            # 使用 websockets 连接到 fastapi 服务器
-            uri = f"ws://{api_url.replace('http://', '')}/ws/generate"
-            async with websockets.connect(uri) as websocket:
-                # 构造生成请求
-                request = {
-                    "type": "generate",
-                    "text": params.get('text', ''),
-                    "speed": params.get('speed', 1.0),
-                }
-                # 根据不同模式添加对应参数
-                if params.get('mode') == "zero_shot":
-                    request["speaker"] = params.get('speaker_text', '')
-                elif params.get('mode') == "language_control":
-                    request["instruction"] = params.get('instruction', '')
-                    
-                if params.get('prompt'):
-                    request["prompt_speech_path"] = params.get('prompt')
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                on_chunk(*chunk)
+        except Exception as e:
+            task.cancel()
+            return False, f"处理音频数据失败: {str(e)}"
+
+        success, result = await task
+        if not success:
+            self.invalidate_health(api_url)
+        return success, result
+
+    @staticmethod
+    def _decode_audio_chunk(data, stream_format):
+        """
+        解析二进制音频块
+
+        Args:
+            data: 二进制数据，WAV格式或裸PCM
+            stream_format: stream_start 消息给出的格式 (声道数, 采样宽度, 采样率)
+
+        Returns:
+            tuple: (PCM数据, 声道数, 采样宽度, 采样率)
+        """
+        if data[:4] == b"RIFF":
+            with wave.open(io.BytesIO(data), 'rb') as chunk:
+                return (
+                    chunk.readframes(chunk.getnframes()),
+                    chunk.getnchannels(),
+                    chunk.getsampwidth(),
+                    chunk.getframerate(),
+                )
+        if stream_format is None:
+            raise ValueError("收到PCM数据前未收到音频格式")
+        return (data,) + stream_format
+
+    async def _generate_audio(self, api_url, params, progress_callback=None, on_chunk=None):
+        """选择节点并通过WebSocket生成音频（在网络事件循环中执行）"""
+        streamed = False
+
+        def forward(chunk):
+            nonlocal streamed
+            streamed = True
+            on_chunk(chunk)
+
+        async def attempt(target, request_params):
+            return await self._generate_audio_ws(
+                target, request_params, progress_callback, forward if on_chunk else None
+            )
+
+        # 已经输出的音频无法撤回，流式输出开始后不再换节点重试
+        return await self._generate_routed(api_url, params, attempt, lambda: not streamed)
+
+    async def _generate_audio_ws(self, api_url, params, progress_callback=None, on_chunk=None):
+        """通过复用的WebSocket生成音频（在网络事件循环中执行）"""
+        request = {"type": "generate"}
+        request.update(self._build_generate_request(params))
+        if on_chunk:
+            request["stream"] = True
+
+        # 复用的连接可能已被服务器关闭，此时重新连接再试一次
+        for _ in range(2):
+            try:
+                websocket, reused = await self._acquire_websocket(api_url)
+            except Exception as e:
+                raise _EndpointError(str(e))
+
+            received = False
+            stream_format = None
+            try:
                 # 发送请求
-                await websocket.send(json.dumps(request))
-                
+                await websocket.send_str(json.dumps(request))
+                sent_at = time.monotonic()
+
                 # 接收进度和结果
                 while True:
-                    try:
-                        response = await websocket.recv()
-                        data = json.loads(response)
-                        
-                        if data.get("type") == "progress" and progress_callback:
-                            progress_callback(data)
-                        elif data.get("type") == "complete":
-                            if data.get("success"):
-                                return True, data.get("filepath", "")
-                            else:
-                                return False, data.get("message", "未知错误")
-                        elif data.get("type") == "error":
-                            return False, data.get("message", "生成错误")
-                            
-                    except Exception as e:
-                        return False, str(e)
-                        
-        except Exception as e:
-            return False, str(e)
-    
+                    message = await websocket.receive()
+                    if not received and message.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                        self._record_latency(api_url, time.monotonic() - sent_at)
+                    if message.type == aiohttp.WSMsgType.BINARY and on_chunk:
+                        received = True
+                        on_chunk(self._decode_audio_chunk(message.data, stream_format))
+                        continue
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        # 连接被关闭或出错
+                        await websocket.close()
+                        if reused and not received:
+                            break
+                        raise _EndpointError(f"连接已断开: {message.type.name}")
+
+                    received = True
+                    data = json.loads(message.data)
+
+                    if data.get("type") == "progress" and progress_callback:
+                        progress_callback(data)
+                    elif data.get("type") == "stream_start":
+                        stream_format = (
+                            int(data.get("channels", 1)),
+                            int(data.get("sample_width", 2)),
+                            int(data["sample_rate"]),
+                        )
+                    elif data.get("type") == "complete":
+                        await self._release_websocket(api_url, websocket)
+                        if data.get("success"):
+                            return True, data.get("filepath", "")
+                        else:
+                            return False, data.get("message", "未知错误")
+                    elif data.get("type") == "error":
+                        await self._release_websocket(api_url, websocket)
+                        return False, data.get("message", "生成错误")
+
+            except _EndpointError:
+                raise
+            except Exception as e:
+                await websocket.close()
+                if reused and not received:
+                    mlog.debug(f"复用的WebSocket不可用，重新连接: {str(e)}")
+                    continue
+                if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)):
+                    raise _EndpointError(str(e))
+                return False, str(e)
+
+        raise _EndpointError("无法建立WebSocket连接")
+
+    async def generate_segments(self, api_url, params, segments, on_segment, progress_callback=None, lookahead=2):
+        """
+        按顺序合成多个文本片段，前一段未完成时后续片段已提前发出
+
+        Args:
+            api_url: API地址
+            params: 除文本外的公共生成参数
+            segments: 文本片段列表
+            on_segment: 片段按顺序完成时调用的协程函数，参数为(片段序号, 结果文件路径)
+            progress_callback: 整体进度回调函数
+            lookahead: 同时在途的片段数
+
+        Returns:
+            tuple: (是否成功, 错误消息)
+        """
+        total = len(segments)
+        segment_progress = [0.0] * total
+
+        def on_progress(index, progress_info):
+            if isinstance(progress_info, dict):
+                segment_progress[index] = progress_info.get("progress", 0)
+            else:
+                segment_progress[index] = float(progress_info)
+            if progress_callback:
+                progress_callback({
+                    "progress": sum(segment_progress) / total,
+                    "text_progress": f"正在生成第 {index + 1}/{total} 段",
+                })
+
+        def start(index):
+            segment_params = dict(params)
+            segment_params["text"] = segments[index]
+            return asyncio.ensure_future(self.generate_audio(
+                api_url,
+                segment_params,
+                lambda progress_info: on_progress(index, progress_info)
+            ))
+
+        tasks = {index: start(index) for index in range(min(max(1, lookahead), total))}
+        try:
+            for index in range(total):
+                success, result = await tasks.pop(index)
+                if not success:
+                    return False, f"第 {index + 1} 段生成失败: {result}"
+
+                # 当前段完成后立即发出后续片段，保证服务器不空闲
+                next_index = index + max(1, lookahead)
+                if next_index < total:
+                    tasks[next_index] = start(next_index)
+
+                segment_progress[index] = 100
+                await on_segment(index, result)
+            return True, None
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def fetch_result(self, api_url, result, local_path):
+        """
+        将生成结果保存到本地路径，服务器与客户端在同一台机器时直接移动文件，否则下载
+
+        Args:
+            api_url: API地址
+            result: 服务器返回的结果文件路径
+            local_path: 本地保存路径
+
+        Returns:
+            tuple: (是否成功, 本地文件路径或错误消息)
+        """
+        if os.path.exists(result):
+            try:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                shutil.move(result, local_path)
+                return True, local_path
+            except Exception as e:
+                return False, f"移动音频文件失败: {str(e)}"
+        filename = os.path.basename(result.replace('\\', '/'))
+        return await self.download_file(api_url, filename, local_path)
+
     async def generate_audio_rest(self, api_url, params, progress_callback=None):
         """
         使用REST API生成音频（备用方法）
-        
+
         Args:
             api_url: API地址
             params: 音频生成参数
             progress_callback: 进度回调函数
-        
+
         Returns:
             tuple: (是否成功, 结果文件路径或错误消息)
         """
+        success, result = await self._run_generation(
+            api_url,
+            lambda: self._submit(self._generate_audio_rest(api_url, params)),
+            progress_callback
+        )
+        if not success:
+            self.invalidate_health(api_url)
+        return success, result
+
+    async def _generate_audio_rest(self, api_url, params):
+        """使用REST API生成音频（在网络事件循环中执行）"""
+        return await self._generate_routed(api_url, params, self._post_generate)
+
+    async def _post_generate(self, api_url, params):
+        """向指定地址发送REST生成请求（在网络事件循环中执行）"""
         try:
             # 准备请求数据
-            endpoint = f"{api_url}/generate_audio"
-            
-            # 构造请求数据
-            data = {
-                "text": params.get('text', ''),
-                "speed": params.get('speed', 1.0),
-            }
-            
-            # 根据不同模式添加对应参数
-            if params.get('mode') == "zero_shot":
-                data["speaker"] = params.get('speaker_text', '')
-            elif params.get('mode') == "language_control":
-                data["instruction"] = params.get('instruction', '')
-                
-            if params.get('prompt'):
-                data["prompt_speech_path"] = params.get('prompt')
-                
+            endpoint = f"{self._normalize_url(api_url)}/generate_audio"
+            data = self._build_generate_request(params)
+
             # 发送请求
-            async with aiohttp.ClientSession() as session:
-                async with session.post(endpoint, json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get("success"):
-                            return True, result.get("filepath", "")
-                        else:
-                            return False, result.get("message", "未知错误")
+            session = self._get_session(api_url)
+            async with session.post(endpoint, json=data) as response:
+                if response.status in (502, 503, 504):
+                    # 网关或服务暂时不可用，可以换节点重试
+                    raise _EndpointError(f"API返回错误状态码: {response.status}")
+                if response.status == 200:
+                    result = await response.json()
+                    if result.get("success"):
+                        return True, result.get("filepath", "")
                     else:
-                        return False, f"API返回错误状态码: {response.status}"
-                        
+                        return False, result.get("message", "未知错误")
+                else:
+                    return False, f"API返回错误状态码: {response.status}"
+
+        except _EndpointError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
+            raise _EndpointError(str(e))
+        except Exception as e:
+            return False, str(e)
+
+    async def upload_file(self, api_url, file_path, file_hash=None, progress_callback=None, cancel_event=None):
+        """
+        将文件上传到API服务器，文件内容从磁盘分块流式发送
+
+        提供文件哈希且文件较大时优先使用分块上传，中断后再次上传会从服务器已接收的位置继续。
+
+        Args:
+            api_url: API地址
+            file_path: 本地文件路径
+            file_hash: 文件的SHA-256，随文件一起发送以便服务器按内容去重
+            progress_callback: 进度回调函数，参数为(已发送字节数, 文件总字节数)，在调用方线程中执行
+            cancel_event: threading.Event，设置后中止上传
+
+        Returns:
+            tuple: (是否成功, 服务器相对路径或错误消息)
+        """
+        success, result = await self._submit(
+            self._upload_file(api_url, file_path, file_hash, self._in_caller_loop(progress_callback), cancel_event)
+        )
+        if success and file_hash:
+            self.register_upload(api_url, result, file_path, file_hash)
+        elif not success and not (cancel_event and cancel_event.is_set()):
+            self.invalidate_health(api_url)
+        return success, result
+
+    async def check_upload(self, api_url, file_hash, file_path=None):
+        """
+        询问API服务器是否已有指定哈希的上传文件
+
+        Args:
+            api_url: API地址
+            file_hash: 文件的SHA-256
+            file_path: 本地文件路径，提供时记录下来以便同步到其他节点
+
+        Returns:
+            tuple: (是否已存在, 服务器相对路径)，服务器不支持查询时是否已存在为None
+        """
+        exists, server_path = await self._submit(self._check_upload(api_url, file_hash))
+        if exists and file_path:
+            self.register_upload(api_url, server_path, file_path, file_hash)
+        return exists, server_path
+
+    async def _check_upload(self, api_url, file_hash):
+        """查询上传文件（在网络事件循环中执行）"""
+        try:
+            check_url = f"{self._normalize_url(api_url)}/check_upload"
+            session = self._get_session(api_url)
+            async with session.get(check_url, params={"sha256": file_hash}) as response:
+                if response.status != 200:
+                    # 旧版本服务器没有该接口
+                    return None, None
+                result = await response.json()
+                if result.get("exists") and result.get("relative_path"):
+                    return True, result.get("relative_path")
+                return False, None
+        except Exception as e:
+            mlog.debug(f"查询上传文件失败: {str(e)}")
+            return None, None
+
+    async def _read_file_chunks(self, file_path, offset, length, sent, total, progress_callback, cancel_event):
+        """
+        从文件中分块读取数据用于流式上传
+
+        Args:
+            file_path: 本地文件路径
+            offset: 起始位置
+            length: 读取的总字节数
+            sent: 此前已发送的字节数，用于计算进度
+            total: 文件总字节数
+            progress_callback: 进度回调函数
+            cancel_event: 取消事件
+        """
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                if cancel_event and cancel_event.is_set():
+                    raise RuntimeError("上传已取消")
+                chunk = f.read(min(self.UPLOAD_READ_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                sent += len(chunk)
+                yield chunk
+                if progress_callback:
+                    progress_callback(sent, total)
+
+    async def _upload_file(self, api_url, file_path, file_hash=None, progress_callback=None, cancel_event=None):
+        """上传文件（在网络事件循环中执行）"""
+        try:
+            total = os.path.getsize(file_path)
+            if file_hash and total > self.CHUNKED_UPLOAD_THRESHOLD:
+                result = await self._upload_file_chunked(
+                    api_url, file_path, file_hash, total, progress_callback, cancel_event
+                )
+                if result is not None:
+                    return result
+                mlog.info("服务器不支持分块上传，改用普通上传")
+
+            upload_url = f"{self._normalize_url(api_url)}/upload_file"
+
+            # 准备表单数据，文件内容边读边发
+            form_data = aiohttp.FormData()
+            form_data.add_field('file',
+                                self._read_file_chunks(file_path, 0, total, 0, total, progress_callback, cancel_event),
+                                filename=os.path.basename(file_path),
+                                content_type='audio/wav')
+            if file_hash:
+                form_data.add_field('sha256', file_hash)
+
+            # 发送请求
+            session = self._get_session(api_url)
+            async with session.post(upload_url, data=form_data) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    if result.get("success"):
+                        return True, result.get("relative_path")
+                    else:
+                        return False, result.get("error", "上传失败")
+                else:
+                    return False, f"上传失败，HTTP状态码: {response.status}"
+
+        except Exception as e:
+            if cancel_event and cancel_event.is_set():
+                mlog.info(f"上传已取消: {file_path}")
+                return False, "上传已取消"
+            error_msg = f"上传文件失败: {str(e)}"
+            mlog.error(error_msg)
+            return False, error_msg
+
+    async def _upload_file_chunked(self, api_url, file_path, file_hash, total, progress_callback, cancel_event):
+        """
+        分块上传文件，先查询服务器已接收的字节数，从该位置继续上传
+
+        Returns:
+            tuple: (是否成功, 服务器相对路径或错误消息)，服务器不支持分块上传时返回None
+        """
+        base_url = self._normalize_url(api_url)
+        session = self._get_session(api_url)
+
+        async with session.get(f"{base_url}/upload_status", params={"sha256": file_hash, "size": total}) as response:
+            if response.status != 200:
+                return None
+            received = int((await response.json()).get("received", 0))
+
+        if received:
+            mlog.info(f"从 {received}/{total} 字节处继续上传: {file_path}")
+        if progress_callback:
+            progress_callback(received, total)
+
+        while True:
+            length = min(self.UPLOAD_CHUNK_SIZE, total - received)
+            form_data = aiohttp.FormData()
+            form_data.add_field('sha256', file_hash)
+            form_data.add_field('filename', os.path.basename(file_path))
+            form_data.add_field('offset', str(received))
+            form_data.add_field('total', str(total))
+            form_data.add_field('chunk',
+                                self._read_file_chunks(file_path, received, length, received, total, progress_callback, cancel_event),
+                                filename=os.path.basename(file_path),
+                                content_type='application/octet-stream')
+
+            async with session.post(f"{base_url}/upload_chunk", data=form_data) as response:
+                if response.status != 200:
+                    return False, f"分块上传失败，HTTP状态码: {response.status}"
+                result = await response.json()
+
+            if not result.get("success"):
+                return False, result.get("error", "分块上传失败")
+            # 以服务器确认的位置为准
+            received = int(result.get("received", received + length))
+            if result.get("relative_path"):
+                return True, result.get("relative_path")
+            if received >= total:
+                return False, "服务器未返回上传文件路径"
+
+    async def download_file(self, api_url, filename, local_path):
+        """
+        从API服务器下载生成的文件
+
+        Args:
+            api_url: API地址
+            filename: 服务器上的文件名
+            local_path: 本地保存路径
+
+        Returns:
+            tuple: (是否成功, 本地文件路径或错误消息)
+        """
+        success, result = await self._submit(self._download_file(api_url, filename, local_path))
+        if not success:
+            self.invalidate_health(api_url)
+        return success, result
+
+    async def _download_file(self, api_url, filename, local_path):
+        """下载文件（在网络事件循环中执行）"""
+        # 由其他节点生成的结果从该节点下载
+        api_url = self._result_nodes.get(filename, api_url)
+        try:
+            download_url = f"{self._normalize_url(api_url)}/download/{filename}"
+            session = self._get_session(api_url)
+            async with session.get(download_url) as response:
+                if response.status == 200:
+                    with open(local_path, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(65536):
+                            f.write(chunk)
+                    return True, local_path
+                else:
+                    error_msg = f"下载失败，HTTP状态码: {response.status}"
+                    mlog.error(error_msg)
+                    return False, error_msg
+        except Exception as e:
+            error_msg = f"下载音频文件失败: {str(e)}"
+            mlog.error(error_msg)
+            return False, error_msg
+
+    def close(self):
+        """关闭所有连接并停止网络事件循环"""
+        async def _close_all():
+            for task in self._heartbeat_tasks.values():
+                task.cancel()
+            self._heartbeat_tasks.clear()
+            for idle in self._idle_websockets.values():
+                for websocket in idle:
+                    await websocket.close()
+            self._idle_websockets.clear()
+            for session in self._sessions.values():
+                await session.close()
+            self._sessions.clear()
+
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(_close_all(), self._loop).result(timeout=5)
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            mlog.error(f"关闭API连接失败: {str(e)}")
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
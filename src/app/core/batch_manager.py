@@ -0,0 +1,204 @@
+import os
+import csv
+import asyncio
+import app.core.mlog as mlog
+
+class BatchJob:
+    """
+    批量生成任务，保存每条文本的状态和整体进度
+    """
+    def __init__(self, texts, params, concurrency=2):
+        """
+        初始化批量任务
+
+        Args:
+            texts: 文本列表
+            params: 除文本外的公共生成参数
+            concurrency: 同时发往API的请求数
+        """
+        self.params = dict(params)
+        self.concurrency = max(1, int(concurrency))
+        self.cancelled = False
+        self.items = [
+            {
+                "index": index,
+                "text": text,
+                "status": "pending",  # pending, running, done, failed, cancelled
+                "progress": 0,
+                "result": None,
+                "error": None,
+            }
+            for index, text in enumerate(texts)
+        ]
+
+    @property
+    def total(self):
+        """任务总数"""
+        return len(self.items)
+
+    @property
+    def finished(self):
+        """已结束（成功或失败）的任务数"""
+        return sum(1 for item in self.items if item["status"] in ("done", "failed"))
+
+    @property
+    def failed(self):
+        """失败的任务数"""
+        return sum(1 for item in self.items if item["status"] == "failed")
+
+    def cancel(self):
+        """取消任务，正在进行的请求完成后不再发送新请求"""
+        self.cancelled = True
+
+class BatchManager:
+    """
+    批量生成管理类，负责解析批量文本并通过客户端任务队列并发调用API
+    """
+    def __init__(self, api_manager):
+        """
+        初始化批量生成管理器
+
+        Args:
+            api_manager: API管理器实例
+        """
+        self.api_manager = api_manager
+
+    @staticmethod
+    def parse_texts(content):
+        """
+        将多行文本拆分为待生成的文本列表，忽略空行
+
+        Args:
+            content: 多行文本
+
+        Returns:
+            list: 文本列表
+        """
+        return [line.strip() for line in (content or "").splitlines() if line.strip()]
+
+    @staticmethod
+    def load_texts(file_path):
+        """
+        从文本或CSV文件加载待生成的文本，每行一条
+
+        CSV文件存在text列时使用该列，否则使用第一列。
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            list: 文本列表
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                if os.path.splitext(file_path)[1].lower() != ".csv":
+                    return BatchManager.parse_texts(f.read())
+
+                rows = list(csv.reader(f))
+
+            if not rows:
+                return []
+
+            header = [cell.strip().lower() for cell in rows[0]]
+            if "text" in header:
+                column = header.index("text")
+                rows = rows[1:]
+            else:
+                column = 0
+
+            return [
+                row[column].strip() for row in rows
+                if len(row) > column and row[column].strip()
+            ]
+        except Exception as e:
+            mlog.error(f"加载批量文本失败: {str(e)}")
+            return []
+
+    async def run(self, job, api_url, on_result, on_update=None, lookup=None):
+        """
+        执行批量任务
+
+        Args:
+            job: BatchJob实例
+            api_url: API地址
+            on_result: 处理单条生成结果的协程函数，参数为(params, result)，返回(是否成功, 文件路径或错误消息)
+            on_update: 任务项状态或进度变化时的回调，参数为(job, item)，在调用方的事件循环中执行
+            lookup: 查找已有结果的协程函数(可选)，参数为params，返回文件路径或None，命中时跳过生成
+
+        Returns:
+            BatchJob: 执行完成的任务
+        """
+        queue = asyncio.Queue()
+        for item in job.items:
+            queue.put_nowait(item)
+
+        def notify(item):
+            if on_update:
+                try:
+                    on_update(job, item)
+                except Exception as e:
+                    mlog.error(f"批量任务进度回调失败: {str(e)}")
+
+        # 界面回调只在调用方的事件循环中执行，不在网络线程中更新界面
+        loop = asyncio.get_running_loop()
+
+        def update_progress(item, progress_info):
+            # 任务项已结束后才到达的进度不再显示
+            if item["status"] != "running":
+                return
+            if isinstance(progress_info, dict):
+                item["progress"] = progress_info.get("progress", 0)
+            else:
+                item["progress"] = float(progress_info)
+            notify(item)
+
+        def on_progress(item, progress_info):
+            loop.call_soon_threadsafe(update_progress, item, progress_info)
+
+        async def worker():
+            while not job.cancelled:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                item["status"] = "running"
+                notify(item)
+
+                params = dict(job.params)
+                params["text"] = item["text"]
+                try:
+                    cached = await lookup(params) if lookup else None
+                    if cached:
+                        success, result = True, cached
+                    else:
+                        success, result = await self.api_manager.generate_audio(
+                            api_url,
+                            params,
+                            lambda progress_info, item=item: on_progress(item, progress_info)
+                        )
+                        if success:
+                            success, result = await on_result(params, result)
+                except Exception as e:
+                    success, result = False, str(e)
+
+                if success:
+                    item["status"] = "done"
+                    item["progress"] = 100
+                    item["result"] = result
+                else:
+                    item["status"] = "failed"
+                    item["error"] = result
+                    mlog.error(f"批量生成第{item['index'] + 1}条失败: {result}")
+                notify(item)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(job.concurrency, job.total))]
+        if workers:
+            await asyncio.gather(*workers)
+
+        # 标记取消后未执行的任务
+        for item in job.items:
+            if item["status"] == "pending":
+                item["status"] = "cancelled"
+
+        return job
@@ -1,84 +1,377 @@
 import sqlite3
 import os
+import json
+import asyncio
+import datetime
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import app.core.mlog as mlog
 
+
+class _PooledConnection(sqlite3.Connection):
+    """
+    线程内复用的数据库连接
+
+    调用方仍在使用完后调用 close()，此时只回滚未提交的事务，
+    连接保留给同一线程的下一次 get_connection() 使用。
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        """真正关闭连接"""
+        sqlite3.Connection.close(self)
+
+
 class DBManager:
     """
     数据库管理类，负责SQLite数据库的连接和初始化
+
+    每个线程持有一个长期打开的连接，避免每次查询都重新打开数据库文件、
+    执行PRAGMA和重新编译SQL语句。数据库使用WAL模式，读取不会被写入阻塞。
+    界面回调通过 run() 在专用的数据库线程中执行查询，不阻塞界面。
     """
+    # 每个连接缓存的预编译语句数量
+    CACHED_STATEMENTS = 256
+    # 数据库被其他连接锁定时的等待时间(秒)
+    BUSY_TIMEOUT = 5.0
+    # 数据库线程数，WAL模式下读取可以并行，写入由SQLite串行
+    DB_WORKERS = 2
+    # trigram分词的全文索引只能匹配不少于3个字符的关键词
+    FTS_MIN_LENGTH = 3
+    # 全文索引: 索引表名 -> (源表名, 索引列)
+    FTS_TABLES = {
+        "history_fts": ("history", ("text", "speaker", "reference")),
+        "roles_fts": ("roles", ("name", "description")),
+    }
+
     def __init__(self, pathmanager):
         """初始化数据库管理器"""
         self.path_manager = pathmanager
         self.db_file = self.path_manager.database_file
-        
+        self._local = threading.local()
+        # 所有线程的连接，线程结束后自动移除
+        self._connections = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.DB_WORKERS, thread_name_prefix="db")
+        # SQLite不支持FTS5或trigram分词时退回到LIKE查询
+        self.fts_enabled = False
+
         # 确保数据目录存在
         os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
         
-        # 初始化数据库
+        # 初始化数据库并执行迁移
         self._init_database()
     
+    def _migrations(self):
+        """
+        按顺序排列的数据库迁移，第N个迁移执行完成后 user_version 为N
+
+        已发布的迁移不能再修改或调整顺序，结构变化只能追加新的迁移。
+        迁移需要兼容由旧版本程序创建、尚未记录版本号的数据库。
+        """
+        return [
+            self._migration_create_tables,
+            self._migration_import_json,
+            self._migration_add_indexes,
+            self._migration_add_fts,
+        ]
+
     def _init_database(self):
         """
-        初始化数据库，创建必要的表
+        初始化数据库，依次执行 PRAGMA user_version 之后尚未执行的迁移
+
+        每个迁移在单独的事务中执行并同时更新版本号，失败时回滚，
+        之后的迁移留到下次启动再执行。结构已是最新时只读取一次版本号。
         """
         try:
             conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # 创建角色表
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS roles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                file TEXT NOT NULL,
-                speaker_text TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # 创建历史记录表
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                text TEXT NOT NULL,
-                speaker TEXT NOT NULL,
-                reference TEXT NOT NULL,
-                file_path TEXT NOT NULL,
-                speed REAL DEFAULT 1.0,
-                mode TEXT DEFAULT 'quick',
-                instruction TEXT,
-                speaker_text TEXT,
-                timestamp TEXT NOT NULL
-            )
-            ''')
-            
-            conn.commit()
+            migrations = self._migrations()
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+            if version < len(migrations):
+                # WAL模式保存在数据库文件中，且不能在事务中设置
+                conn.execute("PRAGMA journal_mode = WAL")
+
+                for number in range(version + 1, len(migrations) + 1):
+                    try:
+                        # 立即获取写锁，同时启动的其他进程会等待而不是重复执行
+                        conn.execute("BEGIN IMMEDIATE")
+                        if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+                            conn.rollback()
+                            continue
+                        migrations[number - 1](conn.cursor())
+                        conn.execute(f"PRAGMA user_version = {number}")
+                        conn.commit()
+                        mlog.info(f"数据库已迁移到版本 {number}")
+                    except Exception as e:
+                        conn.rollback()
+                        mlog.error(f"数据库迁移到版本 {number} 失败: {str(e)}")
+                        break
+
+            # 创建数据库时SQLite不支持全文索引则不会有索引表
+            self.fts_enabled = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='history_fts'"
+            ).fetchone() is not None
             conn.close()
             mlog.info("数据库初始化成功")
         except Exception as e:
             mlog.error(f"数据库初始化失败: {str(e)}")
+
+    def _migration_create_tables(self, cursor):
+        """版本1: 创建基础数据表"""
+        # 创建角色表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS roles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            file TEXT NOT NULL,
+            speaker_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+        # 创建历史记录表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            speaker TEXT NOT NULL,
+            reference TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            speed REAL DEFAULT 1.0,
+            mode TEXT DEFAULT 'quick',
+            instruction TEXT,
+            speaker_text TEXT,
+            timestamp TEXT NOT NULL
+        )
+        ''')
+
+        # 创建合成结果缓存表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS synthesis_cache (
+            key TEXT PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            size INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,
+            last_used REAL NOT NULL
+        )
+        ''')
+
+        # 创建上传文件记录表，记录每个API服务器上已有的文件
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS upload_cache (
+            api_url TEXT NOT NULL,
+            sha256 TEXT NOT NULL,
+            server_path TEXT NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (api_url, sha256)
+        )
+        ''')
+
+        # 早期版本创建的角色表没有speaker_text列
+        cursor.execute("PRAGMA table_info(roles)")
+        columns = [col["name"] for col in cursor.fetchall()]
+        if "speaker_text" not in columns:
+            cursor.execute("ALTER TABLE roles ADD COLUMN speaker_text TEXT")
+            mlog.info("已添加speaker_text列到roles表")
+
+    def _migration_import_json(self, cursor):
+        """版本2: 导入早期版本保存在JSON文件中的角色和历史记录"""
+        roles = self._load_legacy_json(self.path_manager.roles_file)
+        if roles:
+            cursor.execute("SELECT COUNT(*) FROM roles")
+            if cursor.fetchone()[0] == 0:
+                for role in roles:
+                    cursor.execute(
+                        "INSERT INTO roles (name, description, file) VALUES (?, ?, ?)",
+                        (role.get('name', ''), role.get('description', ''), role.get('file', ''))
+                    )
+                mlog.info(f"成功从JSON迁移{len(roles)}个角色到数据库")
+
+        history = self._load_legacy_json(self.path_manager.history_file)
+        if history:
+            cursor.execute("SELECT COUNT(*) FROM history")
+            if cursor.fetchone()[0] == 0:
+                now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                for item in history:
+                    cursor.execute(
+                        "INSERT INTO history (text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (item.get('text', ''), item.get('speaker', ''), item.get('reference', ''),
+                         item.get('file_path', ''), item.get('speed', 1.0), item.get('mode', 'quick'),
+                         item.get('instruction', ''), item.get('speaker_text', ''), item.get('timestamp', now))
+                    )
+                mlog.info(f"成功从JSON迁移{len(history)}条历史记录到数据库")
+
+        # 备份旧文件
+        for file_path in (self.path_manager.roles_file, self.path_manager.history_file):
+            if os.path.exists(file_path):
+                os.replace(file_path, file_path + ".bak")
+                mlog.info(f"旧的JSON文件已备份为: {file_path}.bak")
+
+    @staticmethod
+    def _load_legacy_json(file_path):
+        """读取旧的JSON数据文件，文件不存在或已损坏时返回空列表"""
+        if not os.path.exists(file_path):
+            return []
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f) or []
+        except Exception as e:
+            mlog.error(f"读取旧的JSON数据失败 {file_path}: {str(e)}")
+            return []
+
+    def _migration_add_indexes(self, cursor):
+        """版本3: 为常用查询添加索引"""
+        # 分页按 (timestamp, id) 和 (name, id) 定位，也用于按名称查找角色
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_roles_name ON roles(name, id)")
+        # 删除记录和清理合成缓存时检查音频文件是否仍被引用
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_file_path ON history(file_path)")
+        # 合成缓存按最近使用时间淘汰
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_synthesis_cache_last_used ON synthesis_cache(last_used)")
+
+    def _migration_add_fts(self, cursor):
+        """版本4: 创建历史记录和角色的全文索引，并用触发器与源表保持同步"""
+        try:
+            probe = sqlite3.connect(":memory:")
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+            probe.close()
+        except sqlite3.Error as e:
+            mlog.warning(f"SQLite不支持全文索引，搜索将使用LIKE查询: {str(e)}")
+            return
+
+        for fts_table, (table, columns) in self.FTS_TABLES.items():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts_table,))
+            exists = cursor.fetchone() is not None
+
+            column_list = ", ".join(columns)
+            new_values = ", ".join(f"new.{col}" for col in columns)
+            old_values = ", ".join(f"old.{col}" for col in columns)
+
+            # 外部内容表，索引中不重复保存原文
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                f"{column_list}, content='{table}', content_rowid='id', tokenize='trigram')"
+            )
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {table} BEGIN
+                INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+            ''')
+
+            # 为已有数据建立索引
+            if not exists:
+                cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+                mlog.info(f"已建立全文索引: {fts_table}")
+
+    def can_use_fts(self, keyword):
+        """
+        判断关键词能否使用全文索引搜索
+
+        Args:
+            keyword: 搜索关键词
+
+        Returns:
+            bool: 是否可以使用全文索引
+        """
+        return self.fts_enabled and len(keyword) >= self.FTS_MIN_LENGTH
+
+    @staticmethod
+    def fts_phrase(keyword):
+        """把关键词转换为FTS5短语，避免其中的引号和运算符被解析为查询语法"""
+        return '"' + keyword.replace('"', '""') + '"'
+
+    @staticmethod
+    def like_pattern(keyword):
+        """把关键词转换为LIKE模式，转义其中的通配符，配合 ESCAPE '\\' 使用"""
+        escaped = keyword.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
     
     def get_connection(self):
         """
-        获取数据库连接
-        
+        获取当前线程的数据库连接，首次调用时创建
+
         Returns:
-            sqlite3.Connection: 数据库连接对象
+            sqlite3.Connection: 数据库连接对象，调用 close() 不会真正关闭连接
         """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # 上次使用时因异常未提交的事务不能带到本次
+            if conn.in_transaction:
+                conn.rollback()
+            return conn
+
         try:
+            # 连接只在创建它的线程中使用，关闭检查放开是为了退出时由主线程统一关闭
+            conn = sqlite3.connect(
+                self.db_file,
+                timeout=self.BUSY_TIMEOUT,
+                factory=_PooledConnection,
+                cached_statements=self.CACHED_STATEMENTS,
+                check_same_thread=False
+            )
             # 启用外键约束
-            conn = sqlite3.connect(self.db_file)
             conn.execute("PRAGMA foreign_keys = ON")
-            
+            # WAL模式下NORMAL不会损坏数据库，且无需每次提交都同步磁盘
+            conn.execute("PRAGMA synchronous = NORMAL")
+
             # 使结果以字典形式返回
             conn.row_factory = sqlite3.Row
-            
+
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
             return conn
         except Exception as e:
             mlog.error(f"获取数据库连接失败: {str(e)}")
             raise e
 
+    async def run(self, func, *args, **kwargs):
+        """
+        在数据库线程中执行阻塞的数据库操作
+        
+        Args:
+            func: 要执行的函数
+            *args, **kwargs: 函数参数
+        
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close_all(self):
+        """停止数据库线程并关闭所有线程的数据库连接，在应用退出时调用"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        # 之后再访问时会重新创建连接
+        self._local = threading.local()
+        for conn in connections:
+            try:
+                conn.dispose()
+            except Exception as e:
+                mlog.error(f"关闭数据库连接失败: {str(e)}")
+
     def get_table_count(self, table_name, where_clause=None, params=()):
         """
         获取表中的记录总数
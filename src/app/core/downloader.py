@@ -0,0 +1,291 @@
+import os
+import re
+import json
+import time
+import asyncio
+import aiohttp
+from app.core.utils import file_sha256
+import app.core.mlog as mlog
+
+class RangeDownloader:
+    """
+    大文件下载类，支持HTTP Range断点续传和多连接并行下载
+
+    下载过程中数据写入 .part 文件，各分段进度保存在 .parts.json 中，
+    中断后再次下载会从已完成的位置继续。只有在校验通过后才重命名为目标文件，
+    因此目标文件存在即表示下载完整。
+    """
+    # 并行下载的连接数
+    CONNECTIONS = 4
+    # 自适应读取块大小的范围
+    MIN_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 4 * 1024 * 1024
+    # 每次读取的目标耗时(秒)，据此调整块大小
+    CHUNK_TARGET_SECONDS = 0.25
+    # 单个分段失败后的最大重试次数
+    MAX_RETRIES = 5
+    # 保存分段进度的最小间隔(秒)
+    STATE_SAVE_INTERVAL = 1.0
+    # 进度回调的最小间隔(秒)
+    PROGRESS_INTERVAL = 0.2
+
+    def __init__(self, connections=None):
+        """
+        初始化下载器
+
+        Args:
+            connections: 并行连接数，默认使用 CONNECTIONS
+        """
+        self.connections = connections or self.CONNECTIONS
+        self._timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=60)
+
+    async def download(self, url, target_path, progress_callback=None, expected_sha256=None):
+        """
+        下载文件到目标路径
+
+        Args:
+            url: 下载地址
+            target_path: 目标文件路径
+            progress_callback: 进度回调函数，参数为(当前大小, 总大小, 状态文本)
+            expected_sha256: 期望的SHA-256，提供时下载完成后进行校验
+
+        Returns:
+            tuple: (是否成功, 错误信息)
+        """
+        part_path = target_path + ".part"
+        state_path = target_path + ".parts.json"
+
+        try:
+            async with aiohttp.ClientSession(timeout=self._timeout) as session:
+                if progress_callback:
+                    progress_callback(-1, -1, "正在连接下载服务器...")
+
+                status, total, ranges_supported, validator = await self._probe(session, url)
+                if status not in (200, 206):
+                    error_msg = f"下载失败: 状态码 {status}"
+                    mlog.error(error_msg)
+                    return False, error_msg
+
+                if total and ranges_supported:
+                    state = self._load_state(state_path, part_path, url, total, validator)
+                    if state is None:
+                        state = self._new_state(url, total, validator)
+                        with open(part_path, 'wb') as f:
+                            f.truncate(total)
+                        self._save_state(state_path, state)
+                    else:
+                        done = sum(part[2] for part in state["parts"])
+                        mlog.info(f"继续下载模型文件: {done}/{total} 字节")
+
+                    success, error = await self._download_ranges(
+                        session, url, part_path, state_path, state, progress_callback
+                    )
+                else:
+                    # 服务器不支持Range时只能单连接完整下载
+                    mlog.info("下载服务器不支持断点续传，使用单连接下载")
+                    success, error = await self._download_single(session, url, part_path, progress_callback)
+                    if success and total and os.path.getsize(part_path) != total:
+                        success, error = False, "下载的文件大小与服务器不一致"
+
+            if not success:
+                return False, error
+
+            # 校验完成后再重命名为目标文件，校验失败时丢弃已下载的数据，下次重新下载
+            if expected_sha256:
+                if progress_callback:
+                    progress_callback(-1, -1, "正在校验模型文件...")
+                actual = await asyncio.get_running_loop().run_in_executor(None, file_sha256, part_path)
+                if actual.lower() != expected_sha256.lower():
+                    self._discard(part_path, state_path)
+                    return False, "模型文件校验失败，请重新下载"
+
+            os.replace(part_path, target_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            return True, None
+        except aiohttp.ClientError as e:
+            error_msg = f"网络错误: {str(e)}，再次下载将从中断处继续"
+            mlog.error(error_msg)
+            return False, error_msg
+        except asyncio.TimeoutError:
+            error_msg = "下载超时，请检查网络连接，再次下载将从中断处继续"
+            mlog.error(error_msg)
+            return False, error_msg
+
+    @staticmethod
+    def _discard(part_path, state_path):
+        """删除未通过校验的下载数据和分段进度"""
+        for path in (part_path, state_path):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                mlog.error(f"删除下载文件失败: {path}, 错误: {str(e)}")
+
+    async def _probe(self, session, url):
+        """
+        请求首个字节，获取文件大小以及服务器是否支持Range
+
+        Returns:
+            tuple: (状态码, 文件总大小, 是否支持Range, 文件校验标识)
+        """
+        async with session.get(url, headers={"Range": "bytes=0-0"}) as response:
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified") or ""
+
+            if response.status == 206:
+                match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+                if match:
+                    return response.status, int(match.group(1)), True, validator
+            return response.status, int(response.headers.get("Content-Length", 0)), False, validator
+
+    def _new_state(self, url, total, validator):
+        """按连接数把文件划分为连续的分段，每段记录为 [起始, 结束, 已下载字节数]"""
+        part_size = -(-total // self.connections)
+        parts = []
+        for start in range(0, total, part_size):
+            parts.append([start, min(start + part_size, total) - 1, 0])
+        return {"url": url, "total": total, "validator": validator, "parts": parts}
+
+    def _load_state(self, state_path, part_path, url, total, validator):
+        """读取上次的分段进度，文件已变化或记录不完整时返回None"""
+        if not os.path.exists(state_path) or not os.path.exists(part_path):
+            return None
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if (state.get("url") != url or state.get("total") != total
+                    or state.get("validator") != validator
+                    or os.path.getsize(part_path) != total):
+                mlog.info("服务器上的模型文件已变化，重新下载")
+                return None
+            return state
+        except Exception as e:
+            mlog.error(f"读取下载进度失败: {str(e)}")
+            return None
+
+    def _save_state(self, state_path, state):
+        """原子地保存分段进度"""
+        temp_path = state_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, state_path)
+
+    async def _download_ranges(self, session, url, part_path, state_path, state, progress_callback):
+        """多连接并行下载各个分段"""
+        total = state["total"]
+        started = time.monotonic()
+        initial = sum(part[2] for part in state["parts"])
+        last_save = 0.0
+        last_progress = 0.0
+
+        def on_data():
+            nonlocal last_save, last_progress
+            now = time.monotonic()
+            if now - last_save >= self.STATE_SAVE_INTERVAL:
+                last_save = now
+                self._save_state(state_path, state)
+            if progress_callback and now - last_progress >= self.PROGRESS_INTERVAL:
+                last_progress = now
+                current = sum(part[2] for part in state["parts"])
+                speed = (current - initial) / max(now - started, 0.001) / 1024 / 1024
+                progress_callback(
+                    current, total,
+                    f"正在下载模型文件（{self.connections}线程, {speed:.1f} MB/s）..."
+                )
+
+        if progress_callback:
+            progress_callback(initial, total, "开始下载模型文件...")
+
+        pending = [part for part in state["parts"] if part[2] < part[1] - part[0] + 1]
+        tasks = [
+            asyncio.ensure_future(self._download_part(session, url, part_path, part, on_data))
+            for part in pending
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._save_state(state_path, state)
+
+        for success, error in results:
+            if not success:
+                return False, error
+
+        if progress_callback:
+            progress_callback(total, total, "下载完成")
+        return True, None
+
+    async def _download_part(self, session, url, part_path, part, on_data):
+        """
+        下载单个分段，失败时从已下载的位置重试
+
+        Args:
+            part: [起始, 结束, 已下载字节数]，下载过程中原地更新
+        """
+        retries = 0
+        chunk_size = self.MIN_CHUNK_SIZE
+        # 不使用缓冲，保证保存的进度不超过已写入的数据
+        with open(part_path, 'r+b', buffering=0) as f:
+            while part[0] + part[2] <= part[1]:
+                offset = part[0] + part[2]
+                received = part[2]
+                try:
+                    headers = {"Range": f"bytes={offset}-{part[1]}"}
+                    async with session.get(url, headers=headers) as response:
+                        if response.status != 206:
+                            return False, f"下载失败: 状态码 {response.status}"
+
+                        f.seek(offset)
+                        while True:
+                            read_started = time.monotonic()
+                            chunk = await response.content.read(chunk_size)
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                            part[2] += len(chunk)
+                            retries = 0
+
+                            # 根据读取耗时调整块大小
+                            elapsed = time.monotonic() - read_started
+                            if len(chunk) == chunk_size and elapsed < self.CHUNK_TARGET_SECONDS / 2:
+                                chunk_size = min(chunk_size * 2, self.MAX_CHUNK_SIZE)
+                            elif elapsed > self.CHUNK_TARGET_SECONDS * 2:
+                                chunk_size = max(chunk_size // 2, self.MIN_CHUNK_SIZE)
+                            on_data()
+                    f.flush()
+                    if part[2] > received:
+                        continue
+                    # 响应正常结束却没有数据（空响应或连接提前关闭）时同样计为一次失败，避免无限重复请求
+                    error = "服务器未返回数据"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = str(e)
+                retries += 1
+                if retries > self.MAX_RETRIES:
+                    return False, f"网络错误: {error}，再次下载将从中断处继续"
+                delay = min(2 ** retries, 30)
+                mlog.info(f"分段下载中断，{delay}秒后从 {part[0] + part[2]} 字节处重试: {error}")
+                await asyncio.sleep(delay)
+        return True, None
+
+    async def _download_single(self, session, url, part_path, progress_callback):
+        """单连接完整下载"""
+        async with session.get(url) as response:
+            if response.status != 200:
+                return False, f"下载失败: 状态码 {response.status}"
+
+            total = int(response.headers.get('content-length', 0))
+            current = 0
+            last_progress = 0.0
+            if progress_callback:
+                progress_callback(0, total, "开始下载模型文件...")
+
+            with open(part_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(self.MAX_CHUNK_SIZE):
+                    f.write(chunk)
+                    current += len(chunk)
+                    now = time.monotonic()
+                    if progress_callback and now - last_progress >= self.PROGRESS_INTERVAL:
+                        last_progress = now
+                        progress_callback(current, total, "正在下载模型文件...")
+        return True, None
@@ -1,7 +1,8 @@
 import os
-import json
 import datetime
 import shutil
+from app.core.utils import mark_keyword
+from app.core.query_cache import QueryCache, copy_rows
 import app.core.mlog as mlog
 
 class HistoryManager:
@@ -12,49 +13,9 @@ class HistoryManager:
         """初始化历史记录管理器"""
         self.path_manager = pathmanager
         self.db_manager = dbmanager
-        self.history_file = self.path_manager.history_file
         self.history_dir = self.path_manager.history_dir
-        self._migrate_from_json_if_needed()
-    
-    def _migrate_from_json_if_needed(self):
-        """
-        如果存在旧的JSON文件，则迁移数据到SQLite
-        """
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    history = json.load(f)
-                
-                if history:
-                    conn = self.db_manager.get_connection()
-                    cursor = conn.cursor()
-                    
-                    # 检查数据库中是否已有历史数据
-                    cursor.execute("SELECT COUNT(*) FROM history")
-                    count = cursor.fetchone()[0]
-                    
-                    # 如果数据库是空的，才进行迁移
-                    if count == 0:
-                        for item in history:
-                            cursor.execute(
-                                "INSERT INTO history (text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp) "
-                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                                (item.get('text', ''), item.get('speaker', ''), item.get('reference', ''),
-                                 item.get('file_path', ''), item.get('speed', 1.0), item.get('mode', 'quick'),
-                                 item.get('instruction', ''), item.get('speaker_text', ''), item.get('timestamp', datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                            )
-                        
-                        conn.commit()
-                        mlog.info(f"成功从JSON迁移{len(history)}条历史记录到数据库")
-                        
-                        # 备份旧文件
-                        backup_file = self.history_file + ".bak"
-                        os.rename(self.history_file, backup_file)
-                        mlog.info(f"旧的JSON文件已备份为: {backup_file}")
-                    
-                    conn.close()
-            except Exception as e:
-                mlog.error(f"从JSON迁移历史记录失败: {str(e)}")
+        # 分页查询和计数结果的缓存，记录有增删时失效
+        self.cache = QueryCache()
     
     def add_record(self, record, source_file=None):
         """
@@ -100,6 +61,7 @@ class HistoryManager:
             
             conn.commit()
             conn.close()
+            self.cache.invalidate()
             return True
         except Exception as e:
             mlog.error(f"添加历史记录失败: {str(e)}")
@@ -142,8 +104,15 @@ class HistoryManager:
                     # 如果没有ID，尝试通过文件路径匹配
                     cursor.execute("DELETE FROM history WHERE file_path=?", (file_path,))
             
+            # 其他历史记录仍引用同一文件（如合成缓存命中）时保留文件
+            if file_path:
+                cursor.execute("SELECT COUNT(*) FROM history WHERE file_path=?", (file_path,))
+                if cursor.fetchone()[0] > 0:
+                    delete_file = False
+            
             conn.commit()
             conn.close()
+            self.cache.invalidate()
             
             # 删除对应的音频文件
             if delete_file and file_path and os.path.exists(file_path):
@@ -166,35 +135,138 @@ class HistoryManager:
             list: 历史记录列表
         """
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT id, text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp "
-                "FROM history ORDER BY timestamp DESC"
-            )
-            
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'speaker': row['speaker'],
-                    'reference': row['reference'],
-                    'file_path': row['file_path'],
-                    'speed': row['speed'],
-                    'mode': row['mode'],
-                    'instruction': row['instruction'],
-                    'speaker_text': row['speaker_text'],
-                    'timestamp': row['timestamp']
-                })
-            
-            conn.close()
-            return history
+            return self._query()
         except Exception as e:
             mlog.error(f"获取历史记录失败: {str(e)}")
             return []
     
+    def _keyword_filter(self, keyword):
+        """
+        构造关键词搜索条件，关键词足够长时使用全文索引，否则退回到LIKE查询
+        
+        Args:
+            keyword: 搜索关键词
+        
+        Returns:
+            tuple: (JOIN子句, WHERE子句, 参数, 高亮文本的列表达式，不使用索引时为None)
+        """
+        if self.db_manager.can_use_fts(keyword):
+            return (
+                "JOIN history_fts ON history_fts.rowid = history.id",
+                "history_fts MATCH ?",
+                (self.db_manager.fts_phrase(keyword),),
+                "highlight(history_fts, 0, char(1), char(2))"
+            )
+        
+        pattern = self.db_manager.like_pattern(keyword)
+        return (
+            "",
+            "history.text LIKE ? ESCAPE '\\' OR history.speaker LIKE ? ESCAPE '\\' "
+            "OR history.reference LIKE ? ESCAPE '\\'",
+            (pattern, pattern, pattern),
+            None
+        )
+    
+    def _query(self, keyword="", page_size=-1, page=1, after=None, before=None, with_total=False):
+        """
+        按时间倒序查询历史记录，使用 (timestamp, id) 游标分页
+        
+        有游标时直接从索引中定位，与页码深度无关；只有页码时先在索引上
+        找到上一页最后一条记录的位置，再从该位置开始读取。
+        
+        Args:
+            keyword: 搜索关键词，为空时查询全部
+            page_size: 每页记录数，-1表示不限制
+            page: 页码，没有提供游标时使用
+            after: 上一页最后一条记录的游标，返回其后的一页
+            before: 下一页第一条记录的游标，返回其前的一页
+            with_total: 是否同时返回筛选后的记录总数
+        
+        Returns:
+            list: 历史记录列表，搜索时 text_highlight 为标记了匹配部分的文本；
+                  with_total 为True时返回 (列表, 总数)
+        """
+        join, conditions, params, highlight = "", [], [], None
+        if keyword:
+            join, where, keyword_params, highlight = self._keyword_filter(keyword)
+            conditions.append(f"({where})")
+            params.extend(keyword_params)
+        
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        
+        if after is None and before is None and page > 1 and page_size > 0:
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(
+                f"SELECT history.timestamp, history.id FROM history {join} {where_clause} "
+                "ORDER BY history.timestamp DESC, history.id DESC LIMIT 1 OFFSET ?",
+                params + [(page - 1) * page_size - 1]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                conn.close()
+                return ([], self.get_filtered_count(keyword)) if with_total else []
+            after = (row[0], row[1])
+        
+        order = "DESC"
+        if after is not None:
+            conditions.append("(history.timestamp, history.id) < (?, ?)")
+            params.extend(after)
+        elif before is not None:
+            # 向前翻页时按升序读取紧邻的一页，再反转为倒序
+            conditions.append("(history.timestamp, history.id) > (?, ?)")
+            params.extend(before)
+            order = "ASC"
+        
+        # 搜索时用窗口函数在同一次扫描中统计当前位置之后的匹配数；
+        # 不筛选时全表计数走索引更快，单独查询
+        count_in_query = with_total and bool(keyword) and before is None
+        if count_in_query:
+            # 全文索引的 highlight() 不能与窗口函数同用，改为读取后再标记匹配部分
+            highlight = None
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            "SELECT history.id, history.text, history.speaker, history.reference, history.file_path, "
+            "history.speed, history.mode, history.instruction, history.speaker_text, history.timestamp, "
+            f"{highlight or 'NULL'} AS text_highlight"
+            f"{', COUNT(*) OVER () AS total_rows' if count_in_query else ''} "
+            f"FROM history {join} {where_clause} "
+            f"ORDER BY history.timestamp {order}, history.id {order} LIMIT ?"
+        )
+        mlog.debug(f"执行SQL: {sql} [参数: {params}, 每页: {page_size}]")
+        cursor.execute(sql, params + [page_size])
+        
+        history = []
+        rows = cursor.fetchall()
+        for row in rows:
+            record = {
+                'id': row['id'],
+                'text': row['text'],
+                'speaker': row['speaker'],
+                'reference': row['reference'],
+                'file_path': row['file_path'],
+                'speed': row['speed'],
+                'mode': row['mode'],
+                'instruction': row['instruction'],
+                'speaker_text': row['speaker_text'],
+                'timestamp': row['timestamp']
+            }
+            if keyword:
+                record['text_highlight'] = row['text_highlight'] or mark_keyword(row['text'], keyword)
+            history.append(record)
+        
+        conn.close()
+        if order == "ASC":
+            history.reverse()
+        if not with_total:
+            return history
+        
+        if count_in_query and rows:
+            # 窗口计数不含当前页之前的记录
+            offset = (page - 1) * page_size if page_size > 0 else 0
+            return history, offset + rows[0]['total_rows']
+        return history, self.get_filtered_count(keyword)
+    
     def filter_history(self, keyword):
         """
         按关键词筛选历史记录
@@ -209,36 +281,7 @@ class HistoryManager:
             if not keyword or keyword.strip() == "":
                 return self.get_history()
             
-            keyword = f"%{keyword.lower().strip()}%"
-            
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT id, text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp "
-                "FROM history "
-                "WHERE LOWER(text) LIKE ? OR LOWER(speaker) LIKE ? OR LOWER(reference) LIKE ? "
-                "ORDER BY timestamp DESC",
-                (keyword, keyword, keyword)
-            )
-            
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'speaker': row['speaker'],
-                    'reference': row['reference'],
-                    'file_path': row['file_path'],
-                    'speed': row['speed'],
-                    'mode': row['mode'],
-                    'instruction': row['instruction'],
-                    'speaker_text': row['speaker_text'],
-                    'timestamp': row['timestamp']
-                })
-            
-            conn.close()
-            return history
+            return self._query(keyword.strip())
         except Exception as e:
             mlog.error(f"筛选历史记录失败: {str(e)}")
             return []
@@ -269,6 +312,7 @@ class HistoryManager:
             
             conn.commit()
             conn.close()
+            self.cache.invalidate()
             
             # 删除文件
             if delete_files:
@@ -284,56 +328,48 @@ class HistoryManager:
             mlog.error(f"清除所有历史记录失败: {str(e)}")
             return False
     
-    def get_history_paged(self, page=1, page_size=10):
+    def _cached_query(self, keyword, page, page_size, after, before):
+        """
+        分页查询，结果按 (关键词, 页码, 每页记录数) 缓存，游标只用于缓存未命中时定位
+        
+        Returns:
+            list: 当前页的历史记录列表
+        """
+        # 移动端滚动加载只有游标没有页码，不使用缓存
+        if page is None:
+            return self._query(keyword, page_size, 1, after, before)
+        # 返回副本，调用方修改记录时不影响缓存
+        return copy_rows(self.cache.load(
+            ("page", keyword, page, page_size),
+            lambda: self._query(keyword, page_size, page, after, before)
+        ))
+    
+    def get_history_paged(self, page=1, page_size=10, after=None, before=None):
         """
         分页获取历史记录
         
         Args:
-            page: 页码，从1开始
+            page: 页码，从1开始，只按游标查询时为None且不缓存结果
             page_size: 每页记录数
+            after: 上一页最后一条记录的游标(可选)，提供时忽略页码
+            before: 下一页第一条记录的游标(可选)，提供时忽略页码
             
         Returns:
             list: 当前页的历史记录列表
         """
         try:
-            mlog.debug(f"历史管理器 - 分页获取历史: 页码={page}, 每页={page_size}")
+            mlog.debug(f"历史管理器 - 分页获取历史: 页码={page}, 每页={page_size}, after={after}, before={before}")
             
             # 验证输入参数
-            if page < 1:
+            if page is not None and page < 1:
+                mlog.warning(f"页码必须大于0，已将 {page} 自动调整为1")
                 page = 1
-                mlog.warning(f"页码必须大于0，已自动调整为1")
             
             if page_size < 1:
+                mlog.warning(f"每页显示数量必须大于0，已将 {page_size} 自动调整为10")
                 page_size = 10
-                mlog.warning(f"每页显示数量必须大于0，已自动调整为10")
-                
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            offset = (page - 1) * page_size
-            
-            # SQL调试信息
-            sql = "SELECT id, text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp FROM history ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-            mlog.debug(f"执行SQL: {sql} [params: {page_size}, {offset}]")
             
-            cursor.execute(sql, (page_size, offset))
-            
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'speaker': row['speaker'],
-                    'reference': row['reference'],
-                    'file_path': row['file_path'],
-                    'speed': row['speed'],
-                    'mode': row['mode'],
-                    'instruction': row['instruction'],
-                    'speaker_text': row['speaker_text'],
-                    'timestamp': row['timestamp']
-                })
-            
-            conn.close()
+            history = self._cached_query("", page, page_size, after, before)
             mlog.debug(f"历史管理器 - 查询返回 {len(history)} 条记录")
             return history
         except Exception as e:
@@ -347,16 +383,18 @@ class HistoryManager:
         Returns:
             int: 历史记录总数
         """
-        return self.db_manager.get_table_count('history')
+        return self.cache.load(("count", ""), lambda: self.db_manager.get_table_count('history'))
     
-    def filter_history_paged(self, keyword, page=1, page_size=10):
+    def filter_history_paged(self, keyword, page=1, page_size=10, after=None, before=None):
         """
         按关键词分页筛选历史记录
         
         Args:
             keyword: 搜索关键词
-            page: 页码，从1开始
+            page: 页码，从1开始，只按游标查询时为None且不缓存结果
             page_size: 每页记录数
+            after: 上一页最后一条记录的游标(可选)，提供时忽略页码
+            before: 下一页第一条记录的游标(可选)，提供时忽略页码
             
         Returns:
             list: 过滤后的当前页历史记录列表
@@ -364,54 +402,54 @@ class HistoryManager:
         try:
             mlog.debug(f"历史管理器 - 分页筛选历史: 关键词='{keyword}', 页码={page}, 每页={page_size}")
             if not keyword or keyword.strip() == "":
-                return self.get_history_paged(page, page_size)
-            
-            keyword = f"%{keyword.lower().strip()}%"
+                return self.get_history_paged(page, page_size, after, before)
             
             # 验证输入参数
-            if page < 1:
+            if page is not None and page < 1:
+                mlog.warning(f"页码必须大于0，已将 {page} 自动调整为1")
                 page = 1
-                mlog.warning(f"页码必须大于0，已自动调整为1")
             
             if page_size < 1:
+                mlog.warning(f"每页显示数量必须大于0，已将 {page_size} 自动调整为10")
                 page_size = 10
-                mlog.warning(f"每页显示数量必须大于0，已自动调整为10")
-            
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            offset = (page - 1) * page_size
             
-            # SQL调试信息
-            sql = """SELECT id, text, speaker, reference, file_path, speed, mode, instruction, speaker_text, timestamp
-                   FROM history WHERE LOWER(text) LIKE ? OR LOWER(speaker) LIKE ? OR LOWER(reference) LIKE ?
-                   ORDER BY timestamp DESC LIMIT ? OFFSET ?"""
-            mlog.debug(f"执行SQL: {sql} [关键词: {keyword}, 每页: {page_size}, 偏移: {offset}]")
-            
-            cursor.execute(sql, (keyword, keyword, keyword, page_size, offset))
-            
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    'id': row['id'],
-                    'text': row['text'],
-                    'speaker': row['speaker'],
-                    'reference': row['reference'],
-                    'file_path': row['file_path'],
-                    'speed': row['speed'],
-                    'mode': row['mode'],
-                    'instruction': row['instruction'],
-                    'speaker_text': row['speaker_text'],
-                    'timestamp': row['timestamp']
-                })
-            
-            conn.close()
+            history = self._cached_query(keyword.strip(), page, page_size, after, before)
             mlog.debug(f"历史管理器 - 筛选查询返回 {len(history)} 条记录")
             return history
         except Exception as e:
             mlog.error(f"分页筛选历史记录失败: {str(e)}")
             return []
-
+    
+    def get_history_page(self, keyword="", page=1, page_size=10, after=None, before=None):
+        """
+        分页获取历史记录，同时返回筛选后的总数，在一次数据库调用中完成
+        
+        Args:
+            keyword: 搜索关键词，为空时查询全部
+            page: 页码，从1开始
+            page_size: 每页记录数
+            after: 上一页最后一条记录的游标(可选)
+            before: 下一页第一条记录的游标(可选)
+            
+        Returns:
+            tuple: (当前页的历史记录列表, 总数)
+        """
+        try:
+            if page < 1:
+                page = 1
+            if page_size < 1:
+                page_size = 10
+            
+            keyword = (keyword or "").strip()
+            rows, total = self.cache.load(
+                ("page_total", keyword, page, page_size),
+                lambda: self._query(keyword, page_size, page, after, before, with_total=True)
+            )
+            return copy_rows(rows), total
+        except Exception as e:
+            mlog.error(f"分页获取历史记录失败: {str(e)}")
+            return [], 0
+    
     def get_filtered_count(self, keyword):
         """
         获取过滤后的历史记录总数
@@ -425,10 +463,38 @@ class HistoryManager:
         if not keyword or keyword.strip() == "":
             return self.get_total_history()
             
-        keyword = f"%{keyword.lower().strip()}%"
-        return self.db_manager.get_table_count(
-            'history', 
-            'LOWER(text) LIKE ? OR LOWER(speaker) LIKE ? OR LOWER(reference) LIKE ?', 
-            (keyword, keyword, keyword)
-        )
-
+        keyword = keyword.strip()
+        join, where, params, _ = self._keyword_filter(keyword)
+        # 使用全文索引时直接在索引表中计数，无需关联源表
+        table = 'history_fts' if join else 'history'
+        return self.cache.load(("count", keyword), lambda: self.db_manager.get_table_count(table, where, params))
+    
+    # 以下为异步版本，在数据库线程中执行，供界面回调使用
+    
+    async def aadd_record(self, record, source_file=None):
+        """异步版本的 add_record"""
+        return await self.db_manager.run(self.add_record, record, source_file)
+    
+    async def adelete_record(self, index_or_record, delete_file=True):
+        """异步版本的 delete_record"""
+        return await self.db_manager.run(self.delete_record, index_or_record, delete_file)
+    
+    async def aget_history_paged(self, page=1, page_size=10, after=None, before=None):
+        """异步版本的 get_history_paged"""
+        return await self.db_manager.run(self.get_history_paged, page, page_size, after, before)
+    
+    async def afilter_history_paged(self, keyword, page=1, page_size=10, after=None, before=None):
+        """异步版本的 filter_history_paged"""
+        return await self.db_manager.run(self.filter_history_paged, keyword, page, page_size, after, before)
+    
+    async def aget_total_history(self):
+        """异步版本的 get_total_history"""
+        return await self.db_manager.run(self.get_total_history)
+    
+    async def aget_filtered_count(self, keyword):
+        """异步版本的 get_filtered_count"""
+        return await self.db_manager.run(self.get_filtered_count, keyword)
+    
+    async def aget_history_page(self, keyword="", page=1, page_size=10, after=None, before=None):
+        """异步版本的 get_history_page"""
+        return await self.db_manager.run(self.get_history_page, keyword, page, page_size, after, before)
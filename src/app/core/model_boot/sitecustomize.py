@@ -0,0 +1,105 @@
+"""
+模型进程的启动钩子
+
+由 ModelManager 加入模型进程的 PYTHONPATH，在解释器启动时自动执行，不修改模型包本身：
+- 记录 torch 等重量级模块的导入耗时，以及每次 torch.load 加载权重的耗时，
+  以 {"event": "phase", ...} 的JSON行输出到标准输出，由 ModelManager 汇总显示
+- 支持时以 mmap 方式加载权重，重启后可直接复用系统页缓存
+
+这里只能使用标准库，任何异常都不能影响模型进程的正常启动。
+"""
+import os
+import sys
+import json
+import time
+import importlib.abc
+
+# 需要记录导入耗时的模块
+_HEAVY_MODULES = ("torch", "torchaudio", "onnxruntime", "modelscope", "transformers", "cosyvoice", "fastapi")
+
+
+def _emit(name, seconds=None):
+    """输出一个启动阶段事件"""
+    event = {"event": "phase", "name": name}
+    if seconds is not None:
+        event["seconds"] = round(seconds, 3)
+    try:
+        sys.stdout.write(json.dumps(event) + "\n")
+        sys.stdout.flush()
+    except Exception:
+        pass
+
+
+def _patch_torch_load(torch):
+    """包装 torch.load：记录耗时，并在支持时使用 mmap 加载"""
+    original = torch.load
+    use_mmap = os.environ.get("PARROT_BOOT_MMAP") == "1"
+
+    def load(f, *args, **kwargs):
+        started = time.perf_counter()
+        name = os.path.basename(f) if isinstance(f, (str, os.PathLike)) else "weights"
+        result = None
+        if use_mmap and isinstance(f, (str, os.PathLike)) and "mmap" not in kwargs:
+            try:
+                result = original(f, *args, mmap=True, **kwargs)
+            except Exception:
+                # 旧版本torch或旧格式的权重文件不支持mmap
+                result = None
+        if result is None:
+            result = original(f, *args, **kwargs)
+        _emit(f"load {name}", time.perf_counter() - started)
+        return result
+
+    load.__wrapped__ = original
+    torch.load = load
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """包装模块加载器，记录模块执行耗时"""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        self._loader.exec_module(module)
+        _emit(f"import {module.__name__}", time.perf_counter() - started)
+        if module.__name__ == "torch":
+            try:
+                _patch_torch_load(module)
+            except Exception:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimedFinder(importlib.abc.MetaPathFinder):
+    """只对重量级模块的首次导入进行计时"""
+
+    def __init__(self):
+        self._pending = set(_HEAVY_MODULES)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in self._pending:
+            return None
+        self._pending.discard(fullname)
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+try:
+    _emit("interpreter")
+    sys.meta_path.insert(0, _TimedFinder())
+except Exception:
+    pass
@@ -1,34 +1,58 @@
 import os
+import re
+import json
+import time
+import zlib
+import tempfile
 import subprocess
 import threading
+from collections import deque
+from urllib.parse import urlparse
 import aiohttp
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from app.core.downloader import RangeDownloader
 import app.core.mlog as mlog
 
 # 屏蔽不支持平台下的py7zr
 try:
     import py7zr
     from py7zr.callbacks import ExtractCallback
+    from py7zr.exceptions import CrcError
 except Exception as e:
     class ExtractCallback:
         pass
 
+    class CrcError(Exception):
+        pass
+
 class ModelExtractCallback(ExtractCallback):
     """模型解压进度回调类"""
-    def __init__(self, progress_callback):
+    def __init__(self, progress_callback, targets=None):
+        """
+        Args:
+            progress_callback: 进度回调函数
+            targets: 只解压部分文件时的文件名集合，py7zr 仍会报告其他条目，不计入进度
+        """
         self.progress_callback = progress_callback
+        self.targets = set(targets) if targets is not None else None
         self.total_files = 0
         self.current_file = 0
+    
+    def _is_target(self, filename):
+        return self.targets is None or filename in self.targets
         
     def report_start(self, filename, filesize):
         """开始解压文件时的回调"""
+        if not self._is_target(filename):
+            return
         self.current_file += 1
         if self.progress_callback:
             self.progress_callback(self.current_file, self.total_files, f"正在解压({self.current_file}/{self.total_files}): {filename}")
     
     def report_end(self, filename, filesize):
         """文件解压完成时的回调"""
-        if self.progress_callback:
+        if self.progress_callback and self._is_target(filename):
             self.progress_callback(self.current_file, self.total_files, f"完成解压({self.current_file}/{self.total_files}): {filename}")
     
     def report_warning(self, message):
@@ -57,22 +81,96 @@ class ModelExtractCallback(ExtractCallback):
         self.total_files = total
         self.current_file = 0
 
+def _extract_targets(archive_path, path, targets):
+    """
+    在子进程中解压指定的文件
+
+    Args:
+        archive_path: 压缩包路径
+        path: 解压目录
+        targets: 要解压的文件名列表
+
+    Returns:
+        int: 解压的文件数
+    """
+    with py7zr.SevenZipFile(archive_path, 'r') as archive:
+        try:
+            archive.extract(path=path, targets=targets)
+        except Exception as e:
+            if "unsupported compression algorythm" not in str(e):
+                raise e
+    return len(targets)
+
+# 终端颜色等控制序列以及其他控制字符
+_CONTROL_CHARS = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]|[\x00-\x08\x0b-\x1f\x7f]')
+
+def _file_crc32(file_path):
+    """分块计算文件的CRC32"""
+    crc = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
 class ModelManager:
     """
     模型管理类，负责模型的启动和停止
     """
-    def __init__(self):
-        """初始化模型管理器"""
+    # auto 模式下每个工作进程至少分配的CPU核心数
+    CORES_PER_WORKER = 8
+    # auto 模式下最多启动的工作进程数
+    MAX_WORKERS = 8
+    # 就绪轮询的初始间隔和最大间隔(秒)，每次失败后间隔翻倍
+    READY_POLL_INITIAL = 0.1
+    READY_POLL_MAX = 5.0
+    # 一直没有启动信号时，超过该时间(秒)后也开始轮询
+    READY_POLL_FALLBACK_AFTER = 10.0
+    # 通知界面输出的最小间隔(秒)，期间的新行合并后一次发送
+    OUTPUT_FLUSH_INTERVAL = 0.1
+    # 模型进程启动钩子所在目录，加入模型进程的 PYTHONPATH
+    BOOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_boot")
+    # 快速启动时预读到页缓存的权重文件类型
+    WEIGHT_EXTENSIONS = (".pt", ".pth", ".bin", ".safetensors", ".onnx", ".ckpt")
+    # 进程异常退出后重启的初始间隔和最大间隔(秒)
+    RESTART_BACKOFF_BASE = 2.0
+    RESTART_BACKOFF_MAX = 60.0
+    # 连续异常退出超过该次数后不再重启
+    MAX_RESTART_FAILURES = 5
+    # 进程稳定运行超过该时间(秒)后，连续失败次数重新计算
+    RESTART_RESET_AFTER = 120.0
+
+    def __init__(self, api_manager=None):
+        """
+        初始化模型管理器
+        
+        Args:
+            api_manager: API管理器实例，健康检查通过其复用的连接进行
+        """
+        self.api_manager = api_manager
         self.state = {
-            "process": None,  # 保存运行中的模型进程
+            "workers": [],  # 运行中的模型工作进程
             "running": False,  # 模型运行状态
-            "output": [],     # 捕获的输出
+            "output": deque(maxlen=200),  # 捕获的输出，超出行数时自动丢弃最早的行
             "max_output_lines": 200,  # 最大输出行数
             "output_lock": threading.Lock(),  # 输出锁
+            "pending_output": deque(maxlen=200),  # 尚未通知界面的新行
+            "output_timer": None,  # 合并通知的定时器
+            "last_output_flush": 0.0,  # 上次通知界面的时间
+            "launch": None,  # 启动参数，用于自动重启
+            "suspended": False,  # 是否因空闲而停止
+            "restart_count": 0,  # 本次运行自动重启的总次数
+            "active_requests": 0,  # 进行中的生成请求数
+            "last_activity": 0.0,  # 最近一次生成请求的时间
+            "activity_lock": threading.Lock(),
+            "waking": None,  # 正在重新加载模型时为threading.Event，加载进程启动后设置
+            "wake_lock": threading.Lock(),  # 空闲停止与重新加载互斥，避免停止刚启动的进程
             "starting": False,  # 添加启动中状态
             "api_url": None,  # 添加 API URL 存储
         }
         self.root_dir = os.getcwd()
+        if self.api_manager is not None:
+            # 生成请求前后通知，用于空闲停止和按需重新启动
+            self.api_manager.set_generation_hooks(self._before_generation, self._after_generation)
         # 当系统为windows时，使用win模型
         if os.name == 'nt':
             self.model_url = "https://dlink.host/1drv/aHR0cHM6Ly8xZHJ2Lm1zL3UvYy8yOWVhYmExOWVkNzdkNjRhL0VWV3BNUGxMNWE1TnItRjNwTmxxUzdnQmdTTTM5dkItMTBWWVVZSDgtMmxwTHc/ZT16Z0tVenE"
@@ -80,6 +178,9 @@ class ModelManager:
             self.model_url = "https://dlink.host/1drv/aHR0cHM6Ly8xZHJ2Lm1zL3UvYy8yOWVhYmExOWVkNzdkNjRhL0ViUW9xYWxUei05UHVvSHlCV1lGakw0QjU1UWJ2TmZoMHU0Z2RIbzRtTGdQWkE/ZT1kSkR1MUo"
         else:
             self.model_url = None
+        # 模型包的SHA-256，发布时填写后下载完成会进行校验；
+        # 为空时由下载器按文件大小和ETag保证续传的数据属于同一文件，解压时再逐个校验文件的CRC
+        self.model_sha256 = None
 
     def is_model_path_exists(self):
         """
@@ -90,14 +191,111 @@ class ModelManager:
         """
         return os.path.exists(self.state["model_path"])
     
-    def run_model(self, host='127.0.0.1', port='8000', on_output=None, update_status=None, path_manager=None):
+    @classmethod
+    def _available_cores(cls):
+        """
+        获取当前进程可用的CPU核心编号
+
+        Returns:
+            list: 核心编号列表
+        """
+        if hasattr(os, "sched_getaffinity"):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    @classmethod
+    def resolve_worker_count(cls, value='auto'):
+        """
+        根据设置计算模型工作进程数
+
+        Args:
+            value: 设置值，'auto' 表示按CPU核心数计算，也可以是具体数字
+
+        Returns:
+            int: 工作进程数
+        """
+        cores = len(cls._available_cores())
+        if str(value).strip().lower() in ('', 'auto'):
+            # 每个进程至少分到 CORES_PER_WORKER 个核心，普通桌面机器仍只启动一个进程
+            return max(1, min(cls.MAX_WORKERS, cores // cls.CORES_PER_WORKER))
+        try:
+            return max(1, min(int(value), cores))
+        except (TypeError, ValueError):
+            mlog.error(f"无效的模型进程数设置: {value}，使用单进程")
+            return 1
+
+    @staticmethod
+    def _split_cores(cores, count):
+        """
+        将核心均匀地划分为连续的若干组
+
+        Args:
+            cores: 核心编号列表
+            count: 组数
+
+        Returns:
+            list: 每组的核心编号列表
+        """
+        size, extra = divmod(len(cores), count)
+        groups = []
+        start = 0
+        for index in range(count):
+            end = start + size + (1 if index < extra else 0)
+            groups.append(cores[start:end])
+            start = end
+        return groups
+
+    @staticmethod
+    def _pin_process(process, cores):
+        """
+        将进程绑定到指定的CPU核心，不支持的平台上忽略
+
+        Args:
+            process: 子进程对象
+            cores: 核心编号列表
+        """
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(process.pid, cores)
+            elif os.name == 'nt':
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                # PROCESS_SET_INFORMATION | PROCESS_QUERY_INFORMATION
+                handle = kernel32.OpenProcess(0x0200 | 0x0400, False, process.pid)
+                if handle:
+                    mask = sum(1 << core for core in cores if core < 64)
+                    kernel32.SetProcessAffinityMask(handle, ctypes.c_size_t(mask))
+                    kernel32.CloseHandle(handle)
+        except Exception as e:
+            mlog.error(f"绑定模型进程CPU核心失败: {str(e)}")
+
+    def run_model(self, host='127.0.0.1', port='8000', on_output=None, update_status=None, path_manager=None,
+                  workers='auto', start_timeout=300, idle_timeout=0, fast_start=True):
         """
         运行模型
+
+        工作进程数大于1时，在 port 起的连续端口上各启动一个模型进程，每个进程绑定到
+        一组CPU核心，并登记到API管理器，生成请求按在途请求数分配到各进程。
+
+        模型进程可以在标准输出中打印 {"event": "ready"} 或写入环境变量 PARROT_READY_FILE
+        指定的文件来报告就绪，不支持时以指数退避轮询 /model_status。
+
+        异常退出的进程会按退避间隔自动重启；设置了空闲超时时，长时间没有生成请求会停止
+        模型以释放内存，下次生成时再自动启动。
+
+        快速启动模式下，在解释器启动的同时预读权重文件到系统页缓存，并通过启动钩子
+        以mmap方式加载权重、报告导入和加载各阶段的耗时。
         
         Args:
             host: 主机地址
-            port: 端口号
-            on_output: 输出回调函数
+            port: 端口号，多个工作进程时为起始端口
+            on_output: 输出回调函数，参数为新增的输出行列表
+            update_status: 状态更新回调函数
+            path_manager: 路径管理器
+            workers: 工作进程数设置，'auto' 表示按CPU核心数计算
+            start_timeout: 等待模型就绪的超时时间(秒)
+            idle_timeout: 空闲多少分钟后停止模型，0 表示不自动停止
+            fast_start: 是否启用快速启动
         
         Returns:
             tuple: (成功状态, 错误消息)
@@ -118,20 +316,12 @@ class ModelManager:
             elif os.name == 'posix':
                 python_exe = os.path.join(model_path, "bin", "python3")
             else:
-                False, "PYTHON_NOT_FOUND"
+                return False, "PYTHON_NOT_FOUND"
 
             if not os.path.exists(python_exe):
                 error_msg = f"Python解释器不存在: {python_exe}"
                 mlog.error(error_msg)
                 return False, "PYTHON_NOT_FOUND"
-            
-            # 构建命令并启动进程
-            cmd = [
-                python_exe,  # 使用cosyvoice_api目录下的Python解释器
-                "fastapi_app.py",
-                "--host", host,
-                "--port", port
-            ]
 
             env = os.environ.copy()
             env['PYTHONHOME'] = model_path  # 设置Python Home为模型目录
@@ -139,10 +329,15 @@ class ModelManager:
             # 添加 modelscope 相关环境变量，避免ast索引引发的错误
             env['MODELSCOPE_CACHE_HOME'] = os.path.join(model_path, 'modelscope_cache')
             env['MODELSCOPE_AST_DISABLE'] = '1'  # 禁用 AST 索引功能
+            if fast_start and os.path.isdir(self.BOOT_DIR):
+                # 启动钩子放在模型自带的包之后，模型包有自己的 sitecustomize 时不生效
+                env['PYTHONPATH'] += os.pathsep + self.BOOT_DIR
+                env['PARROT_BOOT_MMAP'] = '1'
 
             # 清空之前的输出
             with self.state["output_lock"]:
-                self.state["output"] = []
+                self.state["output"].clear()
+                self.state["pending_output"].clear()
             
             # 添加 Windows 特定的启动标志
             startupinfo = None
@@ -150,207 +345,674 @@ class ModelManager:
                 startupinfo = subprocess.STARTUPINFO()
                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 startupinfo.wShowWindow = subprocess.SW_HIDE
-            
-            # 修改进程创建部分，添加编码处理
-            process = subprocess.Popen(
-                cmd,
-                cwd=model_path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                encoding='utf-8',
-                errors='replace',  # 添加错误处理策略
-                env=env,
-                startupinfo=startupinfo  # 添加这行来隐藏控制台窗口
-            )
-            
-            self.state["process"] = process
-            self.state["running"] = False
-            self.state["starting"] = True  # 设置启动中状态
-            
-            # 保存API URL用于健康检查
-            self.state["api_url"] = f"http://{host}:{port}"
-            
-            # 启动线程捕获输出
-            threading.Thread(
-                target=self._capture_output,
-                args=(on_output,update_status),
-                daemon=True
-            ).start()
+
+            ready_dir = path_manager.temp_dir if path_manager else tempfile.gettempdir()
+            os.makedirs(ready_dir, exist_ok=True)
+
+            count = self.resolve_worker_count(workers)
+            launch = {
+                "host": host,
+                "port": int(port),
+                "python_exe": python_exe,
+                "model_path": model_path,
+                "env": env,
+                "startupinfo": startupinfo,
+                "ready_dir": ready_dir,
+                "core_groups": self._split_cores(self._available_cores(), count) if count > 1 else [None],
+                "start_timeout": float(start_timeout or 300),
+                "idle_timeout": float(idle_timeout or 0) * 60,
+                "on_output": on_output,
+                "update_status": update_status,
+                "idle_stop": threading.Event(),  # 停止模型时结束空闲检查
+                "fast_start": fast_start,
+            }
+            self.state["launch"] = launch
+            self.state["suspended"] = False
+            self.state["restart_count"] = 0
+            self.state["last_activity"] = time.monotonic()
+
+            # 保存API URL用于健康检查，多进程时为第一个进程的地址
+            self.state["api_url"] = f"http://{host}:{launch['port']}"
+            self._launch_workers(launch)
+
+            if launch["idle_timeout"] > 0:
+                threading.Thread(target=self._watch_idle, args=(launch,), daemon=True).start()
             return True, None
         except Exception as e:
             error_msg = f"启动模型失败: {str(e)}"
             mlog.error(error_msg)
+            self.stop_model()
             return False, error_msg
+
+    def _launch_workers(self, launch):
+        """
+        按启动参数启动所有工作进程
+
+        Args:
+            launch: run_model 保存的启动参数
+        """
+        self.state["workers"] = []
+        self.state["running"] = False
+        self.state["starting"] = True  # 设置启动中状态
+        if self.api_manager is not None:
+            self.api_manager.set_workers(self.state["api_url"], [])
+
+        if launch["fast_start"]:
+            # 与解释器启动并行预读权重文件
+            threading.Thread(target=self._prefetch_weights, args=(launch["model_path"],), daemon=True).start()
+
+        for index, cores in enumerate(launch["core_groups"]):
+            self.state["workers"].append(self._spawn_worker(launch, launch["port"] + index, cores))
+
+    def _prefetch_weights(self, model_path):
+        """
+        将模型权重文件预读到系统页缓存，模型加载权重时直接从内存读取
+
+        Linux 上使用 posix_fadvise 交给内核异步预读，其他平台顺序读取一遍文件。
+
+        Args:
+            model_path: 模型目录
+        """
+        started = time.monotonic()
+        files, total = 0, 0
+        try:
+            for root, _, names in os.walk(model_path):
+                for name in names:
+                    if not name.lower().endswith(self.WEIGHT_EXTENSIONS):
+                        continue
+                    file_path = os.path.join(root, name)
+                    with open(file_path, 'rb') as f:
+                        if hasattr(os, "posix_fadvise"):
+                            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+                        else:
+                            while f.read(4 * 1024 * 1024):
+                                pass
+                    files += 1
+                    total += os.path.getsize(file_path)
+            mlog.info(
+                f"已预读 {files} 个模型权重文件（{total / 1024 / 1024 / 1024:.1f} GB），"
+                f"用时 {time.monotonic() - started:.1f} 秒"
+            )
+        except Exception as e:
+            mlog.error(f"预读模型权重失败: {str(e)}")
+
+    def _spawn_worker(self, launch, worker_port, cores, restarts=0, failures=0):
+        """
+        启动单个工作进程，并开始捕获输出和等待就绪
+
+        Args:
+            launch: run_model 保存的启动参数
+            worker_port: 端口号
+            cores: 绑定的CPU核心，None 表示不绑定
+            restarts: 该端口已自动重启的次数
+            failures: 连续异常退出的次数
+
+        Returns:
+            dict: 工作进程信息
+        """
+        cmd = [
+            launch["python_exe"],  # 使用cosyvoice_api目录下的Python解释器
+            "fastapi_app.py",
+            "--host", launch["host"],
+            "--port", str(worker_port)
+        ]
+
+        # 就绪文件由模型进程在加载完成后创建，先清除上次残留的文件
+        ready_file = os.path.join(launch["ready_dir"], f"model_ready_{worker_port}")
+        if os.path.exists(ready_file):
+            os.remove(ready_file)
+
+        worker_env = dict(launch["env"])
+        worker_env['PARROT_READY_FILE'] = ready_file
+        if cores:
+            # 限制计算库的线程数与分到的核心数一致，避免进程之间争抢核心
+            for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+                worker_env[name] = str(len(cores))
+
+        # 修改进程创建部分，添加编码处理
+        started_at = time.monotonic()
+        process = subprocess.Popen(
+            cmd,
+            cwd=launch["model_path"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            universal_newlines=True,
+            encoding='utf-8',
+            errors='replace',  # 添加错误处理策略
+            env=worker_env,
+            startupinfo=launch["startupinfo"]  # 添加这行来隐藏控制台窗口
+        )
+        if cores:
+            self._pin_process(process, cores)
+            mlog.info(f"启动模型进程: 端口 {worker_port}, CPU核心 {cores[0]}-{cores[-1]}")
+
+        worker = {
+            "process": process,
+            "port": worker_port,
+            "api_url": f"http://{launch['host']}:{worker_port}",
+            "cores": cores,
+            "ready": False,
+            "stopping": False,  # 主动停止的进程退出时不重启
+            "restarts": restarts,
+            "failures": failures,
+            "ready_file": ready_file,
+            "started_at": started_at,
+            "phases": {},  # 启动阶段 -> 发生时间
+            "durations": {},  # 启动阶段 -> 进程报告的该阶段耗时
+            "signal": threading.Event(),  # 出现启动事件时唤醒就绪检查
+        }
+
+        # 启动线程捕获输出，并等待进程就绪
+        threading.Thread(
+            target=self._capture_output,
+            args=(worker, launch["on_output"]),
+            daemon=True
+        ).start()
+        threading.Thread(
+            target=self._watch_readiness,
+            args=(worker, launch["start_timeout"], launch["on_output"], launch["update_status"]),
+            daemon=True
+        ).start()
+        return worker
+
+    def _schedule_restart(self, worker):
+        """
+        工作进程异常退出后按指数退避安排重启，连续失败过多时放弃
+
+        Args:
+            worker: 已退出的工作进程信息
+        """
+        launch = self.state["launch"]
+        if launch is None:
+            return
+
+        # 稳定运行一段时间后的退出不计入连续失败
+        if time.monotonic() - worker["started_at"] > self.RESTART_RESET_AFTER:
+            worker["failures"] = 0
+        failures = worker["failures"] + 1
+        code = worker["process"].returncode
+
+        if failures > self.MAX_RESTART_FAILURES:
+            message = f"模型进程 {worker['port']} 连续 {failures - 1} 次重启后仍异常退出（返回码 {code}），不再重启"
+            mlog.error(message)
+            self._append_output(message, launch["on_output"])
+            if not self.state["running"] and not self.state["starting"] and launch["update_status"]:
+                launch["update_status"](False)
+            return
+
+        delay = min(self.RESTART_BACKOFF_BASE * 2 ** (failures - 1), self.RESTART_BACKOFF_MAX)
+        self.state["restart_count"] += 1
+        message = f"模型进程 {worker['port']} 异常退出（返回码 {code}），{delay:.0f} 秒后进行第 {worker['restarts'] + 1} 次重启"
+        mlog.error(message)
+        self._append_output(message, launch["on_output"])
+        if not self.state["running"]:
+            # 没有可用的进程时显示为启动中
+            self.state["starting"] = True
+            if launch["update_status"]:
+                launch["update_status"](False, True)
+
+        def restart():
+            # 等待期间模型被停止或已重新启动时放弃
+            if self.state["launch"] is not launch or worker not in self.state["workers"]:
+                return
+            new_worker = self._spawn_worker(
+                launch, worker["port"], worker["cores"], worker["restarts"] + 1, failures
+            )
+            workers = self.state["workers"]
+            if worker in workers:
+                workers[workers.index(worker)] = new_worker
+                self._update_routes()
+            else:
+                self._stop_worker(new_worker)
+
+        timer = threading.Timer(delay, restart)
+        timer.daemon = True
+        timer.start()
+
+    def _watch_idle(self, launch):
+        """
+        空闲检查，超过空闲时间没有生成请求时停止模型（在独立线程中执行）
+
+        Args:
+            launch: run_model 保存的启动参数
+        """
+        interval = min(max(launch["idle_timeout"] / 4, 1), 30)
+        while not launch["idle_stop"].wait(interval):
+            if self.state["launch"] is not launch:
+                return
+            # 标记休眠和停止进程在同一次 wake_lock 内完成，
+            # 期间到达的请求会等停止结束后再重新加载，不会被停止刚启动的进程
+            with self.state["wake_lock"]:
+                with self.state["activity_lock"]:
+                    idle = (
+                        self.state["running"]
+                        and not self.state["suspended"]
+                        and self.state["active_requests"] == 0
+                        and time.monotonic() - self.state["last_activity"] > launch["idle_timeout"]
+                    )
+                    if idle:
+                        self.state["suspended"] = True
+                if idle:
+                    self._suspend(launch)
+
+    def _suspend(self, launch):
+        """停止空闲的模型进程，保留启动参数以便下次生成时重新启动"""
+        self._stop_workers()
+        message = f"模型已空闲 {launch['idle_timeout'] / 60:g} 分钟，已停止以释放内存，下次生成时自动重新加载"
+        mlog.info(message)
+        self._append_output(message, launch["on_output"])
+        if launch["update_status"]:
+            launch["update_status"](False)
+
+    def _is_model_api(self, api_url):
+        """判断API地址是否指向本地运行的模型"""
+        if self.state["launch"] is None or not api_url:
+            return False
+        parsed = urlparse(api_url if "://" in api_url else f"http://{api_url}")
+        launch = self.state["launch"]
+        local_hosts = (launch["host"], "127.0.0.1", "localhost", "0.0.0.0")
+        return parsed.port == launch["port"] and parsed.hostname in local_hosts
+
+    async def _before_generation(self, api_url, progress_callback=None):
+        """
+        生成请求开始前调用：记录活动，模型已因空闲停止时重新启动并等待就绪
+
+        Args:
+            api_url: API地址
+            progress_callback: 进度回调函数，用于显示模型加载状态
+        """
+        if not self._is_model_api(api_url):
+            return
+        launch = self.state["launch"]
+        with self.state["activity_lock"]:
+            self.state["active_requests"] += 1
+            self.state["last_activity"] = time.monotonic()
+            # 只有第一个请求负责重新加载，同时到达的其他请求等待同一次加载
+            wake = self.state["suspended"]
+            if wake:
+                self.state["suspended"] = False
+                self.state["waking"] = threading.Event()
+            waking = self.state["waking"]
+
+        if wake:
+            try:
+                message = "收到生成请求，正在重新加载模型..."
+                mlog.info(message)
+                self._append_output(message, launch["on_output"])
+                with self.state["wake_lock"]:
+                    self._launch_workers(launch)
+                if launch["update_status"]:
+                    launch["update_status"](False, True)
+            finally:
+                with self.state["activity_lock"]:
+                    self.state["waking"] = None
+                waking.set()
+
+        # 等待模型就绪，期间在进度中显示加载状态
+        started = time.monotonic()
+        while (waking is not None and not waking.is_set()) or (self.state["starting"] and not self.state["running"]):
+            elapsed = time.monotonic() - started
+            if elapsed > launch["start_timeout"]:
+                break
+            if progress_callback:
+                progress_callback({"progress": 0, "text_progress": f"正在加载模型（{elapsed:.0f}秒）..."})
+            await asyncio.sleep(0.5)
+
+    def _after_generation(self, api_url):
+        """
+        生成请求结束后调用：更新最近活动时间
+
+        Args:
+            api_url: API地址
+        """
+        if not self._is_model_api(api_url):
+            return
+        with self.state["activity_lock"]:
+            self.state["active_requests"] = max(self.state["active_requests"] - 1, 0)
+            self.state["last_activity"] = time.monotonic()
+
+    def is_suspended(self):
+        """
+        检查模型是否因空闲而停止，下次生成时会自动重新启动
+
+        Returns:
+            bool: 是否已休眠
+        """
+        return self.state["suspended"]
+
+    def _update_routes(self):
+        """将已就绪的工作进程登记到API管理器，并同步运行状态"""
+        workers = self.state["workers"]
+        ready = [worker["api_url"] for worker in workers if worker["ready"]]
+        if self.api_manager is not None and self.state["api_url"]:
+            self.api_manager.set_workers(self.state["api_url"], ready)
+
+        alive = [worker for worker in workers if worker["process"].poll() is None]
+        self.state["running"] = bool(ready)
+        self.state["starting"] = not ready and bool(alive)
     
-    async def _check_model_health(self):
+    async def _check_model_health(self, api_url=None, session=None):
         """检查模型是否真正启动成功"""
+        api_url = api_url or self.state['api_url']
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.state['api_url']}/model_status") as response:
-                    return response.status == 200
+            if self.api_manager is not None:
+                success, _ = await self.api_manager.check_endpoint(api_url)
+                return success
+            timeout = aiohttp.ClientTimeout(total=5)
+            async with session.get(f"{api_url}/model_status", timeout=timeout) as response:
+                return response.status == 200
         except Exception as e:
-            mlog.error(f"模型健康检查失败: {str(e)}")
+            mlog.debug(f"模型健康检查失败: {str(e)}")
             return False
 
-    async def _wait_for_model_ready_async(self, max_retries=30, delay=1):
-        """异步等待模型准备就绪
-        
+    @staticmethod
+    def _parse_startup_event(line):
+        """
+        解析模型进程输出的结构化启动事件
+
+        事件为单行JSON，例如 {"event": "phase", "name": "load_model"} 或 {"event": "ready"}
+
         Args:
-            max_retries: 最大重试次数
-            delay: 每次重试间隔(秒)
-        
+            line: 输出行
+
         Returns:
-            bool: 是否成功启动
+            dict: 事件内容，不是启动事件时返回None
         """
-        for _ in range(max_retries):
-            if await self._check_model_health():
-                return True
-            await asyncio.sleep(delay)
-        return False
-    
-    def _wait_for_model_ready(self, max_retries=30, delay=1):
-        """等待模型准备就绪
-        
+        if not line.startswith('{'):
+            return None
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        if isinstance(event, dict) and event.get("event") in ("phase", "ready"):
+            return event
+        return None
+
+    async def _wait_for_worker_ready(self, worker, timeout):
+        """
+        等待工作进程就绪
+
+        优先使用进程报告的就绪事件（标准输出中的JSON行或就绪文件）；服务开始监听后，
+        或长时间没有任何启动信号时，改为以指数退避轮询 /model_status。
+
         Args:
-            max_retries: 最大重试次数
-            delay: 每次重试间隔(秒)
-        
+            worker: 工作进程信息
+            timeout: 超时时间(秒)
+
         Returns:
-            bool: 是否成功启动
+            bool: 是否在超时前就绪
+        """
+        deadline = worker["started_at"] + timeout
+        delay = self.READY_POLL_INITIAL
+        session = aiohttp.ClientSession() if self.api_manager is None else None
+        try:
+            while True:
+                worker["signal"].clear()
+                now = time.monotonic()
+                if worker["process"].poll() is not None or worker not in self.state["workers"]:
+                    return False
+                if "ready" in worker["phases"]:
+                    return True
+                if os.path.exists(worker["ready_file"]):
+                    worker["phases"]["ready"] = now
+                    return True
+                if now >= deadline:
+                    return False
+
+                wait = min(self.READY_POLL_MAX, worker["started_at"] + self.READY_POLL_FALLBACK_AFTER - now)
+                if "listening" in worker["phases"] or wait <= 0:
+                    if await self._check_model_health(worker["api_url"], session):
+                        worker["phases"]["ready"] = time.monotonic()
+                        return True
+                    wait = delay
+                    delay = min(delay * 2, self.READY_POLL_MAX)
+
+                # 输出中出现启动事件时会立即唤醒
+                await asyncio.get_running_loop().run_in_executor(
+                    None, worker["signal"].wait, min(wait, max(deadline - now, 0))
+                )
+        finally:
+            if session is not None:
+                await session.close()
+
+    def _format_startup_timings(self, worker):
+        """
+        计算并格式化工作进程各启动阶段的耗时
+
+        Returns:
+            str: 耗时说明
+        """
+        labels = {"first_output": "首次输出", "interpreter": "解释器启动", "listening": "服务监听", "ready": "就绪"}
+        phases = sorted(worker["phases"].items(), key=lambda item: item[1])
+        worker["timings"] = {name: at - worker["started_at"] for name, at in phases}
+
+        details = []
+        for name, seconds in worker["timings"].items():
+            detail = f"{labels.get(name, name)} {seconds:.1f}秒"
+            # 进程报告了该阶段本身的耗时（如导入模块、加载权重）
+            if name in worker["durations"]:
+                detail += f"（耗时{worker['durations'][name]:.1f}秒）"
+            details.append(detail)
+        details = "，".join(details)
+        return f"模型进程 {worker['port']} 已就绪，用时 {worker['timings'].get('ready', 0):.1f} 秒（{details}）"
+
+    def _watch_readiness(self, worker, timeout, on_output=None, update_status=None):
+        """
+        等待工作进程就绪并更新状态（在独立线程中执行）
+
+        Args:
+            worker: 工作进程信息
+            timeout: 超时时间(秒)
+            on_output: 输出回调函数
+            update_status: 状态更新回调函数
         """
-        # 使用事件循环运行异步方法
         loop = asyncio.new_event_loop()
-        result = loop.run_until_complete(self._wait_for_model_ready_async(max_retries, delay))
-        loop.close()
-        return result
+        asyncio.set_event_loop(loop)
+        try:
+            ready = loop.run_until_complete(self._wait_for_worker_ready(worker, timeout))
+        except Exception as e:
+            mlog.error(f"等待模型就绪失败: {str(e)}")
+            ready = False
+        finally:
+            loop.close()
+
+        if worker not in self.state["workers"]:
+            return
+        if ready:
+            message = self._format_startup_timings(worker)
+            mlog.info(message)
+            self._append_output(message, on_output)
+
+            was_running = self.state["running"]
+            worker["ready"] = True
+            self._update_routes()
+
+            # 第一个进程加载完成后更新状态
+            if update_status is not None and not was_running:
+                update_status(True)
+        elif worker["process"].poll() is None:
+            message = f"模型启动超时（{timeout}秒）: {worker['api_url']}"
+            mlog.error(message)
+            self._append_output(message, on_output)
+            self._stop_worker(worker)  # 启动失败时停止该进程
+            self._update_routes()
+
+    def _append_output(self, line, on_output=None):
+        """
+        添加一行输出，并在合并间隔后把新增的行通知界面
+
+        Args:
+            line: 输出行
+            on_output: 输出回调函数，参数为新增的行列表
+        """
+        with self.state["output_lock"]:
+            self.state["output"].append(line)
+            if on_output is None:
+                return
+            self.state["pending_output"].append(line)
+            if self.state["output_timer"] is None:
+                delay = self.state["last_output_flush"] + self.OUTPUT_FLUSH_INTERVAL - time.monotonic()
+                timer = threading.Timer(max(delay, 0), self._flush_output, args=(on_output,))
+                timer.daemon = True
+                self.state["output_timer"] = timer
+                timer.start()
+
+    def _flush_output(self, on_output):
+        """把合并的新增输出行一次性通知界面"""
+        with self.state["output_lock"]:
+            lines = list(self.state["pending_output"])
+            self.state["pending_output"].clear()
+            self.state["output_timer"] = None
+            self.state["last_output_flush"] = time.monotonic()
+        if lines:
+            try:
+                on_output(lines)
+            except Exception as callback_error:
+                mlog.debug(f"输出回调执行失败: {str(callback_error)}")
     
-    def _capture_output(self, on_output=None, update_status=None):
+    def _capture_output(self, worker, on_output=None):
         """
-        捕获模型输出
+        捕获模型工作进程的输出，并记录启动事件
         
         Args:
+            worker: 工作进程信息
             on_output: 输出回调函数
-            update_status: 状态更新回调函数
         """
-        process = self.state["process"]
-        if not process:
-            return
+        process = worker["process"]
+        phases = worker["phases"]
+        # 多进程时在输出前标注端口，便于区分
+        prefix = f"[{worker['port']}] " if worker["cores"] else ""
         
         try:
             for line in iter(process.stdout.readline, ''):
                 if not line:
                     break
                 
+                now = time.monotonic()
+                phases.setdefault("first_output", now)
+
                 try:
-                    # 添加输出行到缓存
-                    with self.state["output_lock"]:
-                        # 过滤掉不可打印字符
-                        cleaned_line = ''.join(char for char in line.strip() if char.isprintable())
-                        self.state["output"].append(cleaned_line)
-                        
-                        # 限制输出行数
-                        if len(self.state["output"]) > self.state["max_output_lines"]:
-                            self.state["output"] = self.state["output"][-self.state["max_output_lines"]:]
-                        
-                        # 如果有回调函数，确保在主线程中调用
-                        if on_output:
-                            output_text = "\n".join(self.state["output"])
-                            try:
-                                on_output(output_text)
-                            except Exception as callback_error:
-                                pass
-                
+                    # 去掉终端颜色等控制字符
+                    cleaned_line = _CONTROL_CHARS.sub('', line).strip()
+                    event = self._parse_startup_event(cleaned_line)
+                    # 启动事件汇总在就绪信息中，不逐条显示
+                    if event is None:
+                        self._append_output(prefix + cleaned_line, on_output)
                 except Exception as line_error:
                     mlog.error(f"处理输出行时出错: {str(line_error)}")
                     continue
-                
-                # 检测启动信号并进行健康检查
-                if "Uvicorn running on" in line:
-                    # 启动健康检查线程
-                    def health_check():
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        if loop.run_until_complete(self._wait_for_model_ready_async()):
-                            self.state["starting"] = False
-                            self.state["running"] = True
-
-                            # 确认加载完成后更新状态
-                            if update_status is not None:
-                                update_status(True)
-                        else:
-                            mlog.error("模型启动超时")
-                            self.stop_model()  # 启动失败时停止模型
-                        loop.close()
-                    
-                    threading.Thread(
-                        target=health_check,
-                        daemon=True
-                    ).start()
-                
-                # 确保回调在状态更新后执行
-                with self.state["output_lock"]:
-                    if on_output:
-                        output_text = "\n".join(self.state["output"])
-                        try:
-                            on_output(output_text)
-                        except Exception as callback_error:
-                            # mlog.error(f"输出回调执行失败: {str(callback_error)}")
-                            pass
+
+                # 记录启动事件并唤醒就绪检查
+                if event is not None:
+                    name = "ready" if event["event"] == "ready" else str(event.get("name", "phase"))
+                    phases.setdefault(name, now)
+                    if "seconds" in event:
+                        worker["durations"][name] = event["seconds"]
+                    worker["signal"].set()
+                elif "Uvicorn running on" in line:
+                    phases.setdefault("listening", now)
+                    worker["signal"].set()
                     
         except Exception as e:
             mlog.error(f"捕获模型输出失败: {str(e)}")
         finally:
-            # 进程结束后更新状态
-            if process.poll() is not None:
-                self.state["starting"] = False
-                self.state["running"] = False
-                # 确保最后一次输出能够显示
-                if on_output:
-                    try:
-                        output_text = "\n".join(self.state["output"])
-                        on_output(output_text)
-                    except Exception as final_error:
-                        mlog.error(f"最终输出回调执行失败: {str(final_error)}")
+            worker["signal"].set()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            # 进程结束后不再向其分配请求，非主动停止的进程自动重启
+            if process.poll() is not None and worker in self.state["workers"]:
+                worker["ready"] = False
+                self._update_routes()
+                if not worker["stopping"]:
+                    self._schedule_restart(worker)
+
+    def get_startup_timings(self):
+        """
+        获取各工作进程最近一次启动的阶段耗时
+
+        Returns:
+            dict: 端口 -> {阶段名: 距进程启动的秒数}
+        """
+        return {worker["port"]: dict(worker.get("timings", {})) for worker in self.state["workers"]}
+
+    @staticmethod
+    def _stop_worker(worker):
+        """
+        停止单个工作进程
+
+        Args:
+            worker: 工作进程信息
+        """
+        process = worker["process"]
+        worker["ready"] = False
+        worker["stopping"] = True
+        if process.poll() is not None:
+            return
+        # 在Windows上终止进程及其子进程，屏蔽cmd出现
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            startupinfo.wShowWindow = subprocess.SW_HIDE
+            subprocess.run(['taskkill', '/F', '/T', '/PID', 
+                            str(process.pid)],
+                            stderr=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL,
+                            startupinfo=startupinfo
+                            )
+        else:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
     
     def stop_model(self):
         """
-        停止模型
+        停止模型，之后不再自动重启
+        
+        Returns:
+            bool: 停止是否成功
+        """
+        launch = self.state["launch"]
+        if launch is not None:
+            launch["idle_stop"].set()
+        self.state["launch"] = None
+        self.state["suspended"] = False
+        return self._stop_workers()
+
+    def _stop_workers(self):
+        """
+        停止所有模型工作进程
         
         Returns:
             bool: 停止是否成功
         """
-        if self.state["process"] and (self.state["running"] or self.state["starting"]):
+        workers = self.state["workers"]
+        if not workers:
+            return True  # 如果没有运行中的模型，也返回成功
+
+        success = True
+        for worker in workers:
             try:
-                # 在Windows上终止进程及其子进程，屏蔽cmd出现
-                if os.name == 'nt':
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = subprocess.SW_HIDE
-                    subprocess.run(['taskkill', '/F', '/T', '/PID', 
-                                    str(self.state["process"].pid)],
-                                    stderr=subprocess.DEVNULL,
-                                    stdout=subprocess.DEVNULL,
-                                    startupinfo=startupinfo
-                                    )
-                else:
-                    self.state["process"].terminate()
-                    self.state["process"].wait(timeout=5)
-                
-                self.state["starting"] = False
-                self.state["running"] = False
-                self.state["process"] = None
-                return True
+                self._stop_worker(worker)
             except Exception as e:
                 mlog.error(f"停止模型失败: {str(e)}")
-                return False
-        return True  # 如果没有运行中的模型，也返回成功
+                success = False
+
+        if self.api_manager is not None and self.state["api_url"]:
+            self.api_manager.set_workers(self.state["api_url"], [])
+        self.state["starting"] = False
+        self.state["running"] = False
+        self.state["workers"] = []
+        return success
     
     def is_running(self):
         """
-        检查模型是否正在运行
+        检查模型是否正在运行（至少一个工作进程已就绪）
         
         Returns:
             bool: 是否正在运行
@@ -390,49 +1052,22 @@ class ModelManager:
             # 创建临时文件路径
             temp_zip = os.path.join(self.root_dir, "cosyvoice_api.7z")
 
-            # 检查文件是否已存在
+            # 只有下载完整并通过校验的文件才会出现在该路径，未完成的下载保存在 .part 文件中
             if os.path.exists(temp_zip):
                 if progress_callback:
                     progress_callback(-1, -1, "模型文件已存在，开始解压...")
             else:
-                # 执行下载流程
-                timeout = aiohttp.ClientTimeout(total=36000)  # 设置10小时超时
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    try:
-                        if progress_callback:
-                            progress_callback(-1, -1, "正在连接下载服务器...")
-                        
-                        if self.model_url is None:
-                            return False, "该系统暂未适配模型"
-
-                        async with session.get(self.model_url) as response:
-                            if response.status != 200:
-                                error_msg = f"下载失败: 状态码 {response.status}"
-                                mlog.error(error_msg)
-                                return False, error_msg
-
-                            total_size = int(response.headers.get('content-length', 0))
-                            chunk_size = 8192
-                            current_size = 0
-
-                            if progress_callback:
-                                progress_callback(0, total_size, "开始下载模型文件...")
-
-                            with open(temp_zip, 'wb') as f:
-                                async for chunk in response.content.iter_chunked(chunk_size):
-                                    if chunk:
-                                        f.write(chunk)
-                                        current_size += len(chunk)
-                                        if progress_callback:
-                                            progress_callback(current_size, total_size, "正在下载模型文件...")
-                    except aiohttp.ClientError as e:
-                        error_msg = f"网络错误: {str(e)}"
-                        mlog.error(error_msg)
-                        return False, error_msg
-                    except asyncio.TimeoutError:
-                        error_msg = "下载超时，请检查网络连接"
-                        mlog.error(error_msg)
-                        return False, error_msg
+                if self.model_url is None:
+                    return False, "该系统暂未适配模型"
+
+                success, error = await RangeDownloader().download(
+                    self.model_url,
+                    temp_zip,
+                    progress_callback,
+                    expected_sha256=self.model_sha256
+                )
+                if not success:
+                    return False, error
             
             # 解压文件
             # 确保cosyvoice_api目录存在
@@ -442,30 +1077,7 @@ class ModelManager:
                 if progress_callback:
                     progress_callback(-1, -1, "正在打开压缩文件...")
 
-                with py7zr.SevenZipFile(temp_zip, 'r') as archive:
-                    # 获取压缩包中的文件列表时忽略错误
-                    try:
-                        all_files = archive.getnames()
-                    except Exception as e:
-                        if "unsupported compression algorythm" not in str(e):
-                            raise e
-                        all_files = []  # 如果获取失败，使用空列表
-                    
-                    total_files = len(all_files) or 100  # 如果获取失败，使用默认值
-                    
-                    # 创建解压回调实例
-                    callback = ModelExtractCallback(progress_callback)
-                    callback.init_total_files(total_files)
-                    
-                    if progress_callback:
-                        progress_callback(-1, -1, f"开始解压，共 {total_files} 个文件...")
-                    
-                    # 开始解压，忽略特定警告
-                    try:
-                        archive.extractall(path=model_path, callback=callback)
-                    except Exception as e:
-                        if "unsupported compression algorythm" not in str(e):
-                            raise e
+                await self._extract_archive(temp_zip, model_path, progress_callback)
                 
                 if progress_callback:
                     progress_callback(-1, -1, "解压完成，正在清理临时文件...")
@@ -478,7 +1090,7 @@ class ModelManager:
                 
                 return True, None
                 
-            except py7zr.Bad7zFile:
+            except (py7zr.Bad7zFile, CrcError):
                 error_msg = "下载的文件已损坏，请重试"
                 mlog.error(error_msg)
                 # 删除损坏的文件
@@ -495,6 +1107,113 @@ class ModelManager:
             mlog.error(error_msg)
             return False, error_msg
             
+    def _plan_extraction(self, archive, model_path):
+        """
+        按压缩块对待解压的文件分组，跳过已存在且大小和CRC一致的文件
+
+        同一个固实压缩块只能顺序解码，不同压缩块之间互不依赖，可以并行解压。
+
+        Args:
+            archive: 已打开的SevenZipFile
+            model_path: 解压目录
+
+        Returns:
+            tuple: (按压缩块分组的待解压文件名列表, 压缩包内文件总数, 已跳过的文件数)
+        """
+        entries = {info.filename: info for info in archive.list()}
+        groups = {}
+        total = 0
+        skipped = 0
+
+        for member in archive.files:
+            info = entries.get(member.filename)
+            if info is None:
+                continue
+            target = os.path.join(model_path, info.filename)
+            if info.is_directory:
+                os.makedirs(target, exist_ok=True)
+                continue
+
+            total += 1
+            if os.path.isfile(target) and os.path.getsize(target) == info.uncompressed:
+                if info.crc32 is None or _file_crc32(target) == info.crc32:
+                    skipped += 1
+                    continue
+
+            # 空文件没有所属的压缩块，单独成组
+            key = id(member.folder) if member.folder is not None else None
+            groups.setdefault(key, []).append(info.filename)
+
+        return list(groups.values()), total, skipped
+
+    async def _extract_archive(self, archive_path, model_path, progress_callback=None):
+        """
+        解压模型压缩包，可重复执行，已正确解压的文件会被跳过
+
+        有多个独立压缩块时使用多进程并行解压，只有一个压缩块时在当前进程中解压以便逐文件显示进度。
+
+        Args:
+            archive_path: 压缩包路径
+            model_path: 解压目录
+            progress_callback: 进度回调函数
+        """
+        loop = asyncio.get_running_loop()
+
+        with py7zr.SevenZipFile(archive_path, 'r') as archive:
+            groups, total_files, skipped = await loop.run_in_executor(
+                None, self._plan_extraction, archive, model_path
+            )
+
+        pending = sum(len(group) for group in groups)
+        if progress_callback:
+            if skipped:
+                progress_callback(-1, -1, f"已跳过 {skipped} 个完整的文件，剩余 {pending} 个文件待解压...")
+            else:
+                progress_callback(-1, -1, f"开始解压，共 {total_files} 个文件...")
+        if not groups:
+            return
+
+        workers = min(len(groups), os.cpu_count() or 1)
+        if workers > 1:
+            try:
+                done = 0
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        loop.run_in_executor(pool, _extract_targets, archive_path, model_path, group)
+                        for group in groups
+                    ]
+                    for future in asyncio.as_completed(futures):
+                        done += await future
+                        if progress_callback:
+                            progress_callback(done, pending, f"正在解压({done}/{pending})，{workers} 个进程")
+                return
+            except (py7zr.Bad7zFile, CrcError):
+                # 压缩包损坏时单进程解压同样会失败，交给调用方删除压缩包
+                raise
+            except Exception as e:
+                # 无法创建子进程时（如部分打包环境）退回单进程解压，已完成的文件会被跳过
+                mlog.error(f"多进程解压失败，改用单进程解压: {str(e)}")
+                with py7zr.SevenZipFile(archive_path, 'r') as archive:
+                    groups, _, _ = await loop.run_in_executor(
+                        None, self._plan_extraction, archive, model_path
+                    )
+
+        def extract_in_process():
+            targets = [name for group in groups for name in group]
+            if not targets:
+                return
+            # 指定 targets 时 py7zr 仍会对压缩块中的每个条目调用回调，只统计待解压的文件
+            callback = ModelExtractCallback(progress_callback, targets)
+            callback.init_total_files(len(targets))
+            with py7zr.SevenZipFile(archive_path, 'r') as archive:
+                try:
+                    archive.extract(path=model_path, targets=targets, callback=callback)
+                except Exception as e:
+                    if "unsupported compression algorythm" not in str(e):
+                        raise e
+
+        await loop.run_in_executor(None, extract_in_process)
+
     def check_model_exists(self):
         """
         检查模型文件是否存在
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+
+class QueryCache:
+    """
+    查询结果缓存类，按最近使用顺序保留有限数量的查询结果，
+    数据有修改时整体失效，供历史记录和角色列表的翻页和搜索复用
+    """
+    def __init__(self, max_entries=64):
+        """
+        初始化查询结果缓存
+
+        Args:
+            max_entries: 最多缓存的查询结果数量
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次失效时递增，用于丢弃失效前开始的查询结果
+        self._version = 0
+
+    def load(self, key, loader):
+        """
+        获取缓存的查询结果，没有缓存时调用loader查询并保存
+
+        Args:
+            key: 查询的键
+            loader: 无参数的查询函数，抛出异常时不缓存
+
+        Returns:
+            查询结果
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            version = self._version
+
+        value = loader()
+
+        with self._lock:
+            # 查询期间数据有修改时结果可能已过期，不缓存
+            if version == self._version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        """数据有修改时清空缓存"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+def copy_rows(rows):
+    """
+    复制缓存的查询结果，调用方修改返回的列表或记录时不影响缓存
+
+    Args:
+        rows: 记录字典的列表
+
+    Returns:
+        list: 列表及其中每条记录的浅拷贝
+    """
+    return [dict(row) for row in rows]
@@ -1,5 +1,5 @@
-import os
-import json
+from app.core.utils import mark_keyword
+from app.core.query_cache import QueryCache, copy_rows
 import app.core.mlog as mlog
 
 class RoleManager:
@@ -10,68 +10,39 @@ class RoleManager:
         """初始化角色管理器"""
         self.path_manager = pathmanager
         self.db_manager = dbmanager
-        self.roles_file = self.path_manager.roles_file
-        self._migrate_from_json_if_needed()
-        self._ensure_speaker_text_column()
+        # 角色列表、分页查询和计数结果的缓存，角色有增删改时失效
+        self.cache = QueryCache()
+        # 角色有变化时通知的回调函数
+        self._listeners = []
     
-    def _migrate_from_json_if_needed(self):
+    def add_listener(self, callback):
         """
-        如果存在旧的JSON文件，则迁移数据到SQLite
+        注册角色变化的回调函数，角色增删改后在执行修改的线程中调用
+        
+        Args:
+            callback: 无参数的回调函数
         """
-        if os.path.exists(self.roles_file):
-            try:
-                with open(self.roles_file, 'r') as f:
-                    roles = json.load(f)
-                
-                if roles:
-                    conn = self.db_manager.get_connection()
-                    cursor = conn.cursor()
-                    
-                    # 检查数据库中是否已有角色数据
-                    cursor.execute("SELECT COUNT(*) FROM roles")
-                    count = cursor.fetchone()[0]
-                    
-                    # 如果数据库是空的，才进行迁移
-                    if count == 0:
-                        for role in roles:
-                            cursor.execute(
-                                "INSERT INTO roles (name, description, file) VALUES (?, ?, ?)",
-                                (role.get('name', ''), role.get('description', ''), role.get('file', ''))
-                            )
-                        
-                        conn.commit()
-                        mlog.info(f"成功从JSON迁移{len(roles)}个角色到数据库")
-                        
-                        # 备份旧文件
-                        backup_file = self.roles_file + ".bak"
-                        os.rename(self.roles_file, backup_file)
-                        mlog.info(f"旧的JSON文件已备份为: {backup_file}")
-                    
-                    conn.close()
-            except Exception as e:
-                mlog.error(f"从JSON迁移角色数据失败: {str(e)}")
+        if callback not in self._listeners:
+            self._listeners.append(callback)
     
-    def _ensure_speaker_text_column(self):
+    def remove_listener(self, callback):
         """
-        确保数据库表中有speaker_text字段
+        取消注册角色变化的回调函数
+        
+        Args:
+            callback: 之前注册的回调函数
         """
-        try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            # 检查是否存在speaker_text列
-            cursor.execute("PRAGMA table_info(roles)")
-            columns = [col["name"] for col in cursor.fetchall()]
-            
-            # 如果不存在，则添加
-            if "speaker_text" not in columns:
-                cursor.execute("ALTER TABLE roles ADD COLUMN speaker_text TEXT")
-                conn.commit()
-                mlog.info("已添加speaker_text列到roles表")
-                
-            conn.close()
-        except Exception as e:
-            mlog.error(f"确保speaker_text列存在失败: {str(e)}")
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify_changed(self):
+        """角色有变化时清空缓存并通知回调函数"""
+        self.cache.invalidate()
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as e:
+                mlog.error(f"角色变化回调执行失败: {str(e)}")
     
     def add_role(self, role):
         """
@@ -100,6 +71,7 @@ class RoleManager:
             
             conn.commit()
             conn.close()
+            self._notify_changed()
             return True
         except Exception as e:
             mlog.error(f"添加角色失败: {str(e)}")
@@ -147,6 +119,7 @@ class RoleManager:
             
             conn.commit()
             conn.close()
+            self._notify_changed()
             return True
         except Exception as e:
             mlog.error(f"更新角色失败: {str(e)}")
@@ -180,6 +153,7 @@ class RoleManager:
             
             conn.commit()
             conn.close()
+            self._notify_changed()
             return True
         except Exception as e:
             mlog.error(f"删除角色失败: {str(e)}")
@@ -187,29 +161,14 @@ class RoleManager:
     
     def get_roles(self):
         """
-        获取所有角色
+        获取所有角色，结果缓存在内存中直到角色有变化
         
         Returns:
             list: 角色列表
         """
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id, name, description, file, speaker_text FROM roles ORDER BY name")
-            
-            roles = []
-            for row in cursor.fetchall():
-                roles.append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'description': row['description'],
-                    'file': row['file'],
-                    'speaker_text': row['speaker_text'] if 'speaker_text' in row.keys() else ''
-                })
-            
-            conn.close()
-            return roles
+            # 返回副本，调用方修改列表或角色时不影响缓存
+            return copy_rows(self.cache.load(("all",), self._query))
         except Exception as e:
             mlog.error(f"获取角色列表失败: {str(e)}")
             return []
@@ -246,6 +205,125 @@ class RoleManager:
             mlog.error(f"通过名称获取角色失败: {str(e)}")
             return None
     
+    def _keyword_filter(self, keyword):
+        """
+        构造关键词搜索条件，关键词足够长时使用全文索引，否则退回到LIKE查询
+        
+        Args:
+            keyword: 搜索关键词
+        
+        Returns:
+            tuple: (JOIN子句, WHERE子句, 参数, 名称和描述高亮文本的列表达式，不使用索引时为None)
+        """
+        if self.db_manager.can_use_fts(keyword):
+            return (
+                "JOIN roles_fts ON roles_fts.rowid = roles.id",
+                "roles_fts MATCH ?",
+                (self.db_manager.fts_phrase(keyword),),
+                "highlight(roles_fts, 0, char(1), char(2)) AS name_highlight, "
+                "highlight(roles_fts, 1, char(1), char(2)) AS description_highlight"
+            )
+        
+        pattern = self.db_manager.like_pattern(keyword)
+        return (
+            "",
+            "roles.name LIKE ? ESCAPE '\\' OR roles.description LIKE ? ESCAPE '\\'",
+            (pattern, pattern),
+            None
+        )
+    
+    def _query(self, keyword="", page_size=-1, page=1, after=None, before=None, with_total=False):
+        """
+        按名称顺序查询角色，使用 (name, id) 游标分页
+        
+        Args:
+            keyword: 搜索关键词，为空时查询全部
+            page_size: 每页记录数，-1表示不限制
+            page: 页码，没有提供游标时使用
+            after: 上一页最后一个角色的游标，返回其后的一页
+            before: 下一页第一个角色的游标，返回其前的一页
+            with_total: 是否同时返回筛选后的角色总数
+        
+        Returns:
+            list: 角色列表，搜索时 name_highlight/description_highlight 为标记了匹配部分的文本；
+                  with_total 为True时返回 (列表, 总数)
+        """
+        join, conditions, params, highlight = "", [], [], None
+        if keyword:
+            join, where, keyword_params, highlight = self._keyword_filter(keyword)
+            conditions.append(f"({where})")
+            params.extend(keyword_params)
+        
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        
+        # 只有页码时先在索引上找到上一页最后一个角色的位置
+        if after is None and before is None and page > 1 and page_size > 0:
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            cursor.execute(
+                f"SELECT roles.name, roles.id FROM roles {join} {where_clause} "
+                "ORDER BY roles.name, roles.id LIMIT 1 OFFSET ?",
+                params + [(page - 1) * page_size - 1]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                conn.close()
+                return ([], self.get_filtered_count(keyword)) if with_total else []
+            after = (row[0], row[1])
+        
+        order = "ASC"
+        if after is not None:
+            conditions.append("(roles.name, roles.id) > (?, ?)")
+            params.extend(after)
+        elif before is not None:
+            # 向前翻页时按降序读取紧邻的一页，再反转
+            conditions.append("(roles.name, roles.id) < (?, ?)")
+            params.extend(before)
+            order = "DESC"
+        
+        # 搜索时用窗口函数在同一次扫描中统计当前位置之后的匹配数；
+        # 不筛选时全表计数走索引更快，单独查询
+        count_in_query = with_total and bool(keyword) and before is None
+        if count_in_query:
+            # 全文索引的 highlight() 不能与窗口函数同用，改为读取后再标记匹配部分
+            highlight = None
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(
+            "SELECT roles.id, roles.name, roles.description, roles.file, roles.speaker_text, "
+            f"{highlight or 'NULL AS name_highlight, NULL AS description_highlight'}"
+            f"{', COUNT(*) OVER () AS total_rows' if count_in_query else ''} "
+            f"FROM roles {join} {where_clause} "
+            f"ORDER BY roles.name {order}, roles.id {order} LIMIT ?",
+            params + [page_size]
+        )
+        
+        roles = []
+        rows = cursor.fetchall()
+        for row in rows:
+            role = {
+                'id': row['id'],
+                'name': row['name'],
+                'description': row['description'],
+                'file': row['file'],
+                'speaker_text': row['speaker_text'] or ''
+            }
+            if keyword:
+                role['name_highlight'] = row['name_highlight'] or mark_keyword(row['name'], keyword)
+                role['description_highlight'] = row['description_highlight'] or mark_keyword(row['description'], keyword)
+            roles.append(role)
+        
+        conn.close()
+        if order == "DESC":
+            roles.reverse()
+        if not with_total:
+            return roles
+        
+        if count_in_query and rows:
+            # 窗口计数不含当前页之前的记录
+            offset = (page - 1) * page_size if page_size > 0 else 0
+            return roles, offset + rows[0]['total_rows']
+        return roles, self.get_filtered_count(keyword)
+    
     def filter_roles(self, keyword):
         """
         按关键词筛选角色
@@ -260,70 +338,44 @@ class RoleManager:
             if not keyword or keyword.strip() == "":
                 return self.get_roles()
             
-            keyword = f"%{keyword.lower().strip()}%"
-            
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT id, name, description, file, speaker_text FROM roles "
-                "WHERE LOWER(name) LIKE ? OR LOWER(description) LIKE ? "
-                "ORDER BY name",
-                (keyword, keyword)
-            )
-            
-            roles = []
-            for row in cursor.fetchall():
-                roles.append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'description': row['description'],
-                    'file': row['file'],
-                    'speaker_text': row['speaker_text'] if 'speaker_text' in row.keys() else ''
-                })
-            
-            conn.close()
-            return roles
+            return self._query(keyword.strip())
         except Exception as e:
             mlog.error(f"筛选角色失败: {str(e)}")
             return []
     
-    def get_roles_paged(self, page=1, page_size=10):
+    def _cached_query(self, keyword, page, page_size, after, before):
+        """
+        分页查询，结果按 (关键词, 页码, 每页记录数) 缓存，游标只用于缓存未命中时定位
+        
+        Returns:
+            list: 当前页的角色列表
+        """
+        if page is None:
+            return self._query(keyword, page_size, 1, after, before)
+        # 返回副本，调用方修改记录时不影响缓存
+        return copy_rows(self.cache.load(
+            ("page", keyword, page, page_size),
+            lambda: self._query(keyword, page_size, page, after, before)
+        ))
+    
+    def get_roles_paged(self, page=1, page_size=10, after=None, before=None):
         """
         分页获取角色列表
         
         Args:
-            page: 页码，从1开始
+            page: 页码，从1开始，只按游标查询时为None且不缓存结果
             page_size: 每页记录数
+            after: 上一页最后一个角色的游标(可选)，提供时忽略页码
+            before: 下一页第一个角色的游标(可选)，提供时忽略页码
             
         Returns:
             list: 当前页的角色列表
         """
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            offset = (page - 1) * page_size
-            
             # 添加日志
-            mlog.debug(f"分页获取角色: 页码={page}, 每页={page_size}, 偏移={offset}")
+            mlog.debug(f"分页获取角色: 页码={page}, 每页={page_size}, after={after}, before={before}")
             
-            cursor.execute(
-                "SELECT id, name, description, file, speaker_text FROM roles ORDER BY name LIMIT ? OFFSET ?",
-                (page_size, offset)
-            )
-            
-            roles = []
-            for row in cursor.fetchall():
-                roles.append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'description': row['description'],
-                    'file': row['file'],
-                    'speaker_text': row['speaker_text'] if 'speaker_text' in row.keys() else ''
-                })
-            
-            conn.close()
+            roles = self._cached_query("", page, page_size, after, before)
             mlog.debug(f"获取到 {len(roles)} 条角色记录")
             return roles
         except Exception as e:
@@ -337,54 +389,65 @@ class RoleManager:
         Returns:
             int: 角色总数
         """
-        return self.db_manager.get_table_count('roles')
+        return self.cache.load(("count", ""), lambda: self.db_manager.get_table_count('roles'))
     
-    def filter_roles_paged(self, keyword, page=1, page_size=10):
+    def filter_roles_paged(self, keyword, page=1, page_size=10, after=None, before=None):
         """
         按关键词分页筛选角色
         
         Args:
             keyword: 搜索关键词
-            page: 页码，从1开始
+            page: 页码，从1开始，只按游标查询时为None且不缓存结果
             page_size: 每页记录数
+            after: 上一页最后一个角色的游标(可选)，提供时忽略页码
+            before: 下一页第一个角色的游标(可选)，提供时忽略页码
             
         Returns:
             list: 过滤后的当前页角色列表
         """
         try:
             if not keyword or keyword.strip() == "":
-                return self.get_roles_paged(page, page_size)
-            
-            keyword = f"%{keyword.lower().strip()}%"
-            
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
+                return self.get_roles_paged(page, page_size, after, before)
             
-            offset = (page - 1) * page_size
-            
-            cursor.execute(
-                "SELECT id, name, description, file, speaker_text FROM roles "
-                "WHERE LOWER(name) LIKE ? OR LOWER(description) LIKE ? "
-                "ORDER BY name LIMIT ? OFFSET ?",
-                (keyword, keyword, page_size, offset)
-            )
-            
-            roles = []
-            for row in cursor.fetchall():
-                roles.append({
-                    'id': row['id'],
-                    'name': row['name'],
-                    'description': row['description'],
-                    'file': row['file'],
-                    'speaker_text': row['speaker_text'] if 'speaker_text' in row.keys() else ''
-                })
-            
-            conn.close()
-            return roles
+            return self._cached_query(keyword.strip(), page, page_size, after, before)
         except Exception as e:
             mlog.error(f"分页筛选角色失败: {str(e)}")
             return []
     
+    def get_roles_page(self, keyword="", page=1, page_size=10, after=None, before=None):
+        """
+        分页获取角色，同时返回筛选后的总数，在一次数据库调用中完成
+        
+        Args:
+            keyword: 搜索关键词，为空时查询全部
+            page: 页码，从1开始
+            page_size: 每页记录数
+            after: 上一页最后一个角色的游标(可选)
+            before: 下一页第一个角色的游标(可选)
+            
+        Returns:
+            tuple: (当前页的角色列表, 总数)
+        """
+        try:
+            # 验证输入参数
+            if page < 1:
+                mlog.warning(f"页码必须大于0，已将 {page} 自动调整为1")
+                page = 1
+            
+            if page_size < 1:
+                mlog.warning(f"每页显示数量必须大于0，已将 {page_size} 自动调整为10")
+                page_size = 10
+            
+            keyword = (keyword or "").strip()
+            rows, total = self.cache.load(
+                ("page_total", keyword, page, page_size),
+                lambda: self._query(keyword, page_size, page, after, before, with_total=True)
+            )
+            return copy_rows(rows), total
+        except Exception as e:
+            mlog.error(f"分页获取角色失败: {str(e)}")
+            return [], 0
+    
     def get_filtered_count(self, keyword):
         """
         获取过滤后的角色总数
@@ -398,9 +461,46 @@ class RoleManager:
         if not keyword or keyword.strip() == "":
             return self.get_total_roles()
             
-        keyword = f"%{keyword.lower().strip()}%"
-        return self.db_manager.get_table_count(
-            'roles', 
-            'LOWER(name) LIKE ? OR LOWER(description) LIKE ?', 
-            (keyword, keyword)
-        )
+        keyword = keyword.strip()
+        join, where, params, _ = self._keyword_filter(keyword)
+        # 使用全文索引时直接在索引表中计数，无需关联源表
+        table = 'roles_fts' if join else 'roles'
+        return self.cache.load(("count", keyword), lambda: self.db_manager.get_table_count(table, where, params))
+    
+    # 以下为异步版本，在数据库线程中执行，供界面回调使用
+    
+    async def aadd_role(self, role):
+        """异步版本的 add_role"""
+        return await self.db_manager.run(self.add_role, role)
+    
+    async def aupdate_role(self, index_or_role, new_data=None):
+        """异步版本的 update_role"""
+        return await self.db_manager.run(self.update_role, index_or_role, new_data)
+    
+    async def adelete_role(self, index_or_role):
+        """异步版本的 delete_role"""
+        return await self.db_manager.run(self.delete_role, index_or_role)
+    
+    async def aget_roles(self):
+        """异步版本的 get_roles"""
+        return await self.db_manager.run(self.get_roles)
+    
+    async def aget_roles_paged(self, page=1, page_size=10, after=None, before=None):
+        """异步版本的 get_roles_paged"""
+        return await self.db_manager.run(self.get_roles_paged, page, page_size, after, before)
+    
+    async def afilter_roles_paged(self, keyword, page=1, page_size=10, after=None, before=None):
+        """异步版本的 filter_roles_paged"""
+        return await self.db_manager.run(self.filter_roles_paged, keyword, page, page_size, after, before)
+    
+    async def aget_total_roles(self):
+        """异步版本的 get_total_roles"""
+        return await self.db_manager.run(self.get_total_roles)
+    
+    async def aget_filtered_count(self, keyword):
+        """异步版本的 get_filtered_count"""
+        return await self.db_manager.run(self.get_filtered_count, keyword)
+    
+    async def aget_roles_page(self, keyword="", page=1, page_size=10, after=None, before=None):
+        """异步版本的 get_roles_page"""
+        return await self.db_manager.run(self.get_roles_page, keyword, page, page_size, after, before)
@@ -40,11 +40,19 @@ class SettingsManager:
         return {
             'theme_mode': 'system',  # system, light, dark
             'api_url': 'http://127.0.0.1:8000',  # 默认API地址
+            'api_endpoints': [],  # 负载均衡的其他API节点: [{"url": 地址, "weight": 权重}]
             'model_host': '127.0.0.1',  # 默认模型运行host
             'model_port': '8000',  # 默认模型运行端口
+            'model_workers': 'auto',  # 模型工作进程数，auto按CPU核心数计算
+            'model_start_timeout': 300,  # 等待模型就绪的超时时间（秒）
+            'model_idle_timeout': 30,  # 模型空闲多少分钟后自动停止，0表示不停止
+            'model_fast_start': True,  # 快速启动：预读权重并以mmap方式加载
             'auto_load_model': False,  # 默认不自动加载
             'output_dir': os.path.join(os.getcwd(), "output"),  # 默认输出目录
-            'logging_enabled': False    # 默认不启用日志
+            'logging_enabled': False,    # 默认不启用日志
+            'batch_concurrency': 2,  # 批量生成默认并发数
+            'synthesis_cache_enabled': True,  # 默认启用合成结果缓存
+            'synthesis_cache_max_mb': 1024  # 合成结果缓存上限（MB）
         }
     
     def _apply_default_settings(self, settings):
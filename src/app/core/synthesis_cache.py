@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from app.core.utils import file_sha256
+import app.core.mlog as mlog
+
+class SynthesisCache:
+    """
+    合成结果缓存类，按生成参数和参考音频内容的哈希复用历史目录中已有的音频
+
+    缓存条目只记录历史音频文件的路径，不额外复制文件。淘汰条目时，
+    仅在没有历史记录引用该文件时才删除文件。
+    """
+    def __init__(self, dbmanager, settings_manager, upload_cache=None):
+        """
+        初始化合成结果缓存
+
+        Args:
+            dbmanager: 数据库管理器实例
+            settings_manager: 设置管理器实例
+            upload_cache: 上传文件记录实例，用于获取已上传参考音频的内容哈希
+        """
+        self.db_manager = dbmanager
+        self.settings_manager = settings_manager
+        self.upload_cache = upload_cache
+
+        # 本次运行的命中统计
+        self.hits = 0
+        self.misses = 0
+
+        # 参考音频哈希缓存: 路径 -> (修改时间, 文件大小, 哈希)
+        self._prompt_hashes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """是否启用缓存"""
+        return self.settings_manager.get('synthesis_cache_enabled', True)
+
+    @property
+    def max_bytes(self):
+        """缓存文件总大小上限（字节）"""
+        return int(self.settings_manager.get('synthesis_cache_max_mb', 1024)) * 1024 * 1024
+
+    def _hash_prompt(self, prompt):
+        """
+        计算参考音频内容的哈希
+
+        本地不存在的参考音频（如移动端上传后的服务器路径）使用上传记录中的内容哈希，
+        同一路径可能先后上传过不同的文件，因此不按路径计算。
+
+        Args:
+            prompt: 参考音频路径
+
+        Returns:
+            str: 哈希值，无法确定参考音频内容时返回None
+        """
+        if not prompt:
+            return ""
+        if not os.path.isfile(prompt):
+            if self.upload_cache is None:
+                return None
+            api_url = self.settings_manager.get('api_url', 'http://127.0.0.1:8000')
+            return self.upload_cache.get_hash(api_url, prompt)
+
+        stat = os.stat(prompt)
+        with self._lock:
+            cached = self._prompt_hashes.get(prompt)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+        prompt_hash = file_sha256(prompt)
+
+        with self._lock:
+            self._prompt_hashes[prompt] = (stat.st_mtime, stat.st_size, prompt_hash)
+        return prompt_hash
+
+    def make_key(self, params):
+        """
+        根据生成参数计算缓存键
+
+        只包含会影响合成结果的参数，与API请求中实际发送的参数保持一致。
+
+        Args:
+            params: 生成参数
+
+        Returns:
+            str: 缓存键，参考音频内容未知时返回None，不使用缓存
+        """
+        prompt_hash = self._hash_prompt(params.get('prompt'))
+        if prompt_hash is None:
+            return None
+        mode = params.get('mode') or 'quick'
+        normalized = {
+            "mode": mode,
+            "text": " ".join((params.get('text') or "").split()),
+            "speed": round(float(params.get('speed') or 1.0), 2),
+            "prompt": prompt_hash,
+        }
+        if mode == "zero_shot":
+            normalized["speaker_text"] = (params.get('speaker_text') or "").strip()
+        elif mode == "language_control":
+            normalized["instruction"] = (params.get('instruction') or "").strip()
+
+        content = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def lookup(self, params):
+        """
+        查找缓存的合成结果
+
+        Args:
+            params: 生成参数
+
+        Returns:
+            str: 命中时返回音频文件路径，否则返回None
+        """
+        if not self.enabled:
+            return None
+        try:
+            key = self.make_key(params)
+            if key is None:
+                self.misses += 1
+                return None
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT file_path FROM synthesis_cache WHERE key=?", (key,))
+            row = cursor.fetchone()
+
+            file_path = row['file_path'] if row else None
+            if file_path and not os.path.exists(file_path):
+                # 文件已被删除，移除失效的条目
+                cursor.execute("DELETE FROM synthesis_cache WHERE key=?", (key,))
+                file_path = None
+            elif file_path:
+                cursor.execute(
+                    "UPDATE synthesis_cache SET hits=hits+1, last_used=? WHERE key=?",
+                    (time.time(), key)
+                )
+
+            conn.commit()
+            conn.close()
+
+            if file_path:
+                self.hits += 1
+                mlog.info(f"合成缓存命中: {file_path}")
+            else:
+                self.misses += 1
+            return file_path
+        except Exception as e:
+            mlog.error(f"查询合成缓存失败: {str(e)}")
+            return None
+
+    def store(self, params, file_path):
+        """
+        保存合成结果到缓存
+
+        Args:
+            params: 生成参数
+            file_path: 历史目录中的音频文件路径
+
+        Returns:
+            bool: 保存是否成功
+        """
+        if not self.enabled or not file_path or not os.path.exists(file_path):
+            return False
+        try:
+            key = self.make_key(params)
+            if key is None:
+                return False
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO synthesis_cache (key, file_path, size, hits, last_used) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (key, file_path, os.path.getsize(file_path), time.time())
+            )
+            conn.commit()
+            conn.close()
+
+            self._evict()
+            return True
+        except Exception as e:
+            mlog.error(f"保存合成缓存失败: {str(e)}")
+            return False
+
+    def _evict(self):
+        """按最近最少使用淘汰条目，直到缓存总大小不超过上限"""
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM synthesis_cache")
+        total = cursor.fetchone()[0]
+        limit = self.max_bytes
+
+        removed_files = []
+        if total > limit:
+            cursor.execute("SELECT key, file_path, size FROM synthesis_cache ORDER BY last_used ASC")
+            for row in cursor.fetchall():
+                if total <= limit:
+                    break
+                cursor.execute("DELETE FROM synthesis_cache WHERE key=?", (row['key'],))
+                total -= row['size']
+
+                # 仍被历史记录引用的文件保留
+                cursor.execute("SELECT COUNT(*) FROM history WHERE file_path=?", (row['file_path'],))
+                if cursor.fetchone()[0] == 0:
+                    removed_files.append(row['file_path'])
+
+        conn.commit()
+        conn.close()
+
+        for file_path in removed_files:
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            except Exception as e:
+                mlog.error(f"删除缓存音频失败: {file_path}, 错误: {str(e)}")
+        if removed_files:
+            mlog.info(f"合成缓存淘汰了 {len(removed_files)} 个文件")
+
+    def clear(self):
+        """
+        清空缓存条目（不删除历史音频）
+
+        Returns:
+            bool: 清空是否成功
+        """
+        try:
+            conn = self.db_manager.get_connection()
+            conn.execute("DELETE FROM synthesis_cache")
+            conn.commit()
+            conn.close()
+            self.hits = 0
+            self.misses = 0
+            return True
+        except Exception as e:
+            mlog.error(f"清空合成缓存失败: {str(e)}")
+            return False
+
+    def get_stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: 包含 hits, misses, entries, size 的字典
+        """
+        entries, size = 0, 0
+        try:
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM synthesis_cache")
+            entries, size = cursor.fetchone()
+            conn.close()
+        except Exception as e:
+            mlog.error(f"获取合成缓存统计失败: {str(e)}")
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size": size,
+        }
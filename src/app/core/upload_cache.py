@@ -0,0 +1,96 @@
+import app.core.mlog as mlog
+
+class UploadCache:
+    """
+    上传文件记录类，按API地址和文件SHA-256记录服务器上的相对路径，
+    避免重复上传相同内容的参考音频
+    """
+    def __init__(self, dbmanager):
+        """
+        初始化上传文件记录
+
+        Args:
+            dbmanager: 数据库管理器实例
+        """
+        self.db_manager = dbmanager
+
+    @staticmethod
+    def _normalize_url(api_url):
+        """去掉API地址末尾的斜杠"""
+        return (api_url or "").rstrip('/')
+
+    def get(self, api_url, file_hash):
+        """
+        获取已上传文件在服务器上的路径
+
+        Args:
+            api_url: API地址
+            file_hash: 文件的SHA-256
+
+        Returns:
+            str: 服务器相对路径，未上传过时返回None
+        """
+        try:
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT server_path FROM upload_cache WHERE api_url=? AND sha256=?",
+                (self._normalize_url(api_url), file_hash)
+            )
+            row = cursor.fetchone()
+            conn.close()
+            return row['server_path'] if row else None
+        except Exception as e:
+            mlog.error(f"查询上传记录失败: {str(e)}")
+            return None
+
+    def get_hash(self, api_url, server_path):
+        """
+        获取服务器上的文件对应的内容哈希
+
+        Args:
+            api_url: API地址
+            server_path: 服务器相对路径
+
+        Returns:
+            str: 最近一次上传到该路径的文件的SHA-256，没有记录时返回None
+        """
+        try:
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT sha256 FROM upload_cache WHERE api_url=? AND server_path=? "
+                "ORDER BY uploaded_at DESC, rowid DESC LIMIT 1",
+                (self._normalize_url(api_url), server_path)
+            )
+            row = cursor.fetchone()
+            conn.close()
+            return row['sha256'] if row else None
+        except Exception as e:
+            mlog.error(f"查询上传记录失败: {str(e)}")
+            return None
+
+    def put(self, api_url, file_hash, server_path):
+        """
+        记录文件在服务器上的路径
+
+        Args:
+            api_url: API地址
+            file_hash: 文件的SHA-256
+            server_path: 服务器相对路径
+
+        Returns:
+            bool: 记录是否成功
+        """
+        try:
+            conn = self.db_manager.get_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO upload_cache (api_url, sha256, server_path) VALUES (?, ?, ?)",
+                (self._normalize_url(api_url), file_hash, server_path)
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            mlog.error(f"保存上传记录失败: {str(e)}")
+            return False
@@ -5,8 +5,15 @@ import app.core.mlog as mlog
 import json
 import uuid
 import asyncio
+import hashlib
+import re
 from urllib.parse import urlparse
 
+# 句末标点（含中文标点）及换行，作为长文本的首选分段位置
+_SENTENCE_END_PATTERN = re.compile(r'(?<=[。！？!?；;…\n])|(?<=\.)(?=\s)')
+# 句内停顿标点，句子过长时的次选分段位置
+_CLAUSE_END_PATTERN = re.compile(r'(?<=[，,、：:])')
+
 def is_url(string):
     """
     判断字符串是否为有效URL
@@ -62,6 +69,23 @@ def generate_unique_filename(prefix="", extension=".wav"):
     unique_id = str(uuid.uuid4())[:8]
     return f"{prefix}_{timestamp}_{unique_id}{extension}"
 
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    分块计算文件的SHA-256
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 每次读取的字节数
+    
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def ensure_dir_exists(path):
     """
     确保目录存在
@@ -211,6 +235,55 @@ def run_async(coroutine):
         
     return loop.run_until_complete(coroutine)
 
+def split_sentences(text, max_length=80):
+    """
+    将长文本按句子和标点切分为适合单次合成的片段
+    
+    优先在句末标点（。！？；…及英文句号等）处切分，过长的句子再按逗号、顿号等切分，
+    仍然过长时按长度截断；相邻的短句会合并，使每段尽量接近max_length。
+    
+    Args:
+        text: 要切分的文本
+        max_length: 每段的最大字符数
+    
+    Returns:
+        list: 文本片段列表
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    
+    pieces = []
+    for sentence in _SENTENCE_END_PATTERN.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_length:
+            pieces.append(sentence)
+            continue
+        # 句子过长时按句内停顿切分，仍过长则按长度截断
+        for clause in _CLAUSE_END_PATTERN.split(sentence):
+            clause = clause.strip()
+            while len(clause) > max_length:
+                # 尽量在空格处截断，避免切断英文单词
+                cut = clause.rfind(" ", 0, max_length + 1)
+                if cut <= 0:
+                    cut = max_length
+                pieces.append(clause[:cut].strip())
+                clause = clause[cut:].strip()
+            if clause:
+                pieces.append(clause)
+    
+    # 合并相邻的短片段
+    segments = []
+    for piece in pieces:
+        if segments and len(segments[-1]) + len(piece) <= max_length:
+            separator = " " if segments[-1][-1].isascii() and piece[0].isascii() else ""
+            segments[-1] = segments[-1] + separator + piece
+        else:
+            segments.append(piece)
+    return segments
+
 def load_json(file_path, default=None):
     """
     从文件加载JSON数据
@@ -255,3 +328,39 @@ def save_json(file_path, data):
     except Exception as e:
         mlog.error(f"保存JSON文件失败 {file_path}: {str(e)}")
         return False
+
+# 搜索结果中标记匹配部分的分隔符，与全文索引 highlight() 使用的一致
+HIGHLIGHT_START = "\x01"
+HIGHLIGHT_END = "\x02"
+
+def mark_keyword(text, keyword):
+    """
+    在文本中标记关键词出现的位置（不区分大小写）
+
+    Args:
+        text: 原文本
+        keyword: 搜索关键词
+
+    Returns:
+        str: 匹配部分被 HIGHLIGHT_START/HIGHLIGHT_END 包围的文本
+    """
+    if not text or not keyword:
+        return text or ""
+    pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+    return pattern.sub(lambda m: f"{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_END}", text)
+
+def split_highlight(marked):
+    """
+    拆分带标记的文本
+
+    Args:
+        marked: mark_keyword 或全文索引 highlight() 返回的文本
+
+    Returns:
+        list: [(文本片段, 是否为匹配部分), ...]
+    """
+    segments = []
+    for i, part in enumerate(re.split(f"[{HIGHLIGHT_START}{HIGHLIGHT_END}]", marked or "")):
+        if part:
+            segments.append((part, i % 2 == 1))
+    return segments
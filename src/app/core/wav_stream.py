@@ -0,0 +1,94 @@
+import os
+import wave
+
+class WavStreamWriter:
+    """
+    增量WAV写入类，每次追加音频后都会更新文件头，
+    因此写入过程中文件始终是可以直接播放的完整WAV
+    """
+    def __init__(self, file_path):
+        """
+        初始化WAV写入器
+
+        Args:
+            file_path: 输出WAV文件路径
+        """
+        self.file_path = file_path
+        self.frames_written = 0
+        self._file = None
+        self._wave = None
+        self._format = None
+
+    @property
+    def format(self):
+        """音频格式 (声道数, 采样宽度, 采样率)，尚未写入时为None"""
+        return self._format
+
+    def _open(self, channels, sample_width, frame_rate):
+        """按首段音频的格式创建输出文件"""
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self._file = open(self.file_path, 'wb')
+        self._wave = wave.open(self._file, 'wb')
+        self._wave.setnchannels(channels)
+        self._wave.setsampwidth(sample_width)
+        self._wave.setframerate(frame_rate)
+        self._format = (channels, sample_width, frame_rate)
+
+    def append_frames(self, frames, channels, sample_width, frame_rate):
+        """
+        追加PCM数据
+
+        Args:
+            frames: PCM字节数据
+            channels: 声道数
+            sample_width: 采样宽度（字节）
+            frame_rate: 采样率
+
+        Raises:
+            ValueError: 音频格式与已写入的内容不一致
+        """
+        if self._wave is None:
+            self._open(channels, sample_width, frame_rate)
+        elif self._format != (channels, sample_width, frame_rate):
+            raise ValueError(f"音频格式不一致: {self._format} != {(channels, sample_width, frame_rate)}")
+
+        # wave模块在每次写入后都会回写文件头中的长度
+        self._wave.writeframes(frames)
+        self._file.flush()
+        self.frames_written += len(frames) // (channels * sample_width)
+
+    def append_file(self, segment_path):
+        """
+        追加一个WAV文件的全部音频
+
+        Args:
+            segment_path: WAV文件路径
+        """
+        with wave.open(segment_path, 'rb') as segment:
+            frames = segment.readframes(segment.getnframes())
+            self.append_frames(
+                frames,
+                segment.getnchannels(),
+                segment.getsampwidth(),
+                segment.getframerate()
+            )
+
+    def duration(self):
+        """
+        获取已写入音频的时长
+
+        Returns:
+            float: 时长（秒）
+        """
+        if not self._format:
+            return 0.0
+        return self.frames_written / self._format[2]
+
+    def close(self):
+        """结束写入并关闭文件"""
+        if self._wave is not None:
+            self._wave.close()
+            self._wave = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,34 @@
+import flet as ft
+from app.core.utils import split_highlight
+
+class HighlightText(ft.Text):
+    """
+    高亮显示搜索关键词的文本组件
+    """
+    def __init__(self, marked, **kwargs):
+        """
+        初始化高亮文本组件
+
+        Args:
+            marked: 用 HIGHLIGHT_START/HIGHLIGHT_END 标记了匹配部分的文本
+            **kwargs: 传给 ft.Text 的其他参数
+        """
+        super().__init__(**kwargs)
+        self.set_marked(marked)
+
+    def set_marked(self, marked):
+        """
+        更新显示的文本，列表项复用时调用
+
+        Args:
+            marked: 用 HIGHLIGHT_START/HIGHLIGHT_END 标记了匹配部分的文本，没有标记时按普通文本显示
+        """
+        highlight_style = ft.TextStyle(
+            weight=ft.FontWeight.BOLD,
+            color=ft.Colors.PRIMARY,
+            bgcolor=ft.Colors.with_opacity(0.15, ft.Colors.PRIMARY)
+        )
+        self.spans = [
+            ft.TextSpan(part, highlight_style if matched else None)
+            for part, matched in split_highlight(marked)
+        ]
@@ -5,6 +5,8 @@ class Pagination(ft.Row):
     """
     分页组件
     """
+    # 页码选择器最多列出的页码数量，页数很多时只列出当前页附近的页码
+    MAX_PAGE_OPTIONS = 100
     def __init__(
         self,
         total_items=0,
@@ -99,10 +101,14 @@ class Pagination(ft.Row):
     
     def _get_page_options(self):
         """获取页码选项"""
-        options = []
-        for i in range(1, self.total_pages + 1):
-            options.append(ft.dropdown.Option(text=str(i), key=str(i)))
-        return options
+        if self.total_pages <= self.MAX_PAGE_OPTIONS:
+            pages = range(1, self.total_pages + 1)
+        else:
+            # 首页、末页以及当前页附近的页码
+            half = self.MAX_PAGE_OPTIONS // 2
+            start = max(1, min(self.current_page - half, self.total_pages - self.MAX_PAGE_OPTIONS + 1))
+            pages = sorted({1, self.total_pages, *range(start, start + self.MAX_PAGE_OPTIONS)})
+        return [ft.dropdown.Option(text=str(i), key=str(i)) for i in pages]
     
     def _get_page_info_text(self):
         """获取页码信息文本"""
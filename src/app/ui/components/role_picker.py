@@ -0,0 +1,78 @@
+import flet as ft
+from app.ui.components.virtual_list import VirtualList
+
+class RolePicker(ft.Column):
+    """
+    角色选择列表组件，可按名称筛选，只为可见范围内的角色创建按钮
+    """
+    # 每个角色按钮占用的高度
+    ITEM_HEIGHT = 48
+
+    def __init__(self, on_select, max_height=400):
+        """
+        初始化角色选择列表
+
+        Args:
+            on_select: 选择角色后的回调函数，参数为角色数据字典
+            max_height: 列表的最大高度
+        """
+        self.on_select = on_select
+        self.max_height = max_height
+        self.roles = []
+
+        self.search_field = ft.TextField(
+            hint_text="输入角色名称过滤",
+            prefix_icon=ft.Icons.SEARCH,
+            border_radius=6,
+            dense=True,
+            on_change=self._filter_roles
+        )
+        self.role_list = VirtualList(
+            item_extent=self.ITEM_HEIGHT,
+            create_item=self._create_item,
+            bind_item=self._bind_item,
+            expand=True
+        )
+
+        super().__init__(
+            controls=[self.search_field, self.role_list],
+            spacing=10,
+            width=400
+        )
+
+    def set_roles(self, roles):
+        """
+        更新可选的角色，保留当前的筛选条件
+
+        Args:
+            roles: 角色数据列表
+        """
+        self.roles = roles
+        self._apply_filter()
+
+    def _apply_filter(self):
+        """按搜索框中的名称筛选角色"""
+        keyword = (self.search_field.value or "").strip().lower()
+        roles = [r for r in self.roles if keyword in r['name'].lower()] if keyword else self.roles
+        self.role_list.set_items(roles)
+        # 搜索框和列表的高度，角色较少时缩短对话框
+        self.height = min(self.max_height, 60 + max(len(roles), 1) * self.ITEM_HEIGHT)
+
+    def _filter_roles(self, e):
+        self._apply_filter()
+        self.update()
+
+    def _create_item(self):
+        """创建一个角色按钮"""
+        return ft.Container(
+            content=ft.TextButton(on_click=lambda e: self.on_select(e.control.data)),
+            height=self.ITEM_HEIGHT,
+            alignment=ft.alignment.center_left
+        )
+
+    def _bind_item(self, control, role):
+        """将角色显示到按钮上"""
+        button = control.content
+        button.text = role['name']
+        button.tooltip = role.get('description') or None
+        button.data = role
@@ -0,0 +1,121 @@
+import math
+import flet as ft
+
+class VirtualList(ft.ListView):
+    """
+    虚拟列表组件，只为可见范围及前后少量的数据创建控件，
+    滚动时复用移出可见范围的控件显示新进入的数据，控件数量与数据量无关
+
+    列表项需为固定高度，可见范围前后的数据用等高的占位控件撑开滚动范围
+    """
+    def __init__(self, item_extent, create_item, bind_item, overscan=4, on_scroll=None, **kwargs):
+        """
+        初始化虚拟列表
+
+        Args:
+            item_extent: 每个列表项占用的高度（含外边距）
+            create_item: 无参数，创建一个列表项控件
+            bind_item: bind_item(control, item)，将数据显示到列表项控件上
+            overscan: 可见范围前后额外创建的列表项数量
+            on_scroll: 滚动事件回调(可选)
+            **kwargs: 传给 ft.ListView 的其他参数
+        """
+        kwargs.setdefault("on_scroll_interval", 50)
+        super().__init__(spacing=0, on_scroll=self._handle_scroll, **kwargs)
+        self.item_extent = item_extent
+        self.overscan = overscan
+        self.items = []
+        self._create_item = create_item
+        self._bind_item = bind_item
+        self._scroll_callback = on_scroll
+        # 列表项控件及其当前显示的数据，第 i 条数据固定由第 i % 数量 个控件显示
+        self._slots = []
+        self._slot_items = []
+        self._first = 0
+        # 收到滚动事件前按10项的可视高度估计
+        self._viewport = item_extent * 10
+        self._top_spacer = ft.Container(height=0)
+        self._bottom_spacer = ft.Container(height=0)
+        self.controls = [self._top_spacer, self._bottom_spacer]
+
+    def set_items(self, items):
+        """
+        替换全部数据并回到列表开头
+
+        Args:
+            items: 数据列表
+        """
+        self.items = list(items)
+        self._first = 0
+        self._render()
+
+    def extend(self, items):
+        """
+        在末尾追加数据
+
+        Args:
+            items: 数据列表
+        """
+        self.items.extend(items)
+        self._render()
+
+    def remove(self, item):
+        """
+        移除一条数据，后面的数据依次前移
+
+        Args:
+            item: 要移除的数据
+        """
+        self.items = [i for i in self.items if i is not item]
+        self._render()
+
+    def refresh(self):
+        """重新绑定所有可见的列表项，数据内容有变化时调用"""
+        self._slot_items = [None] * len(self._slots)
+        self._render()
+
+    def _slot_count(self):
+        """可见范围及前后预留共需要的列表项数量"""
+        return math.ceil(self._viewport / self.item_extent) + 2 * self.overscan
+
+    def _render(self):
+        """按当前滚动位置绑定列表项，并调整前后占位的高度"""
+        count = self._slot_count()
+        while len(self._slots) < count:
+            self._slots.append(self._create_item())
+            self._slot_items.append(None)
+
+        self._first = max(0, min(self._first, len(self.items) - count))
+        end = min(len(self.items), self._first + count)
+
+        window = []
+        for index in range(self._first, end):
+            slot = index % count
+            if self._slot_items[slot] is not self.items[index]:
+                self._bind_item(self._slots[slot], self.items[index])
+                self._slot_items[slot] = self.items[index]
+            window.append(self._slots[slot])
+
+        self._top_spacer.height = self._first * self.item_extent
+        self._bottom_spacer.height = (len(self.items) - end) * self.item_extent
+        self.controls = [self._top_spacer] + window + [self._bottom_spacer]
+
+    def _handle_scroll(self, e: ft.OnScrollEvent):
+        """滚动时移动可见范围，只更新进出范围的列表项"""
+        if e.pixels is not None:
+            if e.viewport_dimension and e.viewport_dimension != self._viewport:
+                # 可视高度变化时列表项与数据的对应关系随之改变
+                self._viewport = e.viewport_dimension
+                self._slot_items = [None] * len(self._slots)
+                self._first = -1
+
+            first = int(e.pixels // self.item_extent) - self.overscan
+            # 与 _render 相同地限制在有效范围内，列表末尾滚动时不会重复渲染
+            first = max(0, min(first, len(self.items) - self._slot_count()))
+            if first != self._first:
+                self._first = first
+                self._render()
+                self.update()
+
+        if self._scroll_callback:
+            self._scroll_callback(e)
@@ -20,6 +20,7 @@ class ClonePage(ft.Card):
         self.on_select_role = self.callbacks.get("on_select_role", lambda e: None)
         self.on_select_file = self.callbacks.get("on_select_file", lambda e: None)
         self.on_play_audio = self.callbacks.get("on_play_audio", lambda e: None)
+        self.on_batch_generate = self.callbacks.get("on_batch_generate", lambda e: None)
         
         # 创建控件
         self.text_input = ft.TextField(
@@ -66,6 +67,12 @@ class ClonePage(ft.Card):
         )
         
         self.speed_value_text = ft.Text(f"当前速度: 1.0")
+        
+        # 长文本分段合成
+        self.long_text_checkbox = ft.Checkbox(
+            label="长文本分段合成（生成首段后即开始播放）",
+            value=True
+        )
         self.speed_input.on_change = self._update_speed_text
         
         # 输出文本区域
@@ -78,6 +85,13 @@ class ClonePage(ft.Card):
             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
         )
         
+        self.batch_button = ft.ElevatedButton(
+            text="批量",
+            tooltip="批量生成多条文本",
+            on_click=self.on_batch_generate,
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        
         self.clear_button = ft.ElevatedButton(
             text="清除",
             on_click=self.on_clear,
@@ -171,6 +185,7 @@ class ClonePage(ft.Card):
                                 self.clone_row,
                                 self.speed_input,
                                 self.speed_value_text,
+                                self.long_text_checkbox,
                                 # 添加模式选择
                                 self.mode_container,
                                 # 输出文本
@@ -193,7 +208,7 @@ class ClonePage(ft.Card):
                                 # 右侧按钮 - 使用单独容器确保右对齐
                                 ft.Container(
                                     content=ft.Row(
-                                        [self.generate_button, self.clear_button],
+                                        [self.generate_button, self.batch_button, self.clear_button],
                                         spacing=10,
                                     ),
                                     alignment=ft.alignment.center_right  # 右对齐内容
@@ -280,7 +295,8 @@ class ClonePage(ft.Card):
             'speed': self.speed_input.value,
             'mode': self.get_current_mode(),
             'instruction': self.instruction_input.value,
-            'speaker_text': self.zero_shot_speaker_input.value
+            'speaker_text': self.zero_shot_speaker_input.value,
+            'long_text': self.long_text_checkbox.value
         }
         
     def set_parameters(self, params):
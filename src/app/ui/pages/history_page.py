@@ -2,6 +2,217 @@ import flet as ft
 import os
 import app.core.mlog as mlog
 from app.ui.components.pagination import Pagination
+from app.ui.components.highlight_text import HighlightText
+from app.ui.components.virtual_list import VirtualList
+
+class HistoryItem(ft.Container):
+    """
+    历史记录列表项，由虚拟列表复用，通过 bind() 切换显示的记录
+    """
+    # 列表项固定高度，虚拟列表据此计算可见范围
+    HEIGHT = 210
+    MARGIN = 5
+
+    def __init__(self, history_page):
+        """
+        初始化历史记录列表项
+
+        Args:
+            history_page: 所属的历史记录页面
+        """
+        self.history_page = history_page
+        self.item = None
+
+        self.timestamp_text = ft.Text(size=12, color=ft.Colors.GREY_400)
+        # 搜索结果中高亮显示匹配的关键词，文本过长时截断
+        self.text_label = HighlightText("", max_lines=1, overflow=ft.TextOverflow.ELLIPSIS, expand=True)
+        self.speaker_text = ft.Text()
+        self.speed_text = ft.Text()
+        self.reference_text = ft.Text(max_lines=1, overflow=ft.TextOverflow.ELLIPSIS, expand=True)
+        self.play_button = ft.IconButton(
+            icon=ft.Icons.PLAY_ARROW,
+            selected_icon=ft.Icons.PAUSE,
+            tooltip="播放",
+            selected=False,
+            on_click=self.play_pause_audio
+        )
+
+        super().__init__(
+            content=ft.Column([
+                ft.Row([
+                    ft.Icon(ft.Icons.ACCESS_TIME, size=16, color=ft.Colors.GREY_400),
+                    self.timestamp_text
+                ]),
+                ft.Row([
+                    ft.Text("文本: ", weight=ft.FontWeight.BOLD),
+                    self.text_label
+                ]),
+                ft.Row([
+                    ft.Text("说话人: ", weight=ft.FontWeight.BOLD),
+                    self.speaker_text,
+                    ft.Text("  语速: ", weight=ft.FontWeight.BOLD),
+                    self.speed_text,
+                ]),
+                ft.Row([
+                    ft.Text("参考音频: ", weight=ft.FontWeight.BOLD),
+                    self.reference_text
+                ]),
+                ft.Row([
+                    ft.Container(expand=True),  # 这会把后面的按钮推到右边
+                    self.play_button,
+                    ft.IconButton(
+                        icon=ft.Icons.FOLDER_OPEN,
+                        tooltip="打开文件位置",
+                        on_click=self.open_file_location
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.REPLAY,
+                        tooltip="使用相同参数重新生成",
+                        on_click=self.reuse_parameters
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.DELETE,
+                        tooltip="删除",
+                        on_click=self.delete_history
+                    )
+                ], alignment=ft.MainAxisAlignment.END)
+            ]),
+            height=self.HEIGHT - 2 * self.MARGIN,
+            border_radius=10,
+            padding=10,
+            margin=self.MARGIN,
+            border=ft.border.all(1, ft.Colors.with_opacity(0.2, ft.Colors.ON_SURFACE)),  # 添加浅色边框
+            bgcolor=ft.Colors.with_opacity(0.05, ft.Colors.ON_SURFACE)  # 添加浅色背景
+        )
+
+    def bind(self, item):
+        """
+        显示一条历史记录
+
+        Args:
+            item: 历史记录数据
+        """
+        self.item = item
+        self.timestamp_text.value = item['timestamp']
+        self.text_label.set_marked(item.get('text_highlight') or item['text'])
+        self.speaker_text.value = item['speaker']
+        self.speed_text.value = f"{item['speed']:.1f}"
+        self.reference_text.value = os.path.basename(item['reference'])
+
+        # 正在播放的按钮被复用到其他记录时，不再显示为播放状态
+        if self.play_button.selected:
+            self.play_button.selected = False
+            global_audio_state = self.history_page.global_audio_state
+            if global_audio_state.get("current_player") is self.play_button:
+                global_audio_state["current_player"] = None
+
+    def play_pause_audio(self, e):
+        callbacks = self.history_page.callbacks
+        try:
+            # 不在此处先切换按钮状态，让音频管理器来控制
+            # 调用播放回调
+            if "on_play" in callbacks:
+                callbacks["on_play"](self.item, self.play_button)
+        except Exception as ex:
+            mlog.error(f"播放失败: {str(ex)}") 
+            self.play_button.selected = False
+            global_audio_state = self.history_page.global_audio_state
+            if "current_player" in global_audio_state:
+                global_audio_state["current_player"] = None
+            self.history_page.page.update()
+
+    def open_file_location(self, e):
+        import subprocess
+        try:
+            file_path = os.path.abspath(self.item['file_path'])
+            file_dir = os.path.dirname(file_path)
+            success = False
+            
+            # Android
+            if self.history_page.page.platform in [ft.PagePlatform.ANDROID, ft.PagePlatform.ANDROID_TV]:
+                raise Exception("暂不支持在Android上打开文件位置")
+                                
+            elif self.history_page.page.platform == ft.PagePlatform.IOS:
+                # iOS平台可能需要专门处理
+                mlog.warning("iOS平台未实现文件位置打开功能")
+                raise Exception("暂不支持在iOS上打开文件位置")
+                
+            # Windows
+            elif os.name == 'nt':
+                subprocess.run(['explorer', '/select,', file_path])
+                success = True
+            # macOS
+            elif os.name == 'posix' and os.uname().sysname == 'Darwin':
+                subprocess.run(['open', '-R', file_path])
+                success = True
+            # Linux
+            elif os.name == 'posix':
+                try:
+                    # 尝试多种Linux文件管理器
+                    file_managers = ['xdg-open', 'nautilus', 'thunar', 'dolphin', 'nemo']
+                    for manager in file_managers:
+                        try:
+                            subprocess.run([manager, file_dir], check=True)
+                            success = True
+                            break
+                        except (subprocess.SubprocessError, FileNotFoundError):
+                            continue
+                    
+                    if not success:
+                        raise Exception("未找到可用的文件管理器")
+                except Exception as linux_ex:
+                    mlog.error(f"Linux打开文件位置失败: {str(linux_ex)}")
+                    raise linux_ex
+            
+            if not success:
+                raise Exception("无法打开文件位置")
+                
+        except Exception as ex:
+            mlog.error(f"打开文件位置失败: {str(ex)}")
+            # 显示错误提示对话框
+            error_dialog = ft.AlertDialog(
+                title=ft.Text("打开失败"),
+                content=ft.Text(f"无法打开文件位置：{str(ex)}\n\n文件路径：{self.item.get('file_path', '未知')}"),
+                actions=[
+                    ft.TextButton("确定", 
+                                on_click=lambda e: (setattr(error_dialog, "open", False), self.history_page.page.update()),
+                                style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)))
+                ]
+            )
+            self.history_page.page.open(error_dialog)
+
+    def reuse_parameters(self, e):
+        callbacks = self.history_page.callbacks
+        if "on_reuse" in callbacks:
+            callbacks["on_reuse"](self.item)
+
+    def delete_history(self, e):
+        # 确认期间列表项可能被复用，删除打开对话框时的记录
+        item = self.item
+
+        def handle_delete(e, dialog):
+            dialog.open = False
+            self.history_page.page.update()
+            
+            if "on_delete" in self.history_page.callbacks:
+                self.history_page.callbacks["on_delete"](item, self)
+            
+        dialog = ft.AlertDialog(
+            title=ft.Text("确认删除"),
+            content=ft.Text("确定要删除这条记录吗？"),
+            actions=[
+                ft.TextButton("取消", 
+                            on_click=lambda e: (setattr(dialog, "open", False), self.history_page.page.update()),
+                            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
+                ft.TextButton("删除", 
+                            on_click=lambda e: handle_delete(e, dialog),
+                            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)))
+            ]
+        )
+        self.history_page.page.overlay.append(dialog)
+        dialog.open = True
+        self.history_page.page.update()
+
 
 class HistoryPage(ft.Card):
     """
@@ -17,11 +228,15 @@ class HistoryPage(ft.Card):
         """
         self.page = page
         self.callbacks = callbacks or {}
-        self.history_items = []  # 历史记录项的引用
+        self.history_items = []  # 已加载的历史记录数据
+        self.global_audio_state = {}
         self.current_page = 1
         self.page_size = 5  # 修改默认每页显示为5条
         self.total_history = 0
         self.current_keyword = ""
+        # 移动端滚动到底部时自动加载下一页
+        self.is_loading = False
+        self.has_more = False
 
         # 检查是否为移动端
         self.is_mobile = self.page.platform in [ft.PagePlatform.ANDROID, ft.PagePlatform.IOS,ft.PagePlatform.ANDROID_TV]
@@ -50,10 +265,19 @@ class HistoryPage(ft.Card):
             alignment=ft.MainAxisAlignment.CENTER
         )
 
-        self.history_list = ft.ListView(
+        # 只为可见范围内的记录创建控件，滚动时复用
+        self.history_list = VirtualList(
+            item_extent=HistoryItem.HEIGHT,
+            create_item=lambda: HistoryItem(self),
+            bind_item=lambda control, item: control.bind(item),
             expand=True,
-            spacing=10,
-            controls=[]
+            on_scroll=self._on_scroll if self.is_mobile else None
+        )
+
+        self.load_more_indicator = ft.Row(
+            [ft.ProgressRing(width=20, height=20, stroke_width=2)],
+            alignment=ft.MainAxisAlignment.CENTER,
+            visible=False
         )
 
 
@@ -72,12 +296,15 @@ class HistoryPage(ft.Card):
                 self.search_row,
                 ft.Divider(),
                 self.history_list,
+                self.load_more_indicator,
                 ft.Container(
                     content=ft.Row(
                         [self.pagination],
                         alignment=ft.MainAxisAlignment.END if not self.is_mobile else ft.MainAxisAlignment.CENTER
                     ),
                     padding=ft.padding.symmetric(vertical=10),  # 添加垂直内边距
+                    # 移动端使用滚动加载，不显示分页
+                    visible=not self.is_mobile
                 )
             ]),
             padding=20
@@ -96,7 +323,7 @@ class HistoryPage(ft.Card):
         # 确保所有必需的回调都存在，没有提供时使用空函数
         if "on_page_change" not in self.callbacks:
             mlog.warning("历史页面 - 未提供页面变更回调函数，使用空函数")
-            self.callbacks["on_page_change"] = lambda page, page_size, keyword: None
+            self.callbacks["on_page_change"] = lambda page, page_size, keyword, **cursor: None
             
         if "on_page_size_change" not in self.callbacks:
             self.callbacks["on_page_size_change"] = lambda new_size, new_page, keyword: None
@@ -106,212 +333,45 @@ class HistoryPage(ft.Card):
             
         if "on_clear_filter" not in self.callbacks:
             self.callbacks["on_clear_filter"] = lambda: None
+
+        if "on_load_more" not in self.callbacks:
+            self.callbacks["on_load_more"] = lambda page_size, keyword, after: None
     
-    def create_history_item(self, item, global_audio_state):
+    def update_history_list(self, history, global_audio_state, total_count=None, append=False):
         """
-        创建单个历史记录项
+        更新历史记录列表
         
         Args:
-            item: 历史记录数据
+            history: 历史记录列表
             global_audio_state: 全局音频状态
-        
-        Returns:
-            ft.Container: 历史记录项控件
+            total_count: 过滤后的总记录数(可选)
+            append: 是否追加到现有列表之后（移动端滚动加载）
         """
-        def play_pause_audio(e):
-            try:
-                # 不在此处先切换按钮状态，让音频管理器来控制
-                # 调用播放回调
-                if "on_play" in self.callbacks:
-                    self.callbacks["on_play"](item, play_button)
-            except Exception as ex:
-                mlog.error(f"播放失败: {str(ex)}") 
-                play_button.selected = False
-                if "current_player" in global_audio_state:
-                    global_audio_state["current_player"] = None
-                self.page.update()
-
-        def open_file_location(e):
-            import subprocess
-            try:
-                file_path = os.path.abspath(item['file_path'])
-                file_dir = os.path.dirname(file_path)
-                success = False
-                
-                # Android
-                if self.page.platform in [ft.PagePlatform.ANDROID, ft.PagePlatform.ANDROID_TV]:
-                    raise Exception("暂不支持在Android上打开文件位置")
-                                    
-                elif self.page.platform == ft.PagePlatform.IOS:
-                    # iOS平台可能需要专门处理
-                    mlog.warning("iOS平台未实现文件位置打开功能")
-                    raise Exception("暂不支持在iOS上打开文件位置")
-                    
-                # Windows
-                elif os.name == 'nt':
-                    subprocess.run(['explorer', '/select,', file_path])
-                    success = True
-                # macOS
-                elif os.name == 'posix' and os.uname().sysname == 'Darwin':
-                    subprocess.run(['open', '-R', file_path])
-                    success = True
-                # Linux
-                elif os.name == 'posix':
-                    try:
-                        # 尝试多种Linux文件管理器
-                        file_managers = ['xdg-open', 'nautilus', 'thunar', 'dolphin', 'nemo']
-                        for manager in file_managers:
-                            try:
-                                subprocess.run([manager, file_dir], check=True)
-                                success = True
-                                break
-                            except (subprocess.SubprocessError, FileNotFoundError):
-                                continue
-                        
-                        if not success:
-                            raise Exception("未找到可用的文件管理器")
-                    except Exception as linux_ex:
-                        mlog.error(f"Linux打开文件位置失败: {str(linux_ex)}")
-                        raise linux_ex
-                
-                if not success:
-                    raise Exception("无法打开文件位置")
-                    
-            except Exception as ex:
-                mlog.error(f"打开文件位置失败: {str(ex)}")
-                # 显示错误提示对话框
-                error_dialog = ft.AlertDialog(
-                    title=ft.Text("打开失败"),
-                    content=ft.Text(f"无法打开文件位置：{str(ex)}\n\n文件路径：{item.get('file_path', '未知')}"),
-                    actions=[
-                        ft.TextButton("确定", 
-                                    on_click=lambda e: (setattr(error_dialog, "open", False), self.page.update()),
-                                    style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)))
-                    ]
-                )
-                self.page.open(error_dialog)
-
-        def reuse_parameters(e):
-            if "on_reuse" in self.callbacks:
-                self.callbacks["on_reuse"](item)
-
-        def delete_history(e):
-            def handle_delete(e, dialog):
-                dialog.open = False
-                self.page.update()
-                
-                if "on_delete" in self.callbacks:
-                    self.callbacks["on_delete"](item, container)
-                
-            dialog = ft.AlertDialog(
-                title=ft.Text("确认删除"),
-                content=ft.Text("确定要删除这条记录吗？"),
-                actions=[
-                    ft.TextButton("取消", 
-                                on_click=lambda e: (setattr(dialog, "open", False), self.page.update()),
-                                style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
-                    ft.TextButton("删除", 
-                                on_click=lambda e: handle_delete(e, dialog),
-                                style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)))
-                ]
-            )
-            self.page.overlay.append(dialog)
-            dialog.open = True
-            self.page.update()
-
-        play_button = ft.IconButton(
-            icon=ft.Icons.PLAY_ARROW,
-            selected_icon=ft.Icons.PAUSE,
-            tooltip="播放",
-            selected=False,
-            on_click=play_pause_audio
-        )
-
-        container = ft.Container(
-            content=ft.Column([
-                ft.Row([
-                    ft.Icon(ft.Icons.ACCESS_TIME, size=16, color=ft.Colors.GREY_400),
-                    ft.Text(item['timestamp'], size=12, color=ft.Colors.GREY_400)
-                ]),
-                ft.Row([
-                    ft.Text("文本: ", weight=ft.FontWeight.BOLD),
-                    ft.Text(item['text'])
-                ]),
-                ft.Row([
-                    ft.Text("说话人: ", weight=ft.FontWeight.BOLD),
-                    ft.Text(item['speaker']),
-                    ft.Text("  语速: ", weight=ft.FontWeight.BOLD),
-                    ft.Text(f"{item['speed']:.1f}"),
-                ]),
-                ft.Row([
-                    ft.Text("参考音频: ", weight=ft.FontWeight.BOLD),
-                    ft.Text(os.path.basename(item['reference']))
-                ]),
-                ft.Row([
-                    ft.Container(expand=True),  # 这会把后面的按钮推到右边
-                    play_button,
-                    ft.IconButton(
-                        icon=ft.Icons.FOLDER_OPEN,
-                        tooltip="打开文件位置",
-                        on_click=open_file_location
-                    ),
-                    ft.IconButton(
-                        icon=ft.Icons.REPLAY,
-                        tooltip="使用相同参数重新生成",
-                        on_click=reuse_parameters
-                    ),
-                    ft.IconButton(
-                        icon=ft.Icons.DELETE,
-                        tooltip="删除",
-                        on_click=delete_history
-                    )
-                ], alignment=ft.MainAxisAlignment.END)
-            ]),
-            border_radius=10,
-            padding=10,
-            margin=5,
-            border=ft.border.all(1, ft.Colors.with_opacity(0.2, ft.Colors.ON_SURFACE)),  # 添加浅色边框
-            bgcolor=ft.Colors.with_opacity(0.05, ft.Colors.ON_SURFACE)  # 添加浅色背景
-        )
-        return container
-
-    def update_history_list(self, history, global_audio_state, total_count=None):
-        """更新历史记录列表"""
         try:
             mlog.debug(f"更新历史记录列表: 获取到 {len(history)} 条记录")
-            self.history_items = history
+            self.global_audio_state = global_audio_state
+            
+            if append:
+                self.history_items = self.history_items + history
+                self.history_list.extend(history)
+                mlog.debug(f"追加了 {len(history)} 条新记录")
+            else:
+                self.history_items = list(history)
+                self.history_list.set_items(history)
+            
+            if total_count is not None:
+                self.total_history = total_count
+                if not self.is_mobile:
+                    self.pagination.update_total(total_count)
             
             if self.is_mobile:
-                # 移动端：追加新数据而不是替换
-                if self.current_page == 1:
-                    # 第一页：清空并添加新数据
-                    self.history_list.controls = [
-                        self.create_history_item(item, global_audio_state) 
-                        for item in history
-                    ]
-                else:
-                    # 后续页：追加新数据
-                    if history:  # 只有当有新数据时才追加
-                        self.history_list.controls.extend([
-                            self.create_history_item(item, global_audio_state) 
-                            for item in history
-                        ])
-                        mlog.debug(f"追加了 {len(history)} 条新记录")
-                        self.current_page += 1
-                
+                # 不足一页说明已经到底
+                self.has_more = len(history) >= self.page_size
+                if total_count is not None:
+                    self.has_more = len(self.history_items) < total_count
                 # 重置加载状态
                 self.is_loading = False
                 self.load_more_indicator.visible = False
-                
-            else:
-                # 桌面端逻辑保持不变
-                self.history_list.controls = [
-                    self.create_history_item(item, global_audio_state) 
-                    for item in history
-                ]
-                if total_count is not None:
-                    self.total_history = total_count
-                    self.pagination.update_total(total_count)
 
             # 更新UI
             self.history_list.update()
@@ -320,6 +380,33 @@ class HistoryPage(ft.Card):
         except Exception as ex:
             mlog.error(f"更新历史列表失败: {str(ex)}")
 
+    def remove_history_item(self, item, container):
+        """
+        从列表中移除一条记录，不重新加载（移动端保持滚动位置）
+        
+        Args:
+            item: 历史记录数据
+            container: 记录对应的控件
+        """
+        self.history_items = [h for h in self.history_items if h.get('id') != item.get('id')]
+        self.history_list.remove(item)
+        self.total_history = max(0, self.total_history - 1)
+        self.history_list.update()
+
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        """移动端滚动到接近底部时加载下一页"""
+        if self.is_loading or not self.has_more or not self.history_items:
+            return
+        if e.max_scroll_extent is None or e.pixels < e.max_scroll_extent - 200:
+            return
+        
+        self.is_loading = True
+        self.load_more_indicator.visible = True
+        self.load_more_indicator.update()
+        
+        last = self.history_items[-1]
+        self.callbacks["on_load_more"](self.page_size, self.current_keyword, (last['timestamp'], last['id']))
+
     def _filter_history(self, e):
         """根据关键词过滤历史记录"""
         self.current_keyword = self.search_field.value.strip().lower()
@@ -346,6 +433,16 @@ class HistoryPage(ft.Card):
         Args:
             page: 新的页码
         """
+        # 翻到相邻页时以当前页首尾记录为游标，直接从索引定位
+        cursor = {}
+        if self.history_items:
+            if page == self.current_page + 1:
+                last = self.history_items[-1]
+                cursor["after"] = (last['timestamp'], last['id'])
+            elif page == self.current_page - 1 and page > 1:
+                first = self.history_items[0]
+                cursor["before"] = (first['timestamp'], first['id'])
+        
         # 先更新本地状态
         mlog.debug(f"历史页面 - 页码变化: 从 {self.current_page} 到 {page}")
         self.current_page = page
@@ -353,7 +450,7 @@ class HistoryPage(ft.Card):
         # 然后调用回调函数获取当前页的数据
         if "on_page_change" in self.callbacks:
             mlog.debug(f"历史页面 - 调用页面变更回调: {self.callbacks['on_page_change']}")
-            self.callbacks["on_page_change"](page, self.page_size, self.current_keyword)
+            self.callbacks["on_page_change"](page, self.page_size, self.current_keyword, **cursor)
         else:
             mlog.warning("历史页面 - 没有找到页面变更回调函数")
 
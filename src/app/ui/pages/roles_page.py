@@ -1,6 +1,113 @@
 import flet as ft
 import app.core.mlog as mlog
 from app.ui.components.pagination import Pagination
+from app.ui.components.highlight_text import HighlightText
+
+class RoleItem(ft.Container):
+    """
+    角色列表项，按角色ID复用，通过 bind() 更新显示的内容
+    """
+    def __init__(self, roles_page):
+        """
+        初始化角色列表项
+
+        Args:
+            roles_page: 所属的角色管理页面
+        """
+        self.roles_page = roles_page
+        self.role = None
+
+        # 搜索结果中高亮显示匹配的关键词
+        self.name_text = HighlightText("", size=16, weight=ft.FontWeight.BOLD)
+        self.description_text = HighlightText("", size=14)
+        self.file_text = ft.Text(size=12, color=ft.Colors.GREY_400)
+        # 只有当speaker_text存在且非空时才显示
+        self.speaker_text = ft.Text(size=12, color=ft.Colors.GREY_400, visible=False)
+
+        super().__init__(
+            content=ft.Row(
+                [
+                    ft.Column(
+                        [self.name_text, self.description_text, self.file_text, self.speaker_text],
+                        expand=True
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.EDIT,
+                        tooltip="编辑角色",
+                        on_click=self.edit_role_click
+                    ),
+                    ft.IconButton(
+                        icon=ft.Icons.DELETE,
+                        tooltip="删除角色",
+                        on_click=self.delete_role_click
+                    ),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+            ),
+            padding=10,
+            border_radius=8,
+            margin=ft.margin.only(bottom=10),
+            border=ft.border.all(1, ft.Colors.with_opacity(0.2, ft.Colors.ON_SURFACE)),  # 添加浅色边框
+            bgcolor=ft.Colors.with_opacity(0.05, ft.Colors.ON_SURFACE)  # 添加浅色背景
+        )
+
+    def bind(self, role):
+        """
+        显示一个角色，内容与当前相同时不做修改
+
+        Args:
+            role: 角色数据字典
+        """
+        if role == self.role:
+            return
+        self.role = role
+        self.name_text.set_marked(role.get('name_highlight') or role['name'])
+        self.description_text.set_marked(role.get('description_highlight') or role['description'])
+        self.file_text.value = role['file']
+        speaker_text = role.get('speaker_text', '')
+        self.speaker_text.value = f"精准模式文本: {speaker_text}"
+        self.speaker_text.visible = bool(speaker_text)
+
+    def delete_role_click(self, e):
+        page = self.roles_page.page
+        callbacks = self.roles_page.callbacks
+
+        def handle_delete(e, dialog, role_to_delete):
+            try:
+                if "on_delete_role" in callbacks:
+                    callbacks["on_delete_role"](role_to_delete)
+                page.close(dialog)
+            except Exception as ex:
+                mlog.error(f"删除角色失败: {str(ex)}")
+
+        def close_dialog(e, dialog):
+            try:
+                page.close(dialog)
+            except Exception as ex:
+                mlog.error(f"关闭对话框失败: {str(ex)}")
+
+        role = self.role
+        dialog = ft.AlertDialog(
+            title=ft.Text("确认删除"),
+            content=ft.Text(f"确定要删除角色 '{role['name']}' 吗？"),
+            actions=[
+                ft.TextButton("取消", on_click=lambda e: close_dialog(e, dialog), style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
+                ft.TextButton("删除", on_click=lambda e: handle_delete(e, dialog, role), style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
+            ],
+        )
+        page.open(dialog)
+
+    def edit_role_click(self, e):
+        roles_page = self.roles_page
+        role = self.role
+        roles_page.current_edit_role["role"] = role
+        roles_page.edit_role_name_input.value = role["name"]
+        roles_page.edit_role_description_input.value = role["description"]
+        roles_page.edit_role_file_input.value = role["file"]
+        roles_page.edit_role_speaker_text_input.value = role.get("speaker_text", "")
+        roles_page.edit_role_dialog.open = True
+        roles_page.page.update()
+
 
 class RolesPage(ft.Card):
     """
@@ -17,6 +124,7 @@ class RolesPage(ft.Card):
         self.page = page
         self.callbacks = callbacks or {}
         self.roles = []  # 角色数据引用
+        self.role_items = {}  # 按角色ID复用的列表项控件
         self.current_edit_role = {"role": None}  # 当前正在编辑的角色
         self.current_page = 1
         self.page_size = 5  # 修改默认每页显示为5条
@@ -275,91 +383,6 @@ class RolesPage(ft.Card):
             self.role_file_input.value = file_path
             self.role_file_input.update()
     
-    def create_role_item(self, role):
-        """创建单个角色项
-        
-        Args:
-            role: 角色数据字典
-        
-        Returns:
-            ft.Container: 角色项控件
-        """
-        def delete_role_click(e):
-            def handle_delete(e, dialog, role_to_delete):
-                try:
-                    if "on_delete_role" in self.callbacks:
-                        self.callbacks["on_delete_role"](role_to_delete)
-                    self.page.close(dialog)
-                except Exception as ex:
-                    mlog.error(f"删除角色失败: {str(ex)}")
-
-            def close_dialog(e, dialog):
-                try:
-                    self.page.close(dialog)
-                except Exception as ex:
-                    mlog.error(f"关闭对话框失败: {str(ex)}")
-
-            dialog = ft.AlertDialog(
-                title=ft.Text("确认删除"),
-                content=ft.Text(f"确定要删除角色 '{role['name']}' 吗？"),
-                actions=[
-                    ft.TextButton("取消", on_click=lambda e: close_dialog(e, dialog), style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
-                    ft.TextButton("删除", on_click=lambda e: handle_delete(e, dialog, role), style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))),
-                ],
-            )
-            self.page.open(dialog)
-
-        def edit_role_click(e):
-            self.current_edit_role["role"] = role
-            self.edit_role_name_input.value = role["name"]
-            self.edit_role_description_input.value = role["description"]
-            self.edit_role_file_input.value = role["file"]
-            self.edit_role_speaker_text_input.value = role.get("speaker_text", "")
-            self.edit_role_dialog.open = True
-            self.page.update()
-
-        # 创建要显示在列表中的控件
-        column_controls = [
-            ft.Text(role['name'], size=16, weight=ft.FontWeight.BOLD),
-            ft.Text(role['description'], size=14),
-            ft.Text(role['file'], size=12, color=ft.Colors.GREY_400),
-        ]
-        
-        # 只有当speaker_text存在且非空时才添加
-        speaker_text = role.get('speaker_text', '')
-        if speaker_text:
-            column_controls.append(
-                ft.Text(f"精准模式文本: {speaker_text}", size=12, color=ft.Colors.GREY_400)
-            )
-
-        # 创建角色项UI
-        return ft.Container(
-            content=ft.Row(
-                [
-                    ft.Column(
-                        column_controls, 
-                        expand=True
-                    ),
-                    ft.IconButton(
-                        icon=ft.Icons.EDIT,
-                        tooltip="编辑角色",
-                        on_click=edit_role_click
-                    ),
-                    ft.IconButton(
-                        icon=ft.Icons.DELETE,
-                        tooltip="删除角色",
-                        on_click=delete_role_click
-                    ),
-                ],
-                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-            ),
-            padding=10,
-            border_radius=8,
-            margin=ft.margin.only(bottom=10),
-            border=ft.border.all(1, ft.Colors.with_opacity(0.2, ft.Colors.ON_SURFACE)),  # 添加浅色边框
-            bgcolor=ft.Colors.with_opacity(0.05, ft.Colors.ON_SURFACE)  # 添加浅色背景
-        )
-    
     def _save_edit_role(self, e):
         """保存编辑后的角色"""
         role = self.current_edit_role["role"]
@@ -388,12 +411,20 @@ class RolesPage(ft.Card):
         Args:
             page: 新的页码
         """
+        # 翻到相邻页时以当前页首尾角色为游标，直接从索引定位
+        cursor = {}
+        if self.roles:
+            if page == self.current_page + 1:
+                cursor["after"] = (self.roles[-1]['name'], self.roles[-1]['id'])
+            elif page == self.current_page - 1 and page > 1:
+                cursor["before"] = (self.roles[0]['name'], self.roles[0]['id'])
+        
         # 先更新本地状态
         self.current_page = page
         
         # 然后调用回调函数获取当前页的数据
         if "on_page_change" in self.callbacks:
-            self.callbacks["on_page_change"](page, self.page_size, self.current_keyword)
+            self.callbacks["on_page_change"](page, self.page_size, self.current_keyword, **cursor)
         self.roles_list.scroll_to(offset=0, duration=300)
     
     def _on_page_size_change(self, new_size, new_page):
@@ -452,8 +483,17 @@ class RolesPage(ft.Card):
             self.total_roles = total_count
             self.pagination.update_total(total_count)
         
-        # 先创建角色项控件列表
-        role_items = [self.create_role_item(role) for role in roles]
+        # 优先复用显示同一角色的控件，其余角色复用移出列表的控件，
+        # 翻页或搜索时只发送有变化的内容
+        ids = {role.get('id') for role in roles}
+        spare = [item for role_id, item in self.role_items.items() if role_id not in ids]
+        role_items = {}
+        for role in roles:
+            item = self.role_items.get(role.get('id')) or (spare.pop(0) if spare else RoleItem(self))
+            item.bind(role)
+            role_items[role.get('id')] = item
+        self.role_items = role_items
+        role_items = list(role_items.values())
         
         # 检查 roles_list 是否有 page 属性，确保它已添加到页面
         if hasattr(self.roles_list, "_Control__page") and self.roles_list._Control__page:
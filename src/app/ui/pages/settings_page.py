@@ -7,6 +7,9 @@ class SettingsPage(ft.Card):
     """
     设置页面
     """
+    # 模型输出区保留的最大行数
+    MAX_OUTPUT_LINES = 200
+
     def __init__(self, page: ft.Page, settings=None, callbacks=None):
         """
         初始化设置页面
@@ -78,6 +81,19 @@ class SettingsPage(ft.Card):
             border_radius=8
         )
         
+        self.api_endpoints_input = ft.TextField(
+            label="负载均衡节点",
+            value=self._format_endpoints(self.settings.get('api_endpoints', [])),
+            hint_text="每行一个地址，可在地址后加空格和权重，如 http://192.168.1.2:8000 2",
+            tooltip="生成请求在API地址和这些节点之间按延迟和负载分配，节点出错时自动换到其他节点",
+            multiline=True,
+            min_lines=1,
+            max_lines=5,
+            width=300,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8
+        )
+        
         self.api_status_text = ft.Text(
             value="API状态: 未检测",
             color=ft.Colors.GREY
@@ -106,6 +122,36 @@ class SettingsPage(ft.Card):
             border_radius=8
         )
         
+        self.model_workers_input = ft.TextField(
+            label="模型进程数",
+            value=str(self.settings.get('model_workers', 'auto')),
+            hint_text="auto 或具体数字",
+            tooltip="多核CPU上可启动多个模型进程并行生成，占用连续的端口；auto按CPU核心数计算",
+            width=300,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8
+        )
+        
+        self.model_start_timeout_input = ft.TextField(
+            label="模型启动超时(秒)",
+            value=str(self.settings.get('model_start_timeout', 300)),
+            tooltip="模型加载较慢时可以调大，超时后会停止模型进程",
+            width=300,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8,
+            input_filter=ft.NumbersOnlyInputFilter()
+        )
+        
+        self.model_idle_timeout_input = ft.TextField(
+            label="模型空闲停止(分钟)",
+            value=str(self.settings.get('model_idle_timeout', 30)),
+            tooltip="长时间没有生成请求时停止模型以释放内存，下次生成时自动重新加载；0表示不停止",
+            width=300,
+            border=ft.InputBorder.OUTLINE,
+            border_radius=8,
+            input_filter=ft.NumbersOnlyInputFilter()
+        )
+        
         self.model_status_text = ft.Text(
             value="模型状态: 未运行",
             color=ft.Colors.RED
@@ -125,17 +171,10 @@ class SettingsPage(ft.Card):
             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
         )
         
-        # 模型输出区
-        self.model_output_text = ft.Text(
-            value="",
-            size=12,
-            selectable=True,
-            expand=True,  # 让文本控件填满可用空间
-            color=ft.Colors.GREEN_400 # 经典黑底绿字
-        )
-        
+        # 模型输出区，每行一个文本控件，追加输出时只发送新增的行
         self.model_output_scroll = ft.Column(
-            [self.model_output_text],
+            [],
+            spacing=0,
             scroll=ft.ScrollMode.ALWAYS,
             auto_scroll=True,
             expand=True,  # 让滚动区域填满可用空间
@@ -169,6 +208,12 @@ class SettingsPage(ft.Card):
             on_change=self._on_theme_change
         )
         
+        self.model_fast_start_checkbox = ft.Checkbox(
+            label="快速启动（预读模型权重，并报告各阶段耗时）",
+            value=self.settings.get('model_fast_start', True),
+            on_change=self._save_api_settings
+        )
+        
         self.auto_load_model_checkbox = ft.Checkbox(
             label="启动时自动加载模型", 
             value=self.settings.get('auto_load_model', False),
@@ -189,13 +234,30 @@ class SettingsPage(ft.Card):
             style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
         )
         
+        # 合成结果缓存
+        self.synthesis_cache_stats_text = ft.Text(
+            value="合成缓存: 暂无统计",
+            size=14
+        )
+        
+        self.clear_synthesis_cache_button = ft.ElevatedButton(
+            text="清空合成缓存",
+            tooltip="仅清空缓存索引，不删除历史音频",
+            on_click=self._clear_synthesis_cache,
+            style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10))
+        )
+        
         # 输出信息
         self.settings_output_text = ft.Text()
         
         # 设置提交事件 - 改为自动保存
         self.api_url_input.on_change = self._save_api_settings
+        self.api_endpoints_input.on_change = self._save_api_settings
         self.model_host_input.on_change = self._save_api_settings
         self.model_port_input.on_change = self._save_api_settings
+        self.model_workers_input.on_change = self._save_api_settings
+        self.model_start_timeout_input.on_change = self._save_api_settings
+        self.model_idle_timeout_input.on_change = self._save_api_settings
         
         # 本地模型标题
         self.local_model_title = ft.Text("本地模型设置", size=20, weight=ft.FontWeight.BOLD)
@@ -258,6 +320,7 @@ class SettingsPage(ft.Card):
             content=ft.Column([
                 ft.Text("API设置", size=20, weight=ft.FontWeight.BOLD),
                 self.api_url_input,
+                self.api_endpoints_input,
                 ft.Row([
                     self.test_connection_button,
                     self.api_status_text
@@ -266,6 +329,10 @@ class SettingsPage(ft.Card):
                 self.local_model_title,
                 self.model_host_input,
                 self.model_port_input,
+                self.model_workers_input,
+                self.model_start_timeout_input,
+                self.model_idle_timeout_input,
+                self.model_fast_start_checkbox,
                 self.auto_load_model_checkbox,
                 self.open_folder_button,
                 self.model_output_container,
@@ -278,6 +345,8 @@ class SettingsPage(ft.Card):
                 ft.Divider(),
                 ft.Text("缓存管理", size=20, weight=ft.FontWeight.BOLD),
                 self.clear_cache_button,
+                self.synthesis_cache_stats_text,
+                self.clear_synthesis_cache_button,
                 ft.Divider(),
                 ft.Text("路径设置", size=20, weight=ft.FontWeight.BOLD),
                 self.model_path_input,
@@ -300,6 +369,10 @@ class SettingsPage(ft.Card):
         if self.page.platform in [ft.PagePlatform.ANDROID, ft.PagePlatform.IOS, ft.PagePlatform.ANDROID_TV]:
             self.model_host_input.visible = False
             self.model_port_input.visible = False
+            self.model_workers_input.visible = False
+            self.model_start_timeout_input.visible = False
+            self.model_idle_timeout_input.visible = False
+            self.model_fast_start_checkbox.visible = False
             self.auto_load_model_checkbox.visible = False
             self.local_model_title.visible = False
             self.model_output_container.visible = False
@@ -337,13 +410,42 @@ class SettingsPage(ft.Card):
         
         self.api_status_text.update()
     
+    @staticmethod
+    def _format_endpoints(endpoints):
+        """将节点列表转换为每行一个的文本"""
+        lines = []
+        for endpoint in endpoints or []:
+            weight = endpoint.get('weight', 1)
+            lines.append(endpoint['url'] if weight == 1 else f"{endpoint['url']} {weight:g}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _parse_endpoints(text):
+        """解析每行一个的节点文本，格式为“地址 [权重]”"""
+        endpoints = []
+        for line in (text or "").splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                weight = float(parts[1]) if len(parts) > 1 else 1
+            except ValueError:
+                weight = 1
+            endpoints.append({'url': parts[0], 'weight': weight})
+        return endpoints
+
     def _save_api_settings(self, e=None):
         """保存API设置"""
         if "on_save_api_settings" in self.callbacks:
             self.callbacks["on_save_api_settings"]({
                 'api_url': self.api_url_input.value,
+                'api_endpoints': self._parse_endpoints(self.api_endpoints_input.value),
                 'model_host': self.model_host_input.value,
-                'model_port': self.model_port_input.value
+                'model_port': self.model_port_input.value,
+                'model_workers': self.model_workers_input.value,
+                'model_start_timeout': int(self.model_start_timeout_input.value or 300),
+                'model_idle_timeout': int(self.model_idle_timeout_input.value or 0),
+                'model_fast_start': self.model_fast_start_checkbox.value
             })
             self.settings_output_text.value = "API设置已保存"
             self.page.update()
@@ -373,14 +475,33 @@ class SettingsPage(ft.Card):
             self.model_output_container.visible = False
         self.page.update()
     
+    def _make_output_line(self, line: str):
+        """创建一行模型输出控件"""
+        return ft.Text(
+            value=line,
+            size=12,
+            selectable=True,
+            color=ft.Colors.GREEN_400 # 经典黑底绿字
+        )
+
+    def append_model_output(self, lines: list):
+        """追加模型输出行，超出最大行数时移除最早的行"""
+        controls = self.model_output_scroll.controls
+        controls.extend(self._make_output_line(line) for line in lines)
+        overflow = len(controls) - self.MAX_OUTPUT_LINES
+        if overflow > 0:
+            del controls[:overflow]
+        # 页面未显示时只更新控件，显示时一并渲染
+        if self.model_output_scroll.page:
+            self.model_output_scroll.update()
+
     def update_model_output(self, text: str):
-        """更新模型输出显示"""
-        if self.model_output_text:
-            self.model_output_text.value = text
-            # 强制滚动到底部
-            if self.model_output_scroll:
-                self.model_output_scroll.scroll_to(offset=float('inf'), duration=0)
-            self.page.update()
+        """替换模型输出显示"""
+        self.model_output_scroll.controls = [
+            self._make_output_line(line) for line in text.splitlines()[-self.MAX_OUTPUT_LINES:]
+        ]
+        if self.model_output_scroll.page:
+            self.model_output_scroll.update()
     
     def _on_theme_change(self, e):
         """主题改变回调"""
@@ -425,6 +546,27 @@ class SettingsPage(ft.Card):
                 self.settings_output_text.value = "缓存清除失败"
             self.settings_output_text.update()
     
+    def set_synthesis_cache_stats(self, stats):
+        """设置合成缓存统计显示
+        
+        Args:
+            stats: 包含 hits, misses, entries, size 的字典
+        """
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = f"{stats['hits'] / lookups * 100:.0f}%" if lookups else "-"
+        self.synthesis_cache_stats_text.value = (
+            f"合成缓存: {stats['entries']} 条, {stats['size'] / 1024 / 1024:.1f} MB, "
+            f"命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, 命中率 {hit_rate}"
+        )
+    
+    def _clear_synthesis_cache(self, e):
+        """清空合成缓存"""
+        if "on_clear_synthesis_cache" in self.callbacks:
+            stats = self.callbacks["on_clear_synthesis_cache"]()
+            self.set_synthesis_cache_stats(stats)
+            self.settings_output_text.value = "合成缓存已清空"
+            self.page.update()
+    
     def update_settings(self, settings):
         """更新设置值
         
@@ -435,8 +577,13 @@ class SettingsPage(ft.Card):
         
         # 更新控件值
         self.api_url_input.value = settings.get('api_url', self.api_url_input.value)
+        self.api_endpoints_input.value = self._format_endpoints(settings.get('api_endpoints', []))
         self.model_host_input.value = settings.get('model_host', self.model_host_input.value)
         self.model_port_input.value = settings.get('model_port', self.model_port_input.value)
+        self.model_workers_input.value = str(settings.get('model_workers', self.model_workers_input.value))
+        self.model_start_timeout_input.value = str(settings.get('model_start_timeout', self.model_start_timeout_input.value))
+        self.model_idle_timeout_input.value = str(settings.get('model_idle_timeout', self.model_idle_timeout_input.value))
+        self.model_fast_start_checkbox.value = settings.get('model_fast_start', self.model_fast_start_checkbox.value)
         self.theme_mode_dropdown.value = settings.get('theme_mode', self.theme_mode_dropdown.value)
         self.auto_load_model_checkbox.value = settings.get('auto_load_model', self.auto_load_model_checkbox.value)
         self.logging_enabled_checkbox.value = settings.get('logging_enabled', self.logging_enabled_checkbox.value)
@@ -1,3 +1,4 @@
+import multiprocessing
 import flet as ft
 from app.app_controller import CosyVoiceApp
 
@@ -15,4 +16,6 @@ def main(page: ft.Page):
     app.initialize()
 
 if __name__ == "__main__":
+    # 打包后的程序在Windows上创建解压子进程时需要
+    multiprocessing.freeze_support()
     ft.app(target=main)
\ No newline at end of file
@@ -0,0 +1,22 @@
+import os
+from types import SimpleNamespace
+import pytest
+from app.core.db_manager import DBManager
+
+
+@pytest.fixture
+def path_manager(tmp_path):
+    """只包含数据库和旧版JSON文件路径的路径管理器"""
+    return SimpleNamespace(
+        database_file=os.path.join(tmp_path, "data", "parrot.db"),
+        roles_file=os.path.join(tmp_path, "data", "roles.json"),
+        history_file=os.path.join(tmp_path, "data", "history.json"),
+        history_dir=os.path.join(tmp_path, "history"),
+    )
+
+
+@pytest.fixture
+def db_manager(path_manager):
+    manager = DBManager(path_manager)
+    yield manager
+    manager.close_all()
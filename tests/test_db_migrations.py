@@ -0,0 +1,174 @@
+import os
+import json
+import sqlite3
+import pytest
+from app.core.db_manager import DBManager
+
+
+def _fts_supported():
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+requires_fts = pytest.mark.skipif(not _fts_supported(), reason="SQLite不支持trigram全文索引")
+
+
+def _user_version(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _names(conn, kind):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type=?", (kind,))}
+
+
+def _create_legacy_database(db_file):
+    """创建早期版本的数据库：没有版本号，角色表没有speaker_text列"""
+    os.makedirs(os.path.dirname(db_file), exist_ok=True)
+    conn = sqlite3.connect(db_file)
+    conn.executescript('''
+    CREATE TABLE roles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        file TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT NOT NULL,
+        speaker TEXT NOT NULL,
+        reference TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        speed REAL DEFAULT 1.0,
+        mode TEXT DEFAULT 'quick',
+        instruction TEXT,
+        speaker_text TEXT,
+        timestamp TEXT NOT NULL
+    );
+    INSERT INTO roles (name, description, file) VALUES ('旁白', '沉稳的男声', 'narrator.wav');
+    INSERT INTO history (text, speaker, reference, file_path, timestamp)
+        VALUES ('今天天气很好', '旁白', 'narrator.wav', 'a.wav', '2024-01-01 10:00:00');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_new_database_runs_all_migrations(db_manager, path_manager):
+    assert _user_version(path_manager.database_file) == len(db_manager._migrations())
+
+    conn = db_manager.get_connection()
+    assert {"roles", "history", "synthesis_cache", "upload_cache"} <= _names(conn, "table")
+    assert {"idx_history_timestamp", "idx_roles_name", "idx_history_file_path",
+            "idx_synthesis_cache_last_used"} <= _names(conn, "index")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_reopening_does_not_rerun_migrations(path_manager, monkeypatch):
+    DBManager(path_manager).close_all()
+
+    def fail(self, cursor):
+        raise AssertionError("迁移不应再次执行")
+
+    monkeypatch.setattr(DBManager, "_migration_create_tables", fail)
+    monkeypatch.setattr(DBManager, "_migration_import_json", fail)
+    monkeypatch.setattr(DBManager, "_migration_add_indexes", fail)
+    monkeypatch.setattr(DBManager, "_migration_add_fts", fail)
+    manager = DBManager(path_manager)
+    assert _user_version(path_manager.database_file) == len(manager._migrations())
+    manager.close_all()
+
+
+def test_legacy_database_is_upgraded(path_manager):
+    _create_legacy_database(path_manager.database_file)
+    manager = DBManager(path_manager)
+
+    conn = manager.get_connection()
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(roles)")]
+    assert "speaker_text" in columns
+    # 已有数据保留，没有重复导入
+    assert conn.execute("SELECT COUNT(*) FROM roles").fetchone()[0] == 1
+    assert conn.execute("SELECT COUNT(*) FROM history").fetchone()[0] == 1
+    assert _user_version(path_manager.database_file) == len(manager._migrations())
+    manager.close_all()
+
+
+def test_legacy_json_is_imported_and_backed_up(path_manager):
+    os.makedirs(os.path.dirname(path_manager.roles_file), exist_ok=True)
+    with open(path_manager.roles_file, "w", encoding="utf-8") as f:
+        json.dump([{"name": "小明", "description": "", "file": "xm.wav"}], f)
+    with open(path_manager.history_file, "w", encoding="utf-8") as f:
+        json.dump([{"text": "你好", "speaker": "小明", "reference": "xm.wav", "file_path": "b.wav"}], f)
+
+    manager = DBManager(path_manager)
+    conn = manager.get_connection()
+    assert [row["name"] for row in conn.execute("SELECT name FROM roles")] == ["小明"]
+    assert [row["text"] for row in conn.execute("SELECT text FROM history")] == ["你好"]
+    assert not os.path.exists(path_manager.roles_file)
+    assert os.path.exists(path_manager.roles_file + ".bak")
+    assert os.path.exists(path_manager.history_file + ".bak")
+    manager.close_all()
+
+
+def test_failed_migration_is_rolled_back(path_manager, monkeypatch):
+    def broken(self, cursor):
+        cursor.execute("CREATE INDEX idx_history_timestamp ON history(timestamp, id)")
+        raise sqlite3.OperationalError("模拟迁移失败")
+
+    monkeypatch.setattr(DBManager, "_migration_add_indexes", broken)
+    manager = DBManager(path_manager)
+    conn = manager.get_connection()
+    # 失败的迁移及之后的迁移都没有执行，下次启动重试
+    assert _user_version(path_manager.database_file) == 2
+    assert "idx_history_timestamp" not in _names(conn, "index")
+    manager.close_all()
+
+    monkeypatch.undo()
+    manager = DBManager(path_manager)
+    assert _user_version(path_manager.database_file) == len(manager._migrations())
+    assert "idx_history_timestamp" in _names(manager.get_connection(), "index")
+    manager.close_all()
+
+
+@requires_fts
+def test_fts_index_covers_existing_rows(path_manager):
+    _create_legacy_database(path_manager.database_file)
+    manager = DBManager(path_manager)
+    assert manager.fts_enabled
+
+    conn = manager.get_connection()
+    rows = conn.execute("SELECT rowid FROM history_fts WHERE history_fts MATCH ?",
+                        (manager.fts_phrase("天气很"),)).fetchall()
+    assert [row[0] for row in rows] == [1]
+    manager.close_all()
+
+
+@requires_fts
+def test_fts_triggers_follow_source_tables(db_manager):
+    conn = db_manager.get_connection()
+
+    def matches(keyword):
+        return [row[0] for row in conn.execute(
+            "SELECT rowid FROM roles_fts WHERE roles_fts MATCH ?", (db_manager.fts_phrase(keyword),)
+        )]
+
+    conn.execute("INSERT INTO roles (name, description, file) VALUES ('播音员', '新闻播报', 'a.wav')")
+    conn.commit()
+    assert matches("新闻播") == [1]
+
+    conn.execute("UPDATE roles SET description='天气预报' WHERE id=1")
+    conn.commit()
+    assert matches("新闻播") == []
+    assert matches("天气预") == [1]
+
+    conn.execute("DELETE FROM roles WHERE id=1")
+    conn.commit()
+    assert matches("天气预") == []
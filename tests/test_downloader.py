@@ -0,0 +1,162 @@
+import os
+import re
+import json
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.core.downloader import RangeDownloader
+
+DATA = bytes(range(256)) * 16  # 4096 字节，4个连接各下载1024字节
+
+
+class RangeServer:
+    """
+    支持Range请求的测试服务器，可按分段起始位置模拟失败或提前结束的响应
+    """
+    def __init__(self, data=DATA, etag='"v1"'):
+        self.data = data
+        self.etag = etag
+        # 起始位置 -> 处理函数，返回 (状态码, 响应数据) 或 None 表示正常响应
+        self.faults = {}
+        self.requests = []
+
+    async def handle(self, request):
+        match = re.match(r"bytes=(\d+)-(\d+)", request.headers.get("Range", ""))
+        if match is None:
+            return web.Response(body=self.data, headers={"ETag": self.etag})
+
+        start, end = int(match.group(1)), int(match.group(2))
+        self.requests.append((start, end))
+        body = self.data[start:end + 1]
+        status = 206
+        fault = self.faults.get(start)
+        if fault:
+            status, body = fault(start, end, body) or (status, body)
+        headers = {
+            "ETag": self.etag,
+            "Content-Range": f"bytes {start}-{end}/{len(self.data)}",
+        }
+        return web.Response(status=status, body=body, headers=headers)
+
+    def range_requests(self):
+        """不含探测请求的分段请求"""
+        return [r for r in self.requests if r != (0, 0)]
+
+
+async def _serve(server, scenario):
+    """启动测试服务器并执行 scenario(url)，同一场景中的多次下载使用相同的地址"""
+    app = web.Application()
+    app.router.add_get("/model.7z", server.handle)
+    async with TestServer(app) as test_server:
+        return await scenario(str(test_server.make_url("/model.7z")))
+
+
+def _download(server, target, downloader=None):
+    return asyncio.run(_serve(server, lambda url: (downloader or RangeDownloader()).download(url, target)))
+
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    """跳过重试前的退避等待"""
+    sleep = asyncio.sleep
+
+    async def no_wait(delay, *args, **kwargs):
+        await sleep(0, *args, **kwargs)
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+
+
+def test_download_splits_into_ranges(tmp_path):
+    server = RangeServer()
+    target = str(tmp_path / "model.7z")
+
+    assert _download(server, target) == (True, None)
+
+    with open(target, "rb") as f:
+        assert f.read() == DATA
+    assert sorted(server.range_requests()) == [(0, 1023), (1024, 2047), (2048, 3071), (3072, 4095)]
+    assert not os.path.exists(target + ".part")
+    assert not os.path.exists(target + ".parts.json")
+
+
+def test_failed_download_resumes_only_missing_range(tmp_path):
+    server = RangeServer()
+    server.faults[2048] = lambda start, end, body: (500, b"")
+    target = str(tmp_path / "model.7z")
+
+    async def scenario(url):
+        success, error = await RangeDownloader().download(url, target)
+        assert not success
+        assert "500" in error
+        assert not os.path.exists(target)
+        with open(target + ".parts.json", encoding="utf-8") as f:
+            state = json.load(f)
+        assert [part[2] for part in state["parts"]] == [1024, 1024, 0, 1024]
+
+        server.faults.clear()
+        server.requests.clear()
+        assert await RangeDownloader().download(url, target) == (True, None)
+
+    asyncio.run(_serve(server, scenario))
+    assert server.range_requests() == [(2048, 3071)]
+    with open(target, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_changed_validator_restarts_download(tmp_path):
+    server = RangeServer()
+    server.faults[2048] = lambda start, end, body: (500, b"")
+    target = str(tmp_path / "model.7z")
+
+    async def scenario(url):
+        await RangeDownloader().download(url, target)
+
+        # 服务器上的文件已变化，不能与之前下载的数据拼接
+        server.data = bytes(reversed(DATA))
+        server.etag = '"v2"'
+        server.faults.clear()
+        server.requests.clear()
+        assert await RangeDownloader().download(url, target) == (True, None)
+
+    asyncio.run(_serve(server, scenario))
+    assert len(server.range_requests()) == 4
+    with open(target, "rb") as f:
+        assert f.read() == server.data
+
+
+def test_short_response_continues_from_received_offset(tmp_path, fast_backoff):
+    server = RangeServer()
+    # 第一次只返回100字节后正常结束，之后从中断处继续
+    server.faults[1024] = lambda start, end, body: (206, body[:100])
+    target = str(tmp_path / "model.7z")
+
+    assert _download(server, target) == (True, None)
+    assert (1124, 2047) in server.range_requests()
+    with open(target, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_empty_responses_give_up_after_max_retries(tmp_path, fast_backoff):
+    server = RangeServer()
+    server.faults[2048] = lambda start, end, body: (206, b"")
+    target = str(tmp_path / "model.7z")
+    downloader = RangeDownloader()
+    downloader.MAX_RETRIES = 2
+
+    success, error = _download(server, target, downloader)
+    assert not success
+    assert "服务器未返回数据" in error
+    assert server.range_requests().count((2048, 3071)) == downloader.MAX_RETRIES + 1
+
+
+def test_sha256_mismatch_discards_download(tmp_path):
+    server = RangeServer()
+    target = str(tmp_path / "model.7z")
+
+    success, _ = asyncio.run(_serve(
+        server, lambda url: RangeDownloader().download(url, target, expected_sha256="0" * 64)
+    ))
+    assert not success
+    for path in (target, target + ".part", target + ".parts.json"):
+        assert not os.path.exists(path)
@@ -0,0 +1,134 @@
+import pytest
+from app.core.history_manager import HistoryManager
+from app.core.role_manager import RoleManager
+
+
+@pytest.fixture
+def history_manager(path_manager, db_manager):
+    manager = HistoryManager(path_manager, db_manager)
+    # 每两条记录时间相同，检验按 id 区分先后
+    for i in range(25):
+        manager.add_record({
+            'text': f"第{i}条 {'天气' if i % 3 == 0 else '新闻'}",
+            'speaker': "旁白",
+            'reference': "a.wav",
+            'file_path': f"{i}.wav",
+            'timestamp': f"2024-01-01 10:00:{i // 2:02d}",
+        })
+    return manager
+
+
+@pytest.fixture
+def role_manager(path_manager, db_manager):
+    manager = RoleManager(path_manager, db_manager)
+    # 部分角色重名，检验按 id 区分先后
+    for i in range(12):
+        manager.add_role({'name': f"角色{i % 8:02d}", 'description': "", 'file': f"{i}.wav"})
+    return manager
+
+
+def _history_order(manager):
+    rows = manager._query()
+    return [row['id'] for row in rows]
+
+
+def _ids(rows):
+    return [row['id'] for row in rows]
+
+
+def test_history_pages_follow_timestamp_then_id(history_manager):
+    expected = _history_order(history_manager)
+    assert expected == sorted(expected, key=lambda i: ((i - 1) // 2, i), reverse=True)
+
+    pages = [history_manager.get_history_paged(page, 10) for page in (1, 2, 3)]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum((_ids(page) for page in pages), []) == expected
+    assert history_manager.get_history_paged(4, 10) == []
+
+
+def test_history_cursor_paging_matches_page_numbers(history_manager):
+    first = history_manager.get_history_paged(1, 10)
+    second = history_manager.get_history_paged(2, 10)
+    third = history_manager.get_history_paged(3, 10)
+
+    last = first[-1]
+    after = history_manager.get_history_paged(None, 10, after=(last['timestamp'], last['id']))
+    assert _ids(after) == _ids(second)
+
+    head = third[0]
+    before = history_manager.get_history_paged(None, 10, before=(head['timestamp'], head['id']))
+    assert _ids(before) == _ids(second)
+
+
+def test_history_page_returns_total(history_manager):
+    rows, total = history_manager.get_history_page("", 2, 10)
+    assert total == 25
+    assert _ids(rows) == _ids(history_manager.get_history_paged(2, 10))
+
+    # 短关键词使用LIKE，长关键词可能使用全文索引，两者的计数都应与筛选结果一致
+    for keyword in ("天气", "条 天气"):
+        matched = [row for row in history_manager._query() if keyword in row['text']]
+        rows, total = history_manager.get_history_page(keyword, 1, 5)
+        assert total == len(matched) == 9
+        assert _ids(rows) == _ids(matched[:5])
+        rows, total = history_manager.get_history_page(keyword, 2, 5)
+        assert total == 9
+        assert _ids(rows) == _ids(matched[5:])
+
+
+def test_history_page_clamps_invalid_arguments(history_manager):
+    assert _ids(history_manager.get_history_page("", 0, 10)[0]) == _ids(history_manager.get_history_paged(1, 10))
+    assert _ids(history_manager.get_history_paged(0, 0)) == _ids(history_manager.get_history_paged(1, 10))
+
+
+def test_cached_history_page_is_not_shared(history_manager):
+    rows, _ = history_manager.get_history_page("", 1, 10)
+    rows[0]['text'] = "已修改"
+    rows.clear()
+
+    rows, _ = history_manager.get_history_page("", 1, 10)
+    assert len(rows) == 10
+    assert rows[0]['text'] != "已修改"
+
+
+def test_history_cache_is_invalidated_by_new_records(history_manager):
+    assert history_manager.get_history_page("", 1, 10)[1] == 25
+    history_manager.add_record({
+        'text': "最新", 'speaker': "旁白", 'reference': "a.wav",
+        'file_path': "new.wav", 'timestamp': "2024-01-02 00:00:00",
+    })
+    rows, total = history_manager.get_history_page("", 1, 10)
+    assert total == 26
+    assert rows[0]['text'] == "最新"
+
+
+def test_role_pages_follow_name_then_id(role_manager):
+    expected = [role['id'] for role in sorted(role_manager.get_roles(), key=lambda r: (r['name'], r['id']))]
+
+    pages = [role_manager.get_roles_paged(page, 5) for page in (1, 2, 3)]
+    assert sum((_ids(page) for page in pages), []) == expected
+
+    last = pages[0][-1]
+    assert _ids(role_manager.get_roles_paged(None, 5, after=(last['name'], last['id']))) == _ids(pages[1])
+    head = pages[2][0]
+    assert _ids(role_manager.get_roles_paged(None, 5, before=(head['name'], head['id']))) == _ids(pages[1])
+
+
+def test_roles_page_clamps_invalid_arguments(role_manager):
+    rows, total = role_manager.get_roles_page("", 0, 0)
+    assert total == 12
+    assert _ids(rows) == _ids(role_manager.get_roles_paged(1, 10))
+
+    rows, total = role_manager.get_roles_page("角色00", -1, 1)
+    assert total == 2
+    assert _ids(rows) == _ids(role_manager.get_roles_page("角色00", 1, 1)[0])
+
+
+def test_cached_roles_are_not_shared(role_manager):
+    roles = role_manager.get_roles()
+    roles[0]['name'] = "已修改"
+    rows, _ = role_manager.get_roles_page("", 1, 5)
+    rows[0]['name'] = "已修改"
+
+    assert role_manager.get_roles()[0]['name'] != "已修改"
+    assert role_manager.get_roles_page("", 1, 5)[0][0]['name'] != "已修改"